@@ -0,0 +1,157 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# === Konfigurasi access log (bisa diubah lewat environment) ===
+# HTTP_ACCESS_LOG=0 mematikan access log sepenuhnya
+ENABLED = os.getenv("HTTP_ACCESS_LOG", '1') == '1'
+# tujuan log: '-' untuk stderr, selain itu path file
+LOG_FILE = os.getenv("HTTP_LOG_FILE", '-')
+# fraksi request yang dicatat (0.01 = 1%); respon 5xx selalu dicatat
+SAMPLE = float(os.getenv("HTTP_LOG_SAMPLE", 1))
+# DEBUG: header request dan awal respon ikut dicatat
+LEVEL = os.getenv("HTTP_LOG_LEVEL", 'INFO').upper()
+PAYLOAD_BYTES = int(os.getenv("HTTP_LOG_PAYLOAD_BYTES", 512))
+# entri yang menunggu ditulis; jika penuh entri baru dibuang, bukan ditunggu
+QUEUE_SIZE = int(os.getenv("HTTP_LOG_QUEUE", 10000))
+# jeda maksimum sebelum entri baru ditulis
+FLUSH_INTERVAL = float(os.getenv("HTTP_LOG_FLUSH_INTERVAL", 0.2))
+
+
+class BufferedStreamHandler(logging.StreamHandler):
+    """StreamHandler yang tidak flush per baris; AccessListener flush saat antrian kosong."""
+
+    def flush(self):
+        pass
+
+    def flush_now(self):
+        logging.StreamHandler.flush(self)
+
+
+class AccessListener(QueueListener):
+    """
+    Thread penulis log. Entri access log masuk antrian sebagai tuple mentah
+    dan baru diformat di thread ini, langsung menjadi satu baris teks tanpa
+    LogRecord; record biasa (dari QueueHandler root logger) ditangani
+    handler seperti biasa.
+    """
+
+    def __init__(self, antrian, handler):
+        QueueListener.__init__(self, antrian, handler)
+        self.detik = None
+        self.prefix = ''
+
+    def timestamp(self, waktu):
+        # bagian tanggal-jam diformat ulang paling banyak sekali per detik
+        detik = int(waktu)
+        if detik != self.detik:
+            self.detik = detik
+            self.prefix = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(detik))
+        return f"{self.prefix},{int((waktu - detik) * 1000):03d}"
+
+    def format_entry(self, entry):
+        waktu, address, method, path, version, kode, nbytes, seconds, payload = entry
+        client = f"{address[0]}:{address[1]}" if type(address) is tuple else str(address)
+        line = (f'{self.timestamp(waktu)} {client} "{method} {path} {version}" '
+                f'{kode} {nbytes} {seconds * 1000:.2f}ms\n')
+        if payload is not None:
+            headers, respon = payload
+            line += ''.join(f"  > {k}: {v}\n" for k, v in headers.items())
+            line += ''.join(f"  < {baris}\n" for baris in respon.decode('iso-8859-1').rstrip('\r\n').split('\r\n'))
+        return line
+
+    def handle(self, record):
+        if type(record) is not tuple:
+            QueueListener.handle(self, record)
+            return
+        line = self.format_entry(record)
+        for handler in self.handlers:
+            handler.stream.write(line)
+
+    def dequeue(self, block):
+        # tulis per kelompok: saat antrian kosong, flush lalu tidur sebentar
+        # agar thread ini tidak dibangunkan untuk setiap request
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.flush_now()
+            time.sleep(FLUSH_INTERVAL)
+        return self.queue.get(block)
+
+
+class AccessLog:
+    """
+    Access log satu baris per request (client, method, path, status, byte,
+    durasi). Thread yang melayani request hanya memasukkan tuple ke
+    SimpleQueue; format dan tulis ke disk/stderr dilakukan AccessListener
+    di thread latar. Root logger juga diarahkan ke
+    antrian yang sama, sehingga logging.warning dari server ikut asinkron.
+    """
+
+    def __init__(self, enabled=ENABLED, sample=SAMPLE, level=LEVEL, log_file=LOG_FILE):
+        self.enabled = enabled
+        self.sample = sample
+        self.payload = level == 'DEBUG'
+        self.log_file = log_file
+        self.lock = threading.Lock()
+        self.queue = None
+        self.listener = None
+        self.dropped = 0
+
+    def start(self):
+        with self.lock:
+            if self.queue is not None:
+                return
+            if self.log_file == '-':
+                handler = BufferedStreamHandler(sys.stderr)
+            else:
+                handler = BufferedStreamHandler(open(self.log_file, 'a', buffering=64 * 1024))
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            antrian = queue.SimpleQueue()
+            root = logging.getLogger()
+            if not root.handlers:
+                root.addHandler(QueueHandler(antrian))
+            self.listener = AccessListener(antrian, handler)
+            self.listener.start()
+            self.queue = antrian
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Tulis semua entri yang tersisa lalu hentikan thread penulis."""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def reset(self):
+        """Setelah fork thread penulis tidak ikut; proses anak memulai sendiri."""
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if isinstance(handler, QueueHandler) and handler.queue is self.queue:
+                root.removeHandler(handler)
+        self.lock = threading.Lock()
+        self.queue = None
+        self.listener = None
+
+    def request(self, address, request, respon, nbytes, seconds):
+        if not self.enabled:
+            return
+        if self.sample < 1 and respon.kode < 500 and random.random() >= self.sample:
+            return
+        if self.queue is None:
+            self.start()
+        if self.queue.qsize() >= QUEUE_SIZE:
+            self.dropped += 1
+            return
+        payload = None
+        if self.payload:
+            payload = (request.headers, respon.header_bytes()[:PAYLOAD_BYTES])
+        self.queue.put((time.time(), address, request.method, request.path, request.version,
+                        respon.kode, nbytes, seconds, payload))
+
+
+access_log = AccessLog()
+os.register_at_fork(after_in_child=access_log.reset)
@@ -0,0 +1,115 @@
+import os
+import time
+import socket
+import threading
+import collections
+from metrics import metrics
+
+# === Konfigurasi admission control (bisa diubah lewat environment) ===
+# thread/proses pool yang melayani koneksi
+WORKERS = int(os.getenv("HTTP_WORKERS", 20))
+# koneksi yang boleh menunggu worker; lebih dari ini langsung dijawab 503
+QUEUE_DEPTH = int(os.getenv("HTTP_QUEUE_DEPTH", 64))
+# koneksi yang menunggu di antrian lebih lama dari ini dijawab 503 oleh worker
+QUEUE_DEADLINE = float(os.getenv("HTTP_QUEUE_DEADLINE", 2))
+RETRY_AFTER = int(os.getenv("HTTP_RETRY_AFTER", 1))
+# jumlah koneksi selesai yang disimpan di registry
+HISTORY_SIZE = int(os.getenv("HTTP_HISTORY_SIZE", 256))
+
+
+def expired(accepted, deadline=QUEUE_DEADLINE):
+    """True jika koneksi yang di-accept pada `accepted` (time.monotonic) sudah terlalu lama antri."""
+    return time.monotonic() - accepted > deadline
+
+
+def reject(connection, httpserver, retry_after=RETRY_AFTER):
+    """
+    Tolak koneksi dengan cepat: kirim 503 + Retry-After tanpa menunggu
+    request, lalu tutup. Respon sekecil ini muat di buffer kirim socket
+    sehingga pemanggil (thread accept) tidak pernah tertahan.
+    """
+    hasil = httpserver.response(503, 'Service Unavailable', 'Server sibuk',
+                                {'Retry-After': str(retry_after), 'Content-Type': 'text/plain'})
+    try:
+        connection.setblocking(False)
+        connection.send(hasil.to_bytes())
+        connection.shutdown(socket.SHUT_WR)
+        # buang request yang sudah terlanjur masuk agar close tidak mengirim RST
+        # sebelum client sempat membaca 503
+        while connection.recv(65536):
+            pass
+    except OSError:
+        pass
+    finally:
+        connection.close()
+
+
+class Admission:
+    """
+    Batas pekerjaan untuk server pool: paling banyak `workers` koneksi
+    dilayani dan `depth` koneksi menunggu; selebihnya ditolak saat accept.
+    Koneksi yang sedang berjalan dan riwayat koneksi yang selesai disimpan
+    di registry berukuran tetap (bukan list yang terus bertambah).
+    """
+
+    def __init__(self, workers=WORKERS, depth=QUEUE_DEPTH, history=HISTORY_SIZE):
+        self.workers = workers
+        self.capacity = workers + depth
+        self.lock = threading.Lock()
+        self.seq = 0
+        # nomor -> (alamat, waktu accept)
+        self.active = {}
+        # (alamat, detik di antrian+layanan, dilayani?) untuk koneksi yang selesai
+        self.finished = collections.deque(maxlen=history)
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+        # salinan queued() untuk worker di proses lain (lihat share())
+        self.waiting = None
+        metrics.gauge('http_worker_queue_depth', 'Koneksi yang menunggu worker.', self.queued)
+        metrics.gauge('http_admission_inflight', 'Koneksi yang dilayani atau menunggu worker.', lambda: len(self.active))
+        metrics.gauge('http_admission_rejected_total', 'Koneksi ditolak 503 karena antrian penuh.',
+                      lambda: self.rejected, 'counter')
+        metrics.gauge('http_admission_expired_total', 'Koneksi ditolak 503 karena terlalu lama antri.',
+                      lambda: self.expired, 'counter')
+
+    def admit(self, address):
+        """Nomor tiket (dipakai di done()) atau None jika antrian penuh."""
+        with self.lock:
+            if len(self.active) >= self.capacity:
+                self.rejected += 1
+                return None
+            self.seq += 1
+            self.admitted += 1
+            self.active[self.seq] = (address, time.monotonic())
+            if self.waiting is not None:
+                self.waiting.value = self.queued()
+            return self.seq
+
+    def done(self, ticket, served):
+        """Dipanggil saat pekerjaan selesai; served False jika kedaluwarsa di antrian."""
+        with self.lock:
+            address, accepted = self.active.pop(ticket)
+            if not served:
+                self.expired += 1
+            self.finished.append((address, time.monotonic() - accepted, served))
+            if self.waiting is not None:
+                self.waiting.value = self.queued()
+
+    def queued(self):
+        return max(0, len(self.active) - self.workers)
+
+    def busy(self):
+        """True jika ada koneksi yang menunggu worker (untuk serve_connection)."""
+        return len(self.active) > self.workers
+
+    def share(self, ctx):
+        """
+        RawValue berisi jumlah koneksi yang menunggu, diperbarui setiap
+        admit/done, untuk diteruskan ke worker process pool (initializer).
+        """
+        self.waiting = ctx.RawValue('i', self.queued())
+        return self.waiting
+
+    def accepted_at(self, ticket):
+        return self.active[ticket][1]
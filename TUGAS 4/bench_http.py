@@ -0,0 +1,469 @@
+import os
+import sys
+import csv
+import json
+import time
+import random
+import signal
+import socket
+import asyncio
+import argparse
+import subprocess
+from collections import Counter
+
+# Load generator HTTP/1.1 berbasis asyncio, pengganti perftest.sh (ab).
+#
+#   python bench_http.py --port 8887 --duration 10 --concurrency 50
+#   python bench_http.py --port 8886 --rate 500 --mix get_small:70,list:20,upload:10
+#   python bench_http.py --all --duration 5 --json hasil.json --csv hasil.csv
+#
+# Mode closed-loop (default): `concurrency` koneksi, masing-masing langsung
+# mengirim request berikutnya setelah respon diterima. Mode open-loop
+# (--rate): request datang dengan laju tetap tanpa menunggu respon, dan
+# latensi dihitung dari jadwal kedatangan sehingga antrian di sisi client
+# ikut terukur (tanpa coordinated omission).
+
+# server yang dijalankan oleh --all: nama -> (script, port)
+VARIANTS = {
+    'thread': ('server_thread_http.py', 8889),
+    'thread_pool': ('server_thread_pool_http.py', 8885),
+    'process': ('server_process_http.py', 8889),
+    'process_pool': ('server_process_pool_http.py', 8889),
+    'async': ('server_async_http.py', 8887),
+    'asyncio_stream': ('server_asyncio_stream_http.py', 8886),
+    'prefork': ('server_prefork_http.py', 8888),
+}
+
+# jenis request untuk --mix
+OPERATIONS = {
+    'get_small': ('GET', '/testing.txt'),
+    'get_large': ('GET', '/rfc2616.pdf'),
+    'list': ('GET', '/list'),
+    'upload': ('POST', '/upload/'),
+}
+UPLOAD_NAMES = 8
+READ_SIZE = 65536
+
+
+class Histogram:
+    """
+    Histogram latensi gaya HDR: bucket log-linear dalam mikrodetik dengan
+    64 sub-bucket per pangkat dua (galat relatif < 1.6%), memori tetap
+    berapa pun jumlah sampel, dan bisa digabung antar worker.
+    """
+    SUB_BITS = 7
+    HALF = 1 << (SUB_BITS - 1)
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def index(self, value):
+        if value < (1 << self.SUB_BITS):
+            return value
+        shift = value.bit_length() - self.SUB_BITS
+        return shift * self.HALF + (value >> shift)
+
+    def value(self, index):
+        """Nilai tertinggi yang masuk bucket `index`."""
+        if index < (1 << self.SUB_BITS):
+            return index
+        shift = index // self.HALF - 1
+        return ((index - shift * self.HALF + 1) << shift) - 1
+
+    def record(self, seconds):
+        value = int(seconds * 1e6)
+        i = self.index(value)
+        self.counts[i] = self.counts.get(i, 0) + 1
+        self.total += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for i, n in other.counts.items():
+            self.counts[i] = self.counts.get(i, 0) + n
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        """Persentil dalam milidetik."""
+        if not self.total:
+            return 0.0
+        batas = self.total * p / 100
+        jalan = 0
+        for i in sorted(self.counts):
+            jalan += self.counts[i]
+            if jalan >= batas:
+                return min(self.value(i), self.max) / 1000
+        return self.max / 1000
+
+    def summary(self):
+        return {
+            'p50_ms': round(self.percentile(50), 3),
+            'p90_ms': round(self.percentile(90), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'p999_ms': round(self.percentile(99.9), 3),
+            'max_ms': round(self.max / 1000, 3),
+            'mean_ms': round(self.sum / self.total / 1000, 3) if self.total else 0.0,
+        }
+
+
+def parse_mix(value):
+    """'get_small:70,list:30' -> [(operasi, bobot)]."""
+    mix = []
+    for item in value.split(','):
+        name, _, weight = item.partition(':')
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"operasi tidak dikenal: {name}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+class Stats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.per_op = {name: Histogram() for name in OPERATIONS}
+        self.errors = Counter()
+        self.status = Counter()
+        self.bytes = 0
+        self.connects = 0
+
+    def ok(self, op, seconds, status, size):
+        self.latency.record(seconds)
+        self.per_op[op].record(seconds)
+        self.status[status] += 1
+        self.bytes += size
+        if status >= 400:
+            self.errors[f"http {status}"] += 1
+
+    def fail(self, error):
+        self.errors[error] += 1
+
+
+class Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.requests = 0
+
+    def close(self):
+        self.writer.close()
+
+
+class LoadGenerator:
+    def __init__(self, args):
+        self.host = args.host
+        self.port = args.port
+        self.keepalive = args.keepalive
+        self.timeout = args.timeout
+        self.names, weights = zip(*args.mix)
+        self.weights = list(weights)
+        self.payload = os.urandom(args.upload_size)
+        self.random = random.Random(1)
+        self.uploads = 0
+        self.stats = Stats()
+
+    def next_request(self):
+        op = self.random.choices(self.names, self.weights)[0]
+        method, path = OPERATIONS[op]
+        body = b''
+        if op == 'upload':
+            path += f"bench-{self.uploads % UPLOAD_NAMES}.bin"
+            self.uploads += 1
+            body = self.payload
+        lines = [f"{method} {path} HTTP/1.1\r\n", f"Host: {self.host}\r\n"]
+        if not self.keepalive:
+            lines.append("Connection: close\r\n")
+        if method == 'POST':
+            lines.append(f"Content-Length: {len(body)}\r\n")
+        lines.append("\r\n")
+        return op, ''.join(lines).encode() + body
+
+    async def connect(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port, limit=READ_SIZE)
+        writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stats.connects += 1
+        return Connection(reader, writer)
+
+    async def read_response(self, conn):
+        """(status, byte body, koneksi masih bisa dipakai?)"""
+        head = await conn.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode('iso-8859-1').split("\r\n")
+        status = int(lines[0].split(' ', 2)[1])
+        length = None
+        close = lines[0].startswith('HTTP/1.0')
+        for line in lines[1:]:
+            k, _, v = line.partition(':')
+            k = k.strip().lower()
+            if k == 'content-length':
+                length = int(v)
+            elif k == 'connection':
+                close = v.strip().lower() == 'close'
+        size = 0
+        if length is None:
+            while True:
+                data = await conn.reader.read(READ_SIZE)
+                if not data:
+                    break
+                size += len(data)
+            return status, size, False
+        while size < length:
+            data = await conn.reader.read(min(READ_SIZE, length - size))
+            if not data:
+                raise asyncio.IncompleteReadError(b'', length - size)
+            size += len(data)
+        return status, size, not close
+
+    async def exchange(self, conn, request):
+        conn.writer.write(request)
+        await conn.writer.drain()
+        return await asyncio.wait_for(self.read_response(conn), self.timeout)
+
+    async def one(self, conn, mulai=None):
+        """
+        Kirim satu request acak. `mulai` adalah waktu jadwal (open-loop);
+        mengembalikan koneksi yang bisa dipakai lagi atau None.
+        """
+        op, request = self.next_request()
+        mulai = mulai or time.perf_counter()
+        for attempt in range(2):
+            try:
+                reused = conn is not None
+                if conn is None:
+                    conn = await asyncio.wait_for(self.connect(), self.timeout)
+                status, size, reusable = await self.exchange(conn, request)
+            except asyncio.TimeoutError:
+                self.stats.fail('timeout')
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError) as e:
+                if conn is not None:
+                    conn.close()
+                    conn = None
+                # koneksi keep-alive ditutup server saat idle: ulangi sekali
+                if reused and attempt == 0:
+                    continue
+                self.stats.fail(type(e).__name__)
+                return None
+            else:
+                self.stats.ok(op, time.perf_counter() - mulai, status, size)
+                conn.requests += 1
+                if reusable and self.keepalive:
+                    return conn
+            if conn is not None:
+                conn.close()
+            return None
+
+    async def closed_loop(self, concurrency, deadline, count):
+        async def worker():
+            conn = None
+            while time.perf_counter() < deadline and self.sent < count:
+                self.sent += 1
+                conn = await self.one(conn)
+            if conn is not None:
+                conn.close()
+        self.sent = 0
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def open_loop(self, rate, concurrency, deadline, count):
+        """
+        Kedatangan tetap `rate`/detik. Koneksi diambil dari pool berisi paling
+        banyak `concurrency` koneksi; request yang menunggu pool tetap dihitung
+        latensinya sejak jadwal kedatangan.
+        """
+        pool = asyncio.Queue()
+        for _ in range(concurrency):
+            pool.put_nowait(None)
+        pending = set()
+        batas_antri = concurrency * 100
+
+        async def arrival(jadwal):
+            conn = await pool.get()
+            try:
+                conn = await self.one(conn, jadwal)
+            finally:
+                pool.put_nowait(conn)
+
+        mulai = time.perf_counter()
+        i = 0
+        while i < count:
+            jadwal = mulai + i / rate
+            if jadwal >= deadline:
+                break
+            delay = jadwal - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            i += 1
+            if len(pending) >= batas_antri:
+                self.stats.fail('client queue full')
+                continue
+            task = asyncio.ensure_future(arrival(jadwal))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.wait(pending)
+        while not pool.empty():
+            conn = pool.get_nowait()
+            if conn is not None:
+                conn.close()
+
+    async def cleanup(self):
+        """Hapus file hasil operasi upload."""
+        for i in range(min(self.uploads, UPLOAD_NAMES)):
+            try:
+                conn = await self.connect()
+                await self.exchange(conn, f"GET /delete/bench-{i}.bin HTTP/1.1\r\n"
+                                          f"Host: {self.host}\r\nConnection: close\r\n\r\n".encode())
+                conn.close()
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                pass
+
+    async def run(self, args):
+        deadline = time.perf_counter() + args.duration
+        count = args.requests or float('inf')
+        mulai = time.perf_counter()
+        if args.rate:
+            await self.open_loop(args.rate, args.concurrency, deadline, count)
+        else:
+            await self.closed_loop(args.concurrency, deadline, count)
+        durasi = time.perf_counter() - mulai
+        await self.cleanup()
+        return durasi
+
+
+def report(variant, args, generator, durasi):
+    stats = generator.stats
+    hasil = {
+        'variant': variant,
+        'port': args.port,
+        'mode': 'open' if args.rate else 'closed',
+        'keepalive': args.keepalive,
+        'concurrency': args.concurrency,
+        'rate': args.rate or 0,
+        'mix': ','.join(f"{n}:{w:g}" for n, w in args.mix),
+        'duration_s': round(durasi, 3),
+        'requests': stats.latency.total,
+        'errors': sum(stats.errors.values()),
+        'rps': round(stats.latency.total / durasi, 1),
+        'mbps': round(stats.bytes / durasi / 1e6, 3),
+        'connects': stats.connects,
+    }
+    hasil.update(stats.latency.summary())
+    hasil['status'] = {str(k): v for k, v in sorted(stats.status.items())}
+    hasil['error_detail'] = dict(stats.errors)
+    hasil['operations'] = {name: dict(requests=h.total, **h.summary())
+                           for name, h in stats.per_op.items() if h.total}
+    return hasil
+
+
+def print_row(hasil):
+    print(f"{hasil['variant']:<15} {hasil['requests']:>7} {hasil['rps']:>9.1f}/s "
+          f"p50 {hasil['p50_ms']:7.2f} p99 {hasil['p99_ms']:7.2f} p999 {hasil['p999_ms']:8.2f} "
+          f"max {hasil['max_ms']:8.2f}ms  err {hasil['errors']}"
+          + (f" {hasil['error_detail']}" if hasil['errors'] else ''))
+    for name, op in hasil['operations'].items():
+        print(f"    {name:<11} {op['requests']:>7} p50 {op['p50_ms']:7.2f} p99 {op['p99_ms']:7.2f}ms")
+
+
+def wait_port(host, port, timeout=10):
+    batas = time.monotonic() + timeout
+    while time.monotonic() < batas:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def start_server(script, port):
+    """Jalankan satu varian server di grup proses sendiri (agar worker ikut dihentikan)."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen([sys.executable, script], cwd=directory, start_new_session=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_port('127.0.0.1', port):
+        stop_server(proc)
+        return None
+    return proc
+
+
+def stop_server(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(5)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+    except ProcessLookupError:
+        pass
+
+
+def write_outputs(args, rows):
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+    if args.csv:
+        kolom = [k for k in rows[0] if not isinstance(rows[0][k], dict)]
+        kolom += [f"{op}_{k}" for op in OPERATIONS for k in ('requests', 'p50_ms', 'p99_ms')]
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, kolom, extrasaction='ignore')
+            writer.writeheader()
+            for row in rows:
+                flat = dict(row)
+                for op, values in row['operations'].items():
+                    for k in ('requests', 'p50_ms', 'p99_ms'):
+                        flat[f"{op}_{k}"] = values[k]
+                writer.writerow(flat)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='load generator HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8887)
+    parser.add_argument('--duration', type=float, default=10, help='detik per run')
+    parser.add_argument('--requests', type=int, default=0, help='batas jumlah request (0: sampai durasi habis)')
+    parser.add_argument('--concurrency', type=int, default=50, help='jumlah koneksi')
+    parser.add_argument('--rate', type=float, default=0, help='request/detik (open-loop); 0: closed-loop')
+    parser.add_argument('--no-keepalive', dest='keepalive', action='store_false',
+                        help='satu koneksi baru per request')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('get_small'),
+                        help='mis. get_small:70,get_large:10,list:15,upload:5')
+    parser.add_argument('--upload-size', type=int, default=64 * 1024)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--all', action='store_true', help='jalankan dan ukur setiap server_*_http.py')
+    parser.add_argument('--variants', default=','.join(VARIANTS), help='varian untuk --all')
+    parser.add_argument('--json', help='simpan hasil ke file JSON')
+    parser.add_argument('--csv', help='simpan hasil ke file CSV')
+    args = parser.parse_args(argv)
+
+    mode = f"open-loop {args.rate:g}/s" if args.rate else "closed-loop"
+    print(f"{mode}, {args.concurrency} koneksi, keep-alive {'on' if args.keepalive else 'off'}, "
+          f"{args.duration:g}s, mix {','.join(n for n, _ in args.mix)}")
+    rows = []
+    if args.all:
+        for variant in args.variants.split(','):
+            script, args.port = VARIANTS[variant]
+            proc = start_server(script, args.port)
+            if proc is None:
+                print(f"{variant:<15} gagal dijalankan (port {args.port} dipakai?)")
+                continue
+            try:
+                generator = LoadGenerator(args)
+                durasi = asyncio.run(generator.run(args))
+            finally:
+                stop_server(proc)
+            rows.append(report(variant, args, generator, durasi))
+            print_row(rows[-1])
+    else:
+        generator = LoadGenerator(args)
+        durasi = asyncio.run(generator.run(args))
+        rows.append(report(f"{args.host}:{args.port}", args, generator, durasi))
+        print_row(rows[-1])
+    if rows:
+        write_outputs(args, rows)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,42 @@
+import sys
+import timeit
+import threading
+from metrics import Metrics
+
+# Biaya pencatatan metrics per request: satu request = parsed + request +
+# sent (tiga hook di jalur request), dibandingkan dengan metrics dimatikan,
+# serta biaya render /metrics. Pemakaian: python bench_metrics.py [jumlah_thread]
+
+
+def per_request(m):
+    def run():
+        m.parsed(0.00012, 120)
+        m.request('http_get', 'GET', 200, 0.0004)
+        m.sent('http_get', 0.0002, 1500)
+    return run
+
+
+def main(threads):
+    loops = 200000
+    for enabled in (False, True):
+        m = Metrics(enabled)
+        t = timeit.timeit(per_request(m), number=loops) / loops * 1e9
+        print(f"metrics {'on ' if enabled else 'off'}: {t:7.0f} ns/request")
+
+    # beberapa thread menulis bersamaan: tiap thread punya shard sendiri
+    m = Metrics(True)
+    run = per_request(m)
+    workers = [threading.Thread(target=lambda: [run() for _ in range(loops // threads)])
+               for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    total = m.collect()
+    print(f"{threads} thread: {sum(total.requests.values())} dari {loops // threads * threads} request tercatat")
+    t = timeit.timeit(m.render, number=100) / 100 * 1e6
+    print(f"render /metrics: {t:7.0f} us ({len(m.render())} bytes)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
@@ -0,0 +1,49 @@
+import sys
+import timeit
+from router import Router
+
+# Perbandingan biaya dispatch: rantai if/startswith (cara lama di http_get)
+# melawan Router (dict path persis + trie prefix) untuk jumlah route yang
+# bertambah. Pemakaian: python bench_router.py [jumlah_route ...]
+
+
+def build_chain(n):
+    prefixes = [f'/r{i}/' for i in range(n)]
+
+    def dispatch(path):
+        if path == '/':
+            return 'index'
+        if path == '/list':
+            return 'list'
+        for prefix in prefixes:
+            if path.startswith(prefix):
+                return path.split(prefix)[1]
+        return path.lstrip('/')
+    return dispatch
+
+
+def build_router(n):
+    router = Router()
+    router.get('/')(lambda: 'index')
+    router.get('/list')(lambda: 'list')
+    for i in range(n):
+        router.get(f'/r{i}/', prefix=True)(lambda: i)
+    router.get('/', prefix=True)(lambda: 'static')
+    return router.match
+
+
+def main(counts):
+    print(f"{'routes':>7} {'path':<22} {'if-chain':>10} {'router':>10}")
+    for n in counts:
+        chain = build_chain(n)
+        match = build_router(n)
+        paths = ['/list', f'/r{n - 1}/file.txt', '/rfc2616.pdf']
+        for path in paths:
+            loops = 100000
+            t_chain = timeit.timeit(lambda: chain(path), number=loops) / loops * 1e9
+            t_router = timeit.timeit(lambda: match(path), number=loops) / loops * 1e9
+            print(f"{n:>7} {path:<22} {t_chain:>8.0f}ns {t_router:>8.0f}ns")
+
+
+if __name__ == '__main__':
+    main([int(x) for x in sys.argv[1:]] or [3, 10, 100, 1000])
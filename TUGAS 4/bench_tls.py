@@ -0,0 +1,98 @@
+import sys
+import ssl
+import time
+import socket
+import argparse
+import threading
+
+# Pengukuran laju dan latensi handshake TLS ke server secure
+# (server_thread_http_secure.py :8443 atau server_async_http_secure.py :8444)
+# yang memakai certs/domain.crt. Setiap koneksi: connect + handshake, satu
+# GET kecil, lalu ditutup. Mode `full` selalu handshake penuh, mode `resume`
+# menyerahkan session dari koneksi sebelumnya (session ticket).
+#
+#   python bench_tls.py --port 8443 --count 500 --threads 4
+
+
+def client_context(tls_version):
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    # certs/domain.crt self-signed, tanpa subjectAltName, dan sudah kedaluwarsa
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    if tls_version == '1.2':
+        context.maximum_version = ssl.TLSVersion.TLSv1_2
+    return context
+
+
+def one_request(context, host, port, session):
+    """(detik handshake, session baru, session dipakai ulang?)"""
+    mulai = time.perf_counter()
+    sock = socket.create_connection((host, port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    secure = context.wrap_socket(sock, server_hostname='testing.net', session=session)
+    handshake = time.perf_counter() - mulai
+    reused = secure.session_reused
+    secure.sendall(b"GET / HTTP/1.1\r\nHost: testing.net\r\nConnection: close\r\n\r\n")
+    # ticket TLS 1.3 dikirim server setelah handshake, ikut terbaca di sini
+    while secure.recv(65536):
+        pass
+    new_session = secure.session
+    secure.close()
+    return handshake, new_session, reused
+
+
+def worker(context, args, resume, hasil):
+    session = None
+    for _ in range(args.count // args.threads):
+        try:
+            handshake, new_session, reused = one_request(context, args.host, args.port, session)
+        except OSError:
+            hasil.append((None, False))
+            continue
+        hasil.append((handshake, reused))
+        if resume:
+            session = new_session
+
+
+def percentile(data, p):
+    return data[min(len(data) - 1, int(len(data) * p / 100))]
+
+
+def run(args, mode):
+    context = client_context(args.tls)
+    hasil = []
+    threads = [threading.Thread(target=worker, args=(context, args, mode == 'resume', hasil))
+               for _ in range(args.threads)]
+    mulai = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    durasi = time.perf_counter() - mulai
+    latensi = sorted(h for h, _ in hasil if h is not None)
+    gagal = sum(1 for h, _ in hasil if h is None)
+    reused = sum(1 for _, r in hasil if r)
+    if not latensi:
+        print(f"{mode:<7} semua koneksi gagal")
+        return
+    print(f"{mode:<7} {len(latensi):>6} {len(latensi) / durasi:>9.1f}/s "
+          f"p50 {percentile(latensi, 50) * 1000:6.2f}ms p90 {percentile(latensi, 90) * 1000:6.2f}ms "
+          f"p99 {percentile(latensi, 99) * 1000:6.2f}ms reused {reused:>6} gagal {gagal}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='benchmark handshake TLS')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument('--count', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--tls', choices=('1.2', '1.3'), default='1.3')
+    parser.add_argument('--mode', choices=('full', 'resume', 'both'), default='both')
+    args = parser.parse_args(argv)
+    print(f"TLS {args.tls} ke {args.host}:{args.port}, {args.count} koneksi, {args.threads} thread")
+    for mode in (('full', 'resume') if args.mode == 'both' else (args.mode,)):
+        run(args, mode)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
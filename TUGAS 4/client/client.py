@@ -1,123 +1,89 @@
-import socket
-import ssl
 import os
+import sys
 import logging
+from http_client import HttpClient, DEFAULT_SERVER, DEFAULT_SECURE
 
-# Server Address (gunakan salah satu)
-# server_address = ('172.16.16.101', 8885)  # Thread Pool
-server_address = ('172.16.16.101', 8889)  # Process Pool
-
-def make_socket(addr, port):
-    try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.connect((addr, port))
-        return sock
-    except Exception as e:
-        logging.warning(f"Socket error: {e}")
-        return None
-
-def make_secure_socket(addr, port):
-    try:
-        context = ssl.create_default_context()
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-        context.load_verify_locations(os.getcwd() + '/domain.crt')
-        raw_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        raw_sock.connect((addr, port))
-        return context.wrap_socket(raw_sock, server_hostname=addr)
-    except Exception as e:
-        logging.warning(f"Secure socket error: {e}")
-        return None
-
-def read_http_response(sock):
-    buffer = b""
-    while b"\r\n\r\n" not in buffer:
-        data = sock.recv(1024)
-        if not data:
-            break
-        buffer += data
-
-    if b"\r\n\r\n" not in buffer:
-        return "Invalid HTTP response"
-
-    header_part, body = buffer.split(b"\r\n\r\n", 1)
-    headers = header_part.decode().split("\r\n")
-    content_length = 0
-    for line in headers:
-        if line.lower().startswith("content-length:"):
-            content_length = int(line.split(":")[1].strip())
-
-    # Read remaining body if content-length > len(body)
-    while len(body) < content_length:
-        data = sock.recv(1024)
-        if not data:
-            break
-        body += data
-
-    return header_part.decode() + "\r\n\r\n" + body.decode(errors='ignore')
-
-def send_request(request_str, secure=False):
-    sock = make_secure_socket(*server_address) if secure else make_socket(*server_address)
-    if not sock:
-        print("Gagal membuat koneksi.")
-        return
-    try:
-        sock.sendall(request_str.encode())
-        response = read_http_response(sock)
-        print("\n--- Response dari Server ---\n")
-        print(response)
-    except Exception as e:
-        logging.warning(f"Error receiving data: {e}")
-    finally:
-        sock.close()
-
-def list_files():
-    req = "GET /list HTTP/1.0\r\n\r\n"
-    send_request(req)
-
-def upload_file():
+# Server Address (gunakan salah satu), atau lewat argumen / environment:
+#   python client.py 172.16.16.101:8885          # Thread Pool
+#   python client.py 172.16.16.101:8889          # Process Pool
+#   HTTP_SECURE=1 python client.py host:8443     # TLS
+server_address = DEFAULT_SERVER
+
+
+def show(response):
+    print("\n--- Response dari Server ---\n")
+    print(f"{response.status} {response.reason}")
+    for k, v in response.headers.items():
+        print(f"{k}: {v}")
+    print()
+    print(response.text())
+
+
+def list_files(client):
+    show(client.request('GET', '/list'))
+
+
+def upload_file(client):
     filename = input("Masukkan nama file yang akan diupload: ").strip()
     if not os.path.exists(filename):
         print("File tidak ditemukan.")
         return
-    with open(filename, 'r') as f:
-        content = f.read()
-    req = (
-        f"POST /upload/{filename} HTTP/1.0\r\n"
-        f"Content-Length: {len(content.encode())}\r\n"
-        f"Content-Type: text/plain\r\n"
-        f"\r\n"
-        f"{content}"
-    )
-    send_request(req)
-
-def delete_file():
+    show(client.upload(filename))
+
+
+def download_file(client):
+    filename = input("Masukkan nama file yang akan didownload: ").strip()
+    response = client.download(filename)
+    if response.status == 200:
+        print(f"Tersimpan di {os.path.basename(filename)} ({os.path.getsize(os.path.basename(filename))} bytes)")
+    else:
+        print(f"{response.status} {response.reason}")
+
+
+def delete_file(client):
     filename = input("Masukkan nama file yang akan dihapus: ").strip()
-    req = f"GET /delete/{filename} HTTP/1.0\r\n\r\n"
-    send_request(req)
+    show(client.delete(filename))
+
+
+def upload_many(client):
+    filenames = input("Masukkan nama-nama file (pisahkan dengan spasi): ").split()
+    hasil = client.batch([('upload', filename) for filename in filenames])
+    for filename, response in zip(filenames, hasil):
+        if isinstance(response, Exception):
+            print(f"{filename}: gagal ({response})")
+        else:
+            print(f"{filename}: {response.status} {response.text()}")
+
 
 def main():
+    address = sys.argv[1] if len(sys.argv) > 1 else server_address
+    client = HttpClient(address, secure=DEFAULT_SECURE)
+    menu = [
+        ("List Semua File", list_files),
+        ("Upload File", upload_file),
+        ("Download File", download_file),
+        ("Hapus File", delete_file),
+        ("Upload Banyak File Sekaligus", upload_many),
+    ]
     while True:
-        print("\n=== MENU ===")
-        print("1. List Semua File")
-        print("2. Upload File")
-        print("3. Hapus File")
-        print("4. EXIT")
+        print(f"\n=== MENU ({address}) ===")
+        for i, (judul, _) in enumerate(menu, 1):
+            print(f"{i}. {judul}")
+        print(f"{len(menu) + 1}. EXIT")
         try:
-            pilihan = int(input("Pilih opsi (1-4): "))
-            if pilihan == 1:
-                list_files()
-            elif pilihan == 2:
-                upload_file()
-            elif pilihan == 3:
-                delete_file()
-            elif pilihan == 4:
+            pilihan = int(input(f"Pilih opsi (1-{len(menu) + 1}): "))
+            if 1 <= pilihan <= len(menu):
+                menu[pilihan - 1][1](client)
+            elif pilihan == len(menu) + 1:
                 print("Terima kasih. Keluar.")
                 break
             else:
                 print("Pilihan tidak valid.")
         except ValueError:
             print("Input harus berupa angka.")
+        except OSError as e:
+            logging.warning(f"Gagal berkomunikasi dengan server: {e}")
+    client.close()
 
 if __name__ == "__main__":
     main()
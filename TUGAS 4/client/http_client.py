@@ -0,0 +1,335 @@
+import os
+import ssl
+import json
+import time
+import socket
+import threading
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+
+# === Konfigurasi client (bisa diubah lewat environment) ===
+# alamat server dalam bentuk host:port
+DEFAULT_SERVER = os.getenv("HTTP_SERVER", '172.16.16.101:8889')
+DEFAULT_SECURE = os.getenv("HTTP_SECURE", '0') == '1'
+POOL_SIZE = int(os.getenv("HTTP_CLIENT_POOL", 8))
+TIMEOUT = float(os.getenv("HTTP_CLIENT_TIMEOUT", 30))
+# koneksi idle lebih lama dari ini tidak dipakai lagi (server menutupnya setelah 5 detik)
+IDLE_TIMEOUT = float(os.getenv("HTTP_CLIENT_IDLE_TIMEOUT", 4))
+RECV_SIZE = 65536
+MAX_HEADER_SIZE = 64 * 1024
+
+
+def parse_endpoint(value):
+    """'host:port' -> (host, port)."""
+    host, _, port = value.rpartition(':')
+    return host or 'localhost', int(port)
+
+
+class HttpError(Exception):
+    pass
+
+
+class Response:
+    __slots__ = ('status', 'reason', 'headers', 'body', 'keep_alive')
+
+    def __init__(self, status, reason, headers):
+        self.status = status
+        self.reason = reason
+        # nama header lowercase -> nilai
+        self.headers = headers
+        self.body = b''
+        self.keep_alive = True
+
+    def text(self):
+        return self.body.decode(errors='replace')
+
+    def json(self):
+        return json.loads(self.body)
+
+    def __repr__(self):
+        return f"<Response {self.status} {self.reason} {len(self.body)} bytes>"
+
+
+class Connection:
+    """Satu koneksi keep-alive ke server beserta buffer baca miliknya."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = bytearray(RECV_SIZE)
+        self.view = memoryview(self.buffer)
+        self.pending = bytearray()
+        self.idle_since = time.monotonic()
+        self.requests = 0
+
+    def fill(self):
+        n = self.sock.recv_into(self.buffer)
+        if not n:
+            raise ConnectionResetError('server menutup koneksi')
+        self.pending += self.view[:n]
+
+    def read_until(self, delimiter):
+        while True:
+            end = self.pending.find(delimiter)
+            if end >= 0:
+                hasil = bytes(self.pending[:end])
+                del self.pending[:end + len(delimiter)]
+                return hasil
+            if len(self.pending) > MAX_HEADER_SIZE:
+                raise HttpError('header respon terlalu besar')
+            self.fill()
+
+    def read_body(self, count, write):
+        """Teruskan `count` byte (None: sampai koneksi ditutup) ke write()."""
+        if self.pending:
+            n = len(self.pending) if count is None else min(count, len(self.pending))
+            write(bytes(self.pending[:n]))
+            del self.pending[:n]
+            if count is not None:
+                count -= n
+        while count is None or count > 0:
+            try:
+                n = self.sock.recv_into(self.buffer, RECV_SIZE if count is None else min(count, RECV_SIZE))
+            except ConnectionResetError:
+                n = 0
+            if not n:
+                if count is None:
+                    return
+                raise ConnectionResetError('respon terpotong')
+            write(self.view[:n])
+            if count is not None:
+                count -= n
+
+    def close(self):
+        self.sock.close()
+
+
+class HttpClient:
+    """
+    Client HTTP/1.1 untuk server-server di repo ini. Koneksi keep-alive
+    disimpan di pool dan dipakai ulang antar request (aman dipakai dari
+    banyak thread); untuk TLS, session koneksi sebelumnya diserahkan ke
+    koneksi baru sehingga handshake berikutnya cukup resumption. Upload
+    dikirim langsung dari file dengan sendfile dan download ditulis ke disk
+    per potongan, jadi ukuran file tidak dibatasi memori.
+    """
+
+    def __init__(self, server=DEFAULT_SERVER, secure=DEFAULT_SECURE, cafile=None,
+                 pool_size=POOL_SIZE, timeout=TIMEOUT):
+        self.address = parse_endpoint(server) if isinstance(server, str) else tuple(server)
+        self.secure = secure
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.idle = []
+        self.lock = threading.Lock()
+        self.session = None
+        self.context = None
+        if secure:
+            self.context = ssl.create_default_context()
+            # sertifikat server self-signed (certs/domain.crt) dan tanpa subjectAltName
+            self.context.check_hostname = False
+            self.context.verify_mode = ssl.CERT_NONE
+            if cafile is None:
+                cafile = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'domain.crt')
+            if os.path.exists(cafile):
+                self.context.load_verify_locations(cafile)
+        self.connects = 0
+        self.reused = 0
+        self.resumed = 0
+
+    # === pool koneksi ===
+
+    def connect(self):
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.context is not None:
+            try:
+                sock = self.context.wrap_socket(sock, server_hostname=self.address[0], session=self.session)
+            except (ssl.SSLError, OSError):
+                sock.close()
+                raise
+            with self.lock:
+                self.session = sock.session
+                if sock.session_reused:
+                    self.resumed += 1
+        with self.lock:
+            self.connects += 1
+        return Connection(sock)
+
+    def acquire(self):
+        batas = time.monotonic() - IDLE_TIMEOUT
+        with self.lock:
+            while self.idle:
+                conn = self.idle.pop()
+                if conn.idle_since >= batas:
+                    self.reused += 1
+                    return conn, True
+                conn.close()
+        return self.connect(), False
+
+    def release(self, conn, reusable):
+        if reusable and not conn.pending:
+            conn.idle_since = time.monotonic()
+            if self.context is not None:
+                # ticket TLS 1.3 baru tersedia setelah ada data dari server
+                with self.lock:
+                    self.session = conn.sock.session
+            with self.lock:
+                if len(self.idle) < self.pool_size:
+                    self.idle.append(conn)
+                    return
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # === request ===
+
+    def request(self, method, path, body=b'', headers=None, sink=None):
+        """
+        Kirim satu request. `body` berupa bytes atau file biner terbuka
+        (dikirim dengan sendfile); jika `sink` diberikan (file biner terbuka)
+        body respon ditulis ke sana dan Response.body kosong.
+        """
+        head = [f"{method} {path} HTTP/1.1\r\n", f"Host: {self.address[0]}\r\n"]
+        for k, v in (headers or {}).items():
+            head.append(f"{k}: {v}\r\n")
+        if type(body) is bytes:
+            length = len(body)
+            start = 0
+        else:
+            start = body.tell()
+            length = os.fstat(body.fileno()).st_size - start
+        if length or method in ('POST', 'PUT'):
+            head.append(f"Content-Length: {length}\r\n")
+        head.append("\r\n")
+        head = ''.join(head).encode()
+
+        for attempt in range(2):
+            conn, reused = self.acquire()
+            received = False
+            try:
+                if type(body) is bytes:
+                    conn.sock.sendall(head + body if len(body) < RECV_SIZE else head)
+                    if len(body) >= RECV_SIZE:
+                        conn.sock.sendall(body)
+                else:
+                    body.seek(start)
+                    conn.sock.sendall(head)
+                    if length:
+                        conn.sock.sendfile(body, start, length)
+                conn.fill()
+                received = True
+                hasil = self.read_response(conn, method, sink)
+            except (OSError, HttpError):
+                conn.close()
+                # koneksi dari pool sudah ditutup server sebelum menjawab: ulangi sekali
+                if reused and not received and attempt == 0:
+                    continue
+                raise
+            conn.requests += 1
+            self.release(conn, hasil.keep_alive)
+            return hasil
+
+    def read_response(self, conn, method, sink):
+        lines = conn.read_until(b"\r\n\r\n").decode('iso-8859-1').split("\r\n")
+        parts = lines[0].split(' ', 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+            raise HttpError(f"status line tidak valid: {lines[0]!r}")
+        headers = {}
+        for line in lines[1:]:
+            k, sep, v = line.partition(':')
+            if sep:
+                headers[k.strip().lower()] = v.strip()
+        hasil = Response(int(parts[1]), parts[2] if len(parts) > 2 else '', headers)
+        connection = headers.get('connection', '').lower()
+        hasil.keep_alive = 'close' not in connection if parts[0] == 'HTTP/1.1' else 'keep-alive' in connection
+        if method == 'HEAD' or hasil.status in (204, 304) or 100 <= hasil.status < 200:
+            return hasil
+
+        chunks = []
+        write = sink.write if sink is not None else (lambda data: chunks.append(bytes(data)))
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            while True:
+                size = int(conn.read_until(b"\r\n").split(b';', 1)[0], 16)
+                if not size:
+                    break
+                conn.read_body(size, write)
+                conn.read_until(b"\r\n")
+            while conn.read_until(b"\r\n"):
+                pass
+        elif 'content-length' in headers:
+            conn.read_body(int(headers['content-length']), write)
+        else:
+            conn.read_body(None, write)
+            hasil.keep_alive = False
+        hasil.body = b''.join(chunks)
+        return hasil
+
+    # === operasi file server ===
+
+    def list(self, fmt='text', offset=None, limit=None):
+        """Daftar file; fmt='json' mengembalikan dict (nama, size, mtime, type)."""
+        query = [f"format={fmt}"] if fmt != 'text' else []
+        if offset is not None:
+            query.append(f"offset={offset}")
+        if limit is not None:
+            query.append(f"limit={limit}")
+        respon = self.request('GET', '/list' + ('?' + '&'.join(query) if query else ''))
+        if respon.status != 200:
+            raise HttpError(f"list gagal: {respon.status} {respon.text()}")
+        return respon.json() if fmt == 'json' else respon.text().split('\n')
+
+    def upload(self, filename, remote_name=None):
+        """Upload file lokal (biner) tanpa membacanya ke memori."""
+        remote_name = remote_name or os.path.basename(filename)
+        with open(filename, 'rb') as f:
+            return self.request('POST', '/upload/' + quote(remote_name), f,
+                                {'Content-Type': 'application/octet-stream'})
+
+    def download(self, remote_name, filename=None):
+        """Download ke file lokal per potongan; file ditulis atomik lewat nama sementara."""
+        filename = filename or os.path.basename(remote_name)
+        temp = filename + '.part'
+        try:
+            with open(temp, 'wb') as f:
+                respon = self.request('GET', '/' + quote(remote_name), sink=f)
+        except BaseException:
+            # koneksi putus atau respon rusak: potongan yang sudah ditulis dibuang
+            os.remove(temp)
+            raise
+        if respon.status == 200:
+            os.replace(temp, filename)
+        else:
+            os.remove(temp)
+        return respon
+
+    def delete(self, remote_name):
+        return self.request('GET', '/delete/' + quote(remote_name))
+
+    def batch(self, operations, workers=None):
+        """
+        Jalankan banyak operasi bersamaan lewat pool koneksi. `operations`
+        berisi tuple seperti ('list',), ('upload', path), ('download', nama),
+        ('delete', nama). Hasilnya list berurutan: Response/hasil operasi,
+        atau exception jika operasi itu gagal.
+        """
+        def run(op):
+            try:
+                return getattr(self, op[0])(*op[1:])
+            except Exception as e:
+                return e
+        with ThreadPoolExecutor(max_workers=workers or self.pool_size) as executor:
+            return list(executor.map(run, operations))
+
+    def stats(self):
+        return {'connects': self.connects, 'reused': self.reused, 'tls_resumed': self.resumed,
+                'idle': len(self.idle)}
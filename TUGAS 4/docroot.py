@@ -0,0 +1,151 @@
+import os
+import stat
+import time
+import posixpath
+import mimetypes
+import threading
+from static_cache import make_etag
+
+# === Konfigurasi document root (bisa diubah lewat environment) ===
+DOCUMENT_ROOT = os.getenv("HTTP_DOCUMENT_ROOT", '.')
+# metadata di index dipercaya selama ini (detik) sebelum di-stat ulang;
+# perubahan lewat /upload dan /delete langsung masuk index
+REVALIDATE_AFTER = float(os.getenv("HTTP_DOCROOT_REVALIDATE", 1))
+# direktori yang tidak diindeks, tidak dilayani, dan tidak bisa ditulis lewat upload
+SKIP_DIRS = frozenset(('__pycache__', '.git', 'certs'))
+# file milik server sendiri (kode, kunci/sertifikat TLS, skrip) juga tidak
+PRIVATE_SUFFIXES = ('.py', '.pyc', '.key', '.pem', '.crt', '.sh')
+
+
+def normalize(name):
+    """
+    Nama file relatif dalam bentuk normal ('a/./b' -> 'a/b'), atau None jika
+    nama keluar dari document root ('..', path absolut, NUL, backslash).
+    """
+    if not name or '\0' in name or '\\' in name or name.startswith('/'):
+        return None
+    norm = posixpath.normpath(name)
+    if norm == '..' or norm.startswith('../') or norm == '.':
+        return None
+    return norm
+
+
+def excluded(name, is_dir=False):
+    """
+    True jika `name` (relatif, sudah dinormalisasi) tidak boleh dilayani,
+    didaftar, dihapus, maupun ditulis: di dalam SKIP_DIRS, nama berawalan
+    titik (termasuk file sementara upload), atau file milik server.
+    """
+    segments = name.split('/')
+    if any(s in SKIP_DIRS or s.startswith('.') for s in (segments if is_dir else segments[:-1])):
+        return True
+    return not is_dir and (segments[-1].startswith('.') or segments[-1].endswith(PRIVATE_SUFFIXES))
+
+
+class DocEntry:
+    __slots__ = ('name', 'path', 'st', 'size', 'mtime', 'content_type', 'etag', 'checked')
+
+    def __init__(self, name, path, st, content_type):
+        self.name = name
+        self.path = path
+        self.st = st
+        self.size = st.st_size
+        self.mtime = int(st.st_mtime)
+        self.content_type = content_type
+        self.etag = make_etag(st)
+        self.checked = time.monotonic()
+
+
+class DocumentRoot:
+    """
+    Index semua file di bawah document root, dibangun sekali saat start
+    dengan satu penelusuran os.scandir. Setiap entri menyimpan path, hasil
+    stat, content type (mimetypes), dan ETag sehingga request file statis
+    cukup satu lookup dict. Entri di-stat ulang paling sering sekali per
+    REVALIDATE_AFTER detik agar perubahan dari luar server tetap terlihat;
+    nama yang belum ada di index dicek ke disk sekali lalu ditambahkan.
+    Nama yang keluar dari root ditolak (PermissionError) sebelum disentuh;
+    nama yang excluded() tidak pernah masuk index.
+    """
+
+    def __init__(self, root=DOCUMENT_ROOT, types=None):
+        self.root = os.path.realpath(root)
+        # tipe eksplisit per ekstensi, didahulukan dari mimetypes
+        self.types = dict(types or {})
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.scan()
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def content_type(self, filename):
+        ext = os.path.splitext(filename)[1]
+        kind = self.types.get(ext)
+        if kind is None:
+            kind = mimetypes.guess_type('x' + ext)[0] or 'application/octet-stream'
+            # hasil mimetypes disimpan per ekstensi
+            self.types[ext] = kind
+        return kind
+
+    def scan(self):
+        entries = {}
+        stack = ['']
+        while stack:
+            prefix = stack.pop()
+            try:
+                it = os.scandir(self.path(prefix) if prefix else self.root)
+            except OSError:
+                continue
+            with it:
+                for item in it:
+                    name = prefix + item.name
+                    if item.is_dir(follow_symlinks=False):
+                        if not excluded(name, True):
+                            stack.append(name + '/')
+                    elif item.is_file() and not excluded(name):
+                        if item.is_symlink() and not os.path.realpath(item.path).startswith(self.root + os.sep):
+                            continue
+                        st = item.stat()
+                        entries[name] = DocEntry(name, item.path, st, self.content_type(item.name))
+        with self.lock:
+            self.entries = entries
+        return len(entries)
+
+    def lookup(self, name):
+        """DocEntry untuk `name`, None jika tidak ada; PermissionError jika keluar dari root."""
+        entry = self.entries.get(name)
+        if entry is not None and time.monotonic() - entry.checked < REVALIDATE_AFTER:
+            return entry
+        norm = normalize(name)
+        if norm is None:
+            raise PermissionError(name)
+        return self.refresh(norm)
+
+    def refresh(self, name):
+        """Stat ulang `name` (sudah dinormalisasi) dan perbarui index."""
+        path = self.path(name)
+        if excluded(name):
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            self.remove(name)
+            return None
+        old = self.entries.get(name)
+        if old is not None and (old.st.st_mtime_ns, old.st.st_size, old.st.st_ino) == (st.st_mtime_ns, st.st_size, st.st_ino):
+            old.checked = time.monotonic()
+            return old
+        if old is None and not os.path.realpath(path).startswith(self.root + os.sep):
+            # symlink yang menunjuk ke luar document root
+            raise PermissionError(name)
+        entry = DocEntry(name, path, st, self.content_type(name))
+        with self.lock:
+            self.entries[name] = entry
+        return entry
+
+    def remove(self, name):
+        with self.lock:
+            self.entries.pop(name, None)
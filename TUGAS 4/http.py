@@ -1,8 +1,219 @@
 import os
-from glob import glob
-from datetime import datetime
+import uuid
+import tempfile
+import time
+from urllib.parse import parse_qs
+from email.utils import formatdate, parsedate_to_datetime
+from http_parser import RequestParser, HttpParseError
+from router import Router
+from metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from static_cache import StaticCache, ListingCache, make_etag, http_date, choose_encoding
+from docroot import DocumentRoot, normalize, excluded, DOCUMENT_ROOT
+from shm_cache import shared_cache
+
+# batas jumlah range per request; lebih dari ini Range diabaikan (kirim utuh)
+MAX_RANGES = 16
+# upload ditulis ke disk dalam potongan berukuran tetap
+UPLOAD_CHUNK = int(os.getenv("HTTP_UPLOAD_CHUNK", 1024 * 1024))
+
+
+def parse_range(value, size):
+    """
+    Parse header `Range: bytes=...` untuk file berukuran `size`.
+    Mengembalikan list (start, end) inklusif, [] jika tidak ada range yang
+    bisa dipenuhi (416), atau None jika header tidak valid dan harus diabaikan.
+    """
+    unit, _, spec = value.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec:
+        return None
+    hasil = []
+    specs = spec.split(',')
+    if len(specs) > MAX_RANGES:
+        return None
+    for item in specs:
+        start, sep, end = item.strip().partition('-')
+        if not sep:
+            return None
+        try:
+            if start == '':
+                # suffix range: N byte terakhir
+                n = int(end)
+                if n < 0:
+                    return None
+                if n == 0 or size == 0:
+                    continue
+                hasil.append((max(size - n, 0), size - 1))
+                continue
+            start = int(start)
+            end = int(end) if end != '' else None
+        except ValueError:
+            return None
+        if start < 0 or (end is not None and end < start):
+            return None
+        if start >= size:
+            continue
+        if end is None:
+            end = size - 1
+        hasil.append((start, min(end, size - 1)))
+    return hasil
+
+
+# blok header statis, dirender sekali saja
+SERVER_HEADER = b"Server: myserver/1.0\r\n"
+CONNECTION_KEEP_ALIVE = b"Connection: keep-alive\r\n"
+CONNECTION_CLOSE = b"Connection: close\r\n"
+_status_lines = {}
+# baris header yang sering berulang (Content-Type, Keep-Alive, ...)
+_header_lines = {}
+HEADER_CACHE_SIZE = 1024
+# (detik, b"Date: ...\r\n"); diganti utuh sehingga aman dibaca antar thread
+_date_cache = (0, b"")
+
+
+def status_line(kode, message):
+    line = _status_lines.get((kode, message))
+    if line is None:
+        line = _status_lines[(kode, message)] = f"HTTP/1.1 {kode} {message}\r\n".encode()
+    return line
+
+
+def header_line(k, v):
+    line = _header_lines.get((k, v))
+    if line is None:
+        line = f"{k}: {v}\r\n".encode()
+        if len(_header_lines) < HEADER_CACHE_SIZE:
+            _header_lines[(k, v)] = line
+    return line
+
+
+def date_header():
+    """Header Date format RFC 7231, diformat ulang paling banyak sekali per detik."""
+    global _date_cache
+    now = int(time.time())
+    if _date_cache[0] != now:
+        _date_cache = (now, f"Date: {formatdate(now, usegmt=True)}\r\n".encode())
+    return _date_cache[1]
+
+
+class Response:
+    """
+    Satu respon HTTP; header Connection baru ditentukan saat dirender.
+    Body berupa bytes (atau memoryview ke shared memory), atau file terbuka (`file`) beserta daftar potongan
+    (`parts`) yang dikirim server langsung dari disk dengan sendfile tanpa
+    disalin ke memori.
+    """
+
+    def __init__(self, kode=404, message='Not Found', messagebody=bytes(), headers=None):
+        if type(messagebody) is not bytes and type(messagebody) is not memoryview:
+            messagebody = str(messagebody).encode()
+        self.kode = kode
+        self.message = message
+        self.headers = dict(headers or {})
+        # blok header yang sudah dirender (mis. dari StaticCache)
+        self.raw_headers = bytes()
+        self.body = messagebody
+        self.file = None
+        self.parts = None
+        self.keep_alive = False
+        # respon untuk HEAD: header lengkap (termasuk Content-Length) tanpa body
+        self.head = False
+        # Content-Length eksplisit untuk respon tanpa body (mis. HEAD yang diteruskan proxy)
+        self.length = None
+        # label route untuk metrics (nama handler), diisi HttpServer.handle
+        self.route = '-'
+
+    def set_file(self, f, offset=0, count=None):
+        if count is None:
+            count = os.fstat(f.fileno()).st_size - offset
+        self.set_parts(f, [(offset, count)])
+
+    def set_parts(self, f, parts):
+        """Body dari potongan `parts`: bytes atau tuple (offset, count) di dalam f."""
+        self.file = f
+        self.parts = parts
+        self.body = bytes()
+
+    def content_length(self):
+        if self.length is not None:
+            return self.length
+        if self.parts is None:
+            return len(self.body)
+        return sum(part[1] if type(part) is tuple else len(part) for part in self.parts)
+
+    def body_parts(self):
+        """Potongan body: bytes, atau tuple (offset, count) di dalam self.file."""
+        if self.head:
+            return []
+        if self.parts is not None:
+            return self.parts
+        return [self.body] if self.body else []
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+    def header_bytes(self):
+        resp = [
+            status_line(self.kode, self.message),
+            date_header(),
+            CONNECTION_KEEP_ALIVE if self.keep_alive else CONNECTION_CLOSE,
+            SERVER_HEADER,
+        ]
+        if self.kode != 304:
+            resp.append(b"Content-Length: %d\r\n" % self.content_length())
+        for k, v in self.headers.items():
+            resp.append(header_line(k, v))
+        resp.append(self.raw_headers)
+        resp.append(b"\r\n")
+        return b''.join(resp)
+
+    def to_bytes(self):
+        """Render lengkap ke satu buffer (membaca file jika body berupa file)."""
+        hasil = [self.header_bytes()]
+        for part in self.body_parts():
+            if type(part) is tuple:
+                part = os.pread(self.file.fileno(), part[1], part[0])
+            hasil.append(part)
+        self.close()
+        return b''.join(hasil)
+
+
+class UploadFile:
+    """
+    Body upload yang dialirkan langsung ke file sementara di direktori
+    tujuan, lalu dipindah atomik dengan os.replace saat request selesai.
+    Memori yang dipakai konstan sebesar UPLOAD_CHUNK berapa pun ukuran file.
+    """
+
+    def __init__(self, filename):
+        directory = os.path.dirname(filename) or '.'
+        fd, self.temp = tempfile.mkstemp(prefix='.upload-', dir=directory)
+        # mkstemp membuat file 0600; samakan dengan file yang dibuat open()
+        os.fchmod(fd, 0o644)
+        self.file = os.fdopen(fd, 'wb', buffering=UPLOAD_CHUNK)
+        self.size = 0
+
+    def write(self, data):
+        self.file.write(data)
+        self.size += len(data)
+
+    def commit(self, filename):
+        self.file.close()
+        os.replace(self.temp, filename)
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.temp)
+        except FileNotFoundError:
+            pass
+
 
 class HttpServer:
+    # route didaftarkan dengan decorator di bawah; handler dipanggil sebagai
+    # handler(self, request, sisa_path)
+    routes = Router()
+
     def __init__(self):
         self.sessions = {}
         self.types = {
@@ -11,88 +222,331 @@ class HttpServer:
             '.txt': 'text/plain',
             '.html': 'text/html'
         }
+        # worker server berbasis proses berbagi isi file lewat shared memory
+        self.cache = StaticCache(shared=shared_cache())
+        # kode server, kunci TLS, dan file tersembunyi tidak ikut didaftar
+        self.listings = ListingCache(hidden=excluded)
+        # index document root: satu os.scandir saat start, lalu lookup dict
+        self.docroot = DocumentRoot(DOCUMENT_ROOT, self.types)
 
     def response(self, kode=404, message='Not Found', messagebody=bytes(), headers={}):
-        tanggal = datetime.now().strftime('%c')
-        resp = [
-            f"HTTP/1.0 {kode} {message}\r\n",
-            f"Date: {tanggal}\r\n",
-            "Connection: close\r\n",
-            "Server: myserver/1.0\r\n",
-            f"Content-Length: {len(messagebody)}\r\n"
-        ] + [f"{k}:{v}\r\n" for k, v in headers.items()] + ["\r\n"]
-
-        if type(messagebody) is not bytes:
-            messagebody = messagebody.encode()
+        return Response(kode, message, messagebody, headers)
 
-        return ''.join(resp).encode() + messagebody
+    @staticmethod
+    def wants_keep_alive(version, headers):
+        # HTTP/1.1 persistent secara default, HTTP/1.0 hanya jika diminta
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.1':
+            return 'close' not in connection
+        return 'keep-alive' in connection
 
     def proses(self, data):
+        """Proses satu request lengkap (str/bytes), hasilnya objek Response."""
+        if type(data) is str:
+            data = data.encode()
         try:
-            header_part, body_part = data.split("\r\n\r\n", 1)
-        except ValueError:
+            requests = RequestParser(body_sink=self.body_sink).feed(data)
+        except HttpParseError as e:
+            return self.response(e.kode, e.message, e.message, {})
+        if not requests:
             return self.response(400, 'Bad Request', 'Invalid HTTP format', {})
+        return self.handle(requests[0])
 
-        lines = header_part.split("\r\n")
-        if not lines:
-            return self.response(400, 'Bad Request', '', {})
+    def find_handler(self, method, path):
+        """(handler, sisa_path, route); handler None jika method tidak didukung."""
+        route, rest = self.routes.match(path)
+        if route is None:
+            return None, None, None
+        handler = route.handlers.get(method)
+        if handler is None and method == 'HEAD' and route.safe:
+            handler = route.handlers.get('GET')
+        return handler, rest, route
+
+    def upload_target(self, method, path):
+        handler, filename, route = self.find_handler(method, path)
+        if handler is HttpServer.http_upload and filename:
+            name = normalize(filename)
+            # nama di luar document root atau yang dilindungi tidak dialirkan
+            # ke disk (ditolak handler)
+            if name is None or excluded(name):
+                return None
+            return self.docroot.path(name)
+        return None
+
+    def body_sink(self, request):
+        """Dipanggil RequestParser: body upload langsung dialirkan ke disk."""
+        filename = self.upload_target(request.method, request.path)
+        if filename:
+            return UploadFile(filename)
+        return None
 
-        baris = lines[0]
-        all_headers = [n for n in lines[1:] if n != '']
+    def handle(self, request):
+        """Layani satu Request hasil RequestParser, hasilnya objek Response."""
+        mulai = time.perf_counter()
+        hasil = self.dispatch(request)
+        metrics.request(hasil.route, request.method, hasil.kode, time.perf_counter() - mulai)
+        return hasil
 
+    def dispatch(self, request):
+        if request.version not in ('HTTP/1.0', 'HTTP/1.1'):
+            return self.response(505, 'HTTP Version Not Supported', '', {})
+        name = 'not_found'
         try:
-            method, path, *_ = baris.split()
-            method = method.upper()
-            if method == 'GET':
-                return self.http_get(path, all_headers)
-            elif method == 'POST':
-                return self.http_post(path, all_headers, body_part)
+            handler, rest, route = self.find_handler(request.method, request.path)
+            if handler is not None:
+                name = handler.__name__
+                hasil = handler(self, request, rest)
             else:
-                return self.response(405, 'Method Not Allowed', '', {})
+                if isinstance(request.body, UploadFile):
+                    request.body.abort()
+                if route is None:
+                    hasil = self.response(404, 'Not Found', '', {})
+                else:
+                    name = 'method_not_allowed'
+                    hasil = self.response(405, 'Method Not Allowed', '', {'Allow': route.allowed()})
         except Exception as e:
-            return self.response(400, 'Bad Request', str(e), {})
-
-    def http_get(self, object_address, headers):
-        if object_address == '/':
-            return self.response(200, 'OK', 'Ini Adalah Web Server Percobaan', {})
-        if object_address == '/list':
-            files = os.listdir('./')
-            files_list = '\n'.join(files)
-            return self.response(200, 'OK', files_list, {'Content-Type': 'text/plain'})
-        if object_address.startswith('/delete/'):
-            filename = object_address.split('/delete/')[1]
-            if os.path.exists(filename):
-                os.remove(filename)
-                return self.response(200, 'OK', f"File '{filename}' deleted.", {'Content-Type': 'text/plain'})
-            else:
-                return self.response(404, 'Not Found', f"File '{filename}' tidak ditemukan", {'Content-Type': 'text/plain'})
+            hasil = self.response(400, 'Bad Request', str(e), {})
+            hasil.route = name
+            return hasil
+        hasil.route = name
+        hasil.head = request.method == 'HEAD'
+        hasil.keep_alive = self.wants_keep_alive(request.version, request.headers)
+        return hasil
+
+    @routes.get('/')
+    def http_index(self, request, rest):
+        return self.response(200, 'OK', 'Ini Adalah Web Server Percobaan', {})
+
+    def content_type(self, filename):
+        return self.docroot.content_type(filename)
+
+    @routes.get('/metrics')
+    def http_metrics(self, request, rest):
+        """Counter, gauge, dan histogram latensi proses ini dalam format Prometheus."""
+        return self.response(200, 'OK', metrics.render(),
+                             {'Content-Type': METRICS_CONTENT_TYPE, 'Cache-Control': 'no-store'})
+
+    @routes.get('/list')
+    def http_list(self, request, rest):
+        """
+        Daftar file direktori kerja. Query: format=json (atau Accept:
+        application/json) untuk nama, size, mtime, dan type tiap file;
+        offset= dan limit= untuk paginasi. Tanpa parameter hasilnya tetap
+        daftar nama dipisah baris baru.
+        """
+        params = parse_qs(request.query)
+        try:
+            offset = int(params.get('offset', ['0'])[0])
+            limit = int(params['limit'][0]) if 'limit' in params else None
+        except ValueError:
+            return self.response(400, 'Bad Request', 'offset/limit harus angka', {})
+        if offset < 0 or (limit is not None and limit < 0):
+            return self.response(400, 'Bad Request', 'offset/limit harus angka', {})
+        fmt = params.get('format', [''])[0]
+        if not fmt:
+            fmt = 'json' if 'application/json' in request.headers.get('accept', '') else 'text'
+        if fmt not in ('text', 'json'):
+            return self.response(400, 'Bad Request', f"Format '{fmt}' tidak dikenal", {})
+
+        listing = self.listings.get(self.docroot.root, self.content_type)
+        etag = listing.page_etag(fmt, offset, limit)
+        validators = {'ETag': 'W/' + etag, 'Last-Modified': listing.last_modified, 'Vary': 'Accept, Accept-Encoding'}
+        if self.not_modified(etag, listing.mtime, request.headers):
+            return self.response(304, 'Not Modified', bytes(), validators)
+        validators['Content-Type'] = 'application/json' if fmt == 'json' else 'text/plain'
+        body, encoding = listing.render(fmt, offset, limit, choose_encoding(request.headers.get('accept-encoding')))
+        if encoding is not None:
+            validators['Content-Encoding'] = encoding
+        return self.response(200, 'OK', body, validators)
 
-        filename = object_address.lstrip('/')
-        if not os.path.exists(filename):
+    # GET yang menghapus file: HEAD dijawab 405, bukan ikut menghapus
+    @routes.get('/delete/', prefix=True, safe=False)
+    def http_delete(self, request, filename):
+        try:
+            doc = self.docroot.lookup(filename)
+        except PermissionError:
+            return self.response(403, 'Forbidden', f"Path '{filename}' di luar document root", {'Content-Type': 'text/plain'})
+        try:
+            if doc is None:
+                raise FileNotFoundError(filename)
+            os.remove(doc.path)
+        except FileNotFoundError:
+            return self.response(404, 'Not Found', f"File '{filename}' tidak ditemukan", {'Content-Type': 'text/plain'})
+        self.docroot.remove(doc.name)
+        self.cache.invalidate(doc.path)
+        self.listings.invalidate(os.path.dirname(doc.path))
+        return self.response(200, 'OK', f"File '{filename}' deleted.", {'Content-Type': 'text/plain'})
+
+    @routes.get('/', prefix=True)
+    def http_get(self, request, filename):
+        """File statis; route prefix '/' menangkap semua path yang tidak punya route lain."""
+        headers = request.headers
+        try:
+            doc = self.docroot.lookup(filename)
+        except PermissionError:
+            return self.response(403, 'Forbidden', f"Path '{filename}' di luar document root", {})
+        if doc is None:
             return self.response(404, 'Not Found', f"File '{filename}' tidak ditemukan", {})
-        with open(filename, 'rb') as f:
-            content = f.read()
-        ext = os.path.splitext(filename)[1]
-        content_type = self.types.get(ext, 'application/octet-stream')
-        return self.response(200, 'OK', content, {'Content-Type': content_type})
-
-    def http_post(self, object_address, headers, body):
-        if object_address.startswith('/upload/'):
-            filename = object_address.split('/upload/')[1]
+        content_type = doc.content_type
+        filename = doc.path
+        try:
+            entry = self.cache.get(filename, content_type, doc.st)
+        except FileNotFoundError:
+            self.docroot.remove(doc.name)
+            return self.response(404, 'Not Found', f"File '{doc.name}' tidak ditemukan", {})
+        # varian gzip/deflate hanya untuk file teks yang tersimpan di cache;
+        # request Range selalu dilayani dari representasi asli
+        variant = None
+        if entry.compressible and 'range' not in headers:
+            encoding = choose_encoding(headers.get('accept-encoding'))
+            if encoding is not None:
+                variant = self.cache.variant(filename, entry, encoding)
+        etag = variant.etag if variant is not None else entry.etag
+        if self.not_modified(etag, entry.mtime, headers):
+            validators = {'ETag': etag, 'Last-Modified': entry.last_modified}
+            if entry.compressible:
+                validators['Vary'] = 'Accept-Encoding'
+            return self.response(304, 'Not Modified', bytes(), validators)
+        if variant is not None:
+            hasil = self.response(200, 'OK', variant.body, {})
+            hasil.raw_headers = variant.header_block
+            return hasil
+        if 'range' in headers:
+            hasil = self.http_get_range(filename, content_type, headers)
+            if hasil is not None:
+                return hasil
+        if entry.body is not None:
+            # file kecil: header dan body langsung dari cache, tanpa open/read
+            hasil = self.response(200, 'OK', entry.body, {})
+            hasil.raw_headers = entry.header_block
+            return hasil
+        # file besar tidak dibaca di sini; server mengirimnya dengan sendfile
+        try:
+            f = open(filename, 'rb')
+        except FileNotFoundError:
+            # dihapus dari luar server sebelum index sempat di-stat ulang
+            self.docroot.remove(doc.name)
+            return self.response(404, 'Not Found', f"File '{doc.name}' tidak ditemukan", {})
+        hasil = self.response(200, 'OK', bytes(), {})
+        hasil.raw_headers = entry.header_block
+        hasil.set_file(f)
+        return hasil
+
+    @staticmethod
+    def not_modified(etag, mtime, headers):
+        """Evaluasi If-None-Match / If-Modified-Since; True berarti kirim 304."""
+        if 'if-none-match' in headers:
+            value = headers['if-none-match'].strip()
+            if value == '*':
+                return True
+            # perbandingan lemah: prefix W/ diabaikan
+            tags = [t.strip() for t in value.split(',')]
+            return etag in [t[2:] if t.startswith('W/') else t for t in tags]
+        if 'if-modified-since' in headers:
             try:
-                with open(filename, 'w') as f:
-                    f.write(body)
-                return self.response(200, 'OK', f"File '{filename}' uploaded.", {'Content-Type': 'text/plain'})
-            except Exception as e:
-                return self.response(500, 'Internal Server Error', str(e), {})
-        return self.response(400, 'Bad Request', '', {})
+                return mtime <= parsedate_to_datetime(headers['if-modified-since']).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def if_range_matches(self, value, st):
+        # If-Range berisi ETag (harus sama persis) atau tanggal Last-Modified
+        if value.startswith('W/'):
+            return False
+        if value.startswith('"'):
+            return value == make_etag(st)
+        try:
+            return int(st.st_mtime) <= parsedate_to_datetime(value).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def http_get_range(self, filename, content_type, headers):
+        """
+        Respon 206 untuk header Range; potongan file dikirim langsung dari disk.
+        None jika request harus dilayani sebagai GET biasa (tanpa Range).
+        """
+        try:
+            f = open(filename, 'rb')
+        except OSError:
+            return None
+        st = os.fstat(f.fileno())
+        ranges = parse_range(headers['range'], st.st_size)
+        if ranges is None or ('if-range' in headers and not self.if_range_matches(headers['if-range'], st)):
+            f.close()
+            return None
+        if not ranges:
+            f.close()
+            return self.response(416, 'Range Not Satisfiable', '',
+                                 {'Content-Range': f'bytes */{st.st_size}', 'Accept-Ranges': 'bytes'})
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            hasil = self.response(206, 'Partial Content', bytes(), {
+                'Content-Type': content_type,
+                'Content-Range': f'bytes {start}-{end}/{st.st_size}',
+                'Accept-Ranges': 'bytes',
+                'ETag': make_etag(st),
+                'Last-Modified': http_date(st.st_mtime),
+            })
+            hasil.set_file(f, start, end - start + 1)
+            return hasil
+        # beberapa range: multipart/byteranges, tiap bagian tetap dari disk
+        boundary = uuid.uuid4().hex
+        parts = []
+        for start, end in ranges:
+            parts.append((f"\r\n--{boundary}\r\n"
+                          f"Content-Type: {content_type}\r\n"
+                          f"Content-Range: bytes {start}-{end}/{st.st_size}\r\n\r\n").encode())
+            parts.append((start, end - start + 1))
+        parts.append(f"\r\n--{boundary}--\r\n".encode())
+        hasil = self.response(206, 'Partial Content', bytes(), {
+            'Content-Type': f'multipart/byteranges; boundary={boundary}',
+            'Accept-Ranges': 'bytes',
+            'ETag': make_etag(st),
+            'Last-Modified': http_date(st.st_mtime),
+        })
+        hasil.set_parts(f, parts)
+        return hasil
+
+    @routes.post('/upload/', prefix=True)
+    def http_upload(self, request, filename):
+        """
+        POST/PUT /upload/<nama>. Body berupa UploadFile jika sudah dialirkan
+        ke disk oleh parser, atau bytes (body kosong / pemanggilan langsung).
+        """
+        body = request.body
+        name = normalize(filename) if filename else None
+        if name is None:
+            if isinstance(body, UploadFile):
+                body.abort()
+            if filename:
+                return self.response(403, 'Forbidden', f"Path '{filename}' di luar document root", {})
+            return self.response(400, 'Bad Request', '', {})
+        if excluded(name):
+            if isinstance(body, UploadFile):
+                body.abort()
+            return self.response(403, 'Forbidden', f"File '{filename}' tidak boleh ditulis", {})
+        target = self.docroot.path(name)
+        try:
+            if not isinstance(body, UploadFile):
+                upload = UploadFile(target)
+                upload.write(body)
+                body = upload
+            body.commit(target)
+            self.docroot.refresh(name)
+            self.cache.invalidate(target)
+            self.listings.invalidate(os.path.dirname(target))
+            return self.response(200, 'OK', f"File '{filename}' uploaded.", {'Content-Type': 'text/plain'})
+        except Exception as e:
+            if isinstance(body, UploadFile):
+                body.abort()
+            return self.response(500, 'Internal Server Error', str(e), {})
 
 if __name__=="__main__":
 	httpserver = HttpServer()
-	d = httpserver.proses('GET testing.txt HTTP/1.0')
-	print(d)
-	d = httpserver.proses('GET donalbebek.jpg HTTP/1.0')
-	print(d)
+	d = httpserver.proses('GET testing.txt HTTP/1.0\r\n\r\n')
+	print(d.to_bytes())
+	d = httpserver.proses('GET donalbebek.jpg HTTP/1.0\r\n\r\n')
+	print(d.to_bytes())
 	#d = httpserver.http_get('testing2.txt',{})
 	#print(d)
 #	d = httpserver.http_get('testing.txt')
@@ -0,0 +1,157 @@
+import os
+import ssl
+import time
+import socket
+import logging
+from http_parser import RequestParser, HttpParseError, abort_bodies
+from metrics import metrics
+from access_log import access_log
+
+# === Konfigurasi koneksi (bisa diubah lewat environment) ===
+# dibaca di satu tempat ini dan dipakai semua varian server
+KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 5))
+KEEPALIVE_MAX = int(os.getenv("HTTP_KEEPALIVE_MAX", 100))
+# batas request per koneksi selama ada koneksi lain yang menunggu worker (pool)
+BUSY_KEEPALIVE_MAX = int(os.getenv("HTTP_BUSY_KEEPALIVE_MAX", 16))
+# antrian koneksi yang belum di-accept (listen backlog)
+BACKLOG = int(os.getenv("HTTP_BACKLOG", 1024))
+# respon yang tidak bergerak terkirim selama ini dianggap macet (client
+# berhenti membaca) dan koneksinya ditutup
+WRITE_TIMEOUT = float(os.getenv("HTTP_WRITE_TIMEOUT", 30))
+RECV_SIZE = 65536
+# selang pemeriksaan antrian worker (busy()) saat koneksi pool menunggu request
+BUSY_POLL = 0.1
+CONTINUE = b"HTTP/1.1 100 Continue\r\n\r\n"
+
+
+def error_response(httpserver, e):
+    """Respon untuk HttpParseError; koneksi selalu ditutup setelahnya."""
+    return httpserver.response(e.kode, e.message, e.message, {'Content-Type': 'text/plain'})
+
+
+def finalize(hasil, served, max_requests=KEEPALIVE_MAX, timeout=KEEPALIVE_TIMEOUT):
+    """Tentukan apakah koneksi tetap dibuka setelah respon ke-`served`."""
+    if served >= max_requests:
+        hasil.keep_alive = False
+    if hasil.keep_alive:
+        hasil.headers['Keep-Alive'] = f"timeout={int(timeout)}, max={max_requests - served}"
+    return hasil
+
+
+def send_buffers(connection, buffers):
+    """
+    Kirim beberapa buffer sekaligus dengan sendmsg (writev) tanpa
+    menggabungkannya dulu. Socket TLS tidak punya sendmsg, jadi digabung.
+    """
+    if isinstance(connection, ssl.SSLSocket):
+        connection.sendall(b''.join(buffers))
+        return
+    views = [memoryview(b) for b in buffers if b]
+    while views:
+        sent = connection.sendmsg(views)
+        while sent:
+            if sent >= len(views[0]):
+                sent -= len(views.pop(0))
+            else:
+                views[0] = views[0][sent:]
+                sent = 0
+
+
+def send_response(connection, respon):
+    """
+    Kirim respon ke socket blocking. Header dan body bytes dikirim dalam satu
+    sendmsg; body file dikirim dengan socket.sendfile (os.sendfile di Linux)
+    sehingga isi file tidak pernah disalin ke memori proses.
+    Mengembalikan jumlah byte respon (header + body).
+    """
+    try:
+        buffers = [respon.header_bytes()]
+        total = len(buffers[0]) + (0 if respon.head else respon.content_length())
+        for part in respon.body_parts():
+            if type(part) is tuple:
+                send_buffers(connection, buffers)
+                buffers = []
+                offset, count = part
+                if count:
+                    connection.sendfile(respon.file, offset, count)
+            else:
+                buffers.append(part)
+        send_buffers(connection, buffers)
+        return total
+    finally:
+        respon.close()
+
+
+def serve_connection(connection, address, httpserver,
+                     timeout=KEEPALIVE_TIMEOUT, max_requests=KEEPALIVE_MAX, trace=False, busy=None):
+    """
+    Layani satu koneksi blocking: beberapa request boleh dikirim berurutan
+    (keep-alive) maupun sekaligus (pipelining); respon dikirim sesuai urutan.
+    Koneksi ditutup saat idle melebihi `timeout` atau setelah `max_requests`.
+    Dengan `trace=True` setiap request dicatat ke access log (asinkron).
+    `busy()` (server pool) True jika ada koneksi lain yang menunggu worker;
+    selama itu koneksi ditutup saat idle dan setelah BUSY_KEEPALIVE_MAX
+    request (Connection: close) agar worker tidak tertahan oleh satu client
+    keep-alive.
+    """
+    parser = RequestParser(body_sink=httpserver.body_sink)
+    # satu buffer besar per koneksi, diisi ulang dengan recv_into tanpa alokasi
+    buffer = bytearray(RECV_SIZE)
+    view = memoryview(buffer)
+    served = 0
+    # request pipelined yang sudah diparse tetapi belum dilayani
+    requests = []
+    metrics.connection(1)
+    try:
+        connection.settimeout(timeout if busy is None else min(timeout, BUSY_POLL))
+        terakhir = time.perf_counter()
+        while True:
+            try:
+                n = connection.recv_into(buffer)
+            except socket.timeout:
+                # pool: antrian diperiksa tiap BUSY_POLL selama koneksi idle
+                if busy is None or time.perf_counter() - terakhir >= timeout:
+                    return
+                if busy() and not parser.pending():
+                    return
+                continue
+            if not n:
+                return
+            mulai = terakhir = time.perf_counter()
+            try:
+                requests = parser.feed(view[:n])
+            except HttpParseError as e:
+                send_response(connection, error_response(httpserver, e))
+                return
+            metrics.parsed(time.perf_counter() - mulai, n)
+            while requests:
+                request = requests.pop(0)
+                served += 1
+                awal = time.perf_counter()
+                batas = max_requests
+                if (busy is not None and served >= BUSY_KEEPALIVE_MAX and not requests
+                        and not parser.pending() and busy()):
+                    # jatah koneksi ini habis: lepaskan worker setelah respon ini
+                    batas = served
+                respon = finalize(httpserver.handle(request), served, batas, timeout)
+                mulai = time.perf_counter()
+                nbytes = send_response(connection, respon)
+                selesai = time.perf_counter()
+                metrics.sent(respon.route, selesai - mulai, nbytes)
+                if trace:
+                    access_log.request(address, request, respon, nbytes, selesai - awal)
+                if not respon.keep_alive:
+                    return
+            # request terakhir masih menunggu body: minta client melanjutkan
+            if parser.take_continue():
+                connection.sendall(CONTINUE)
+    except socket.timeout:
+        pass
+    except OSError as e:
+        logging.warning(f"Error processing client {address}: {e}")
+    finally:
+        # upload yang terputus di tengah jalan atau tidak sempat dilayani dibuang
+        metrics.connection(-1)
+        parser.close()
+        abort_bodies(requests)
+        connection.close()
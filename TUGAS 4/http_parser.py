@@ -0,0 +1,253 @@
+import os
+
+# === Batas parser (bisa diubah lewat environment) ===
+MAX_HEADER_SIZE = int(os.getenv("HTTP_MAX_HEADER_SIZE", 64 * 1024))
+# body yang tidak dialirkan ke sink (mis. upload) dibatasi di memori
+MAX_BODY_MEMORY = int(os.getenv("HTTP_MAX_BODY_MEMORY", 1024 * 1024))
+# buffer yang sudah diproses baru dibuang jika melebihi ukuran ini,
+# agar tidak ada memmove untuk setiap request kecil
+COMPACT_SIZE = 64 * 1024
+
+# state parser
+HEADERS = 0
+BODY = 1
+CHUNK_SIZE = 2
+CHUNK_DATA = 3
+CHUNK_END = 4
+TRAILER = 5
+
+
+class HttpParseError(Exception):
+    def __init__(self, kode, message):
+        Exception.__init__(self, message)
+        self.kode = kode
+        self.message = message
+
+
+def abort_bodies(requests):
+    """Batalkan body yang dialirkan ke sink milik request yang tidak jadi dilayani."""
+    for request in requests:
+        if hasattr(request.body, 'abort'):
+            request.body.abort()
+
+
+class Request:
+    __slots__ = ('method', 'path', 'query', 'version', 'headers', 'body')
+
+    def __init__(self, method, target, version, headers):
+        self.method = method
+        # query string dipisah dari path agar routing hanya melihat path
+        self.path, _, self.query = target.partition('?')
+        self.version = version
+        self.headers = headers
+        self.body = b''
+
+
+class RequestParser:
+    """
+    Parser HTTP/1.x inkremental berbasis bytes. Data dari socket dimasukkan
+    lewat feed() dalam potongan berapa pun besarnya; setiap request yang sudah
+    lengkap dikembalikan berurutan sehingga pipelining tertangani. Body
+    dibaca sesuai Content-Length atau Transfer-Encoding: chunked.
+
+    `body_sink(request)` dipanggil setelah header lengkap; jika mengembalikan
+    objek (punya write() dan abort()), body dialirkan ke objek tersebut
+    potong demi potong dan request.body berisi objek itu, bukan bytes.
+    OSError dari sink (membuat atau menulis file) menjadi HttpParseError.
+    """
+
+    def __init__(self, max_header=MAX_HEADER_SIZE, body_sink=None, max_body=MAX_BODY_MEMORY):
+        self.max_header = max_header
+        self.body_sink = body_sink
+        self.max_body = max_body
+        self.continue_needed = False
+        self.buffer = bytearray()
+        self.pos = 0
+        self.scan = 0
+        self.state = HEADERS
+        self.request = None
+        self.body = None
+        self.remaining = 0
+
+    def feed(self, data):
+        """Tambahkan data (bytes/bytearray/memoryview); kembalikan list Request lengkap."""
+        self.buffer += data
+        hasil = []
+        try:
+            while True:
+                request = self._step()
+                if request is None:
+                    break
+                hasil.append(request)
+        except HttpParseError:
+            # request sebelum data rusak tidak akan dilayani
+            abort_bodies(hasil)
+            raise
+        if self.pos > COMPACT_SIZE or self.pos == len(self.buffer):
+            del self.buffer[:self.pos]
+            self.scan -= self.pos
+            self.pos = 0
+        return hasil
+
+    def pending(self):
+        """True jika ada request yang baru diterima sebagian."""
+        return self.state != HEADERS or self.pos < len(self.buffer)
+
+    def streaming(self):
+        """True jika body request yang sedang dibaca dialirkan ke sink (disk)."""
+        return self.body is not None and not isinstance(self.body, bytearray)
+
+    def take_continue(self):
+        """True sekali jika client menunggu `100 Continue` sebelum mengirim body."""
+        hasil = self.continue_needed
+        self.continue_needed = False
+        return hasil
+
+    def close(self):
+        """Batalkan body yang belum lengkap (mis. koneksi putus di tengah upload)."""
+        if self.body is not None and not isinstance(self.body, bytearray):
+            self.body.abort()
+        self.body = None
+        self.request = None
+
+    def _step(self):
+        while True:
+            if self.state == HEADERS:
+                if not self._parse_headers():
+                    return None
+            elif self.state == BODY:
+                if not self._read_body():
+                    return None
+                return self._finish()
+            elif self.state == CHUNK_SIZE:
+                line = self._readline()
+                if line is None:
+                    return None
+                size = line.split(b';', 1)[0].strip()
+                try:
+                    self.remaining = int(size, 16)
+                except ValueError:
+                    raise HttpParseError(400, 'Invalid chunk size')
+                if self.remaining < 0:
+                    raise HttpParseError(400, 'Invalid chunk size')
+                self.state = CHUNK_DATA if self.remaining else TRAILER
+            elif self.state == CHUNK_DATA:
+                if not self._read_body():
+                    return None
+                self.state = CHUNK_END
+            elif self.state == CHUNK_END:
+                line = self._readline()
+                if line is None:
+                    return None
+                if line:
+                    raise HttpParseError(400, 'Invalid chunk terminator')
+                self.state = CHUNK_SIZE
+            elif self.state == TRAILER:
+                # trailer diabaikan; baris kosong menandai akhir body chunked
+                line = self._readline()
+                if line is None:
+                    return None
+                if not line:
+                    return self._finish()
+
+    def _readline(self):
+        end = self.buffer.find(b"\r\n", self.pos)
+        if end < 0:
+            if len(self.buffer) - self.pos > self.max_header:
+                raise HttpParseError(400, 'Line too long')
+            return None
+        line = bytes(self.buffer[self.pos:end])
+        self.pos = end + 2
+        return line
+
+    def _parse_headers(self):
+        # baris kosong sebelum request line diabaikan (RFC 7230 3.5)
+        while self.buffer.startswith(b"\r\n", self.pos):
+            self.pos += 2
+        end = self.buffer.find(b"\r\n\r\n", max(self.pos, self.scan))
+        if end < 0:
+            # lanjutkan pencarian dari posisi terakhir, bukan dari awal buffer
+            self.scan = max(self.pos, len(self.buffer) - 3)
+            if len(self.buffer) - self.pos > self.max_header:
+                raise HttpParseError(431, 'Request Header Fields Too Large')
+            return False
+        if end - self.pos > self.max_header:
+            raise HttpParseError(431, 'Request Header Fields Too Large')
+        lines = self.buffer[self.pos:end].decode('iso-8859-1').split("\r\n")
+        self.pos = end + 4
+        self.scan = self.pos
+
+        parts = lines[0].split()
+        if len(parts) == 2:
+            parts.append('HTTP/1.0')
+        if len(parts) != 3:
+            raise HttpParseError(400, 'Invalid request line')
+        method, path, version = parts
+        headers = {}
+        for line in lines[1:]:
+            k, sep, v = line.partition(':')
+            if not sep:
+                raise HttpParseError(400, 'Invalid header line')
+            k = k.strip().lower()
+            v = v.strip()
+            headers[k] = headers[k] + ', ' + v if k in headers else v
+        self.request = Request(method.upper(), path, version.upper(), headers)
+
+        chunked = 'chunked' in headers.get('transfer-encoding', '').lower()
+        if chunked:
+            if 'content-length' in headers:
+                raise HttpParseError(400, 'Both Content-Length and chunked')
+        else:
+            try:
+                self.remaining = int(headers.get('content-length', 0))
+            except ValueError:
+                raise HttpParseError(400, 'Invalid Content-Length')
+            if self.remaining < 0:
+                raise HttpParseError(400, 'Invalid Content-Length')
+
+        self.body = None
+        if (chunked or self.remaining) and self.body_sink is not None:
+            try:
+                self.body = self.body_sink(self.request)
+            except (FileNotFoundError, NotADirectoryError):
+                # direktori tujuan upload tidak ada
+                raise HttpParseError(404, 'Not Found')
+            except OSError:
+                raise HttpParseError(500, 'Internal Server Error')
+        if self.body is None:
+            if not chunked and self.remaining > self.max_body:
+                raise HttpParseError(413, 'Payload Too Large')
+            self.body = bytearray()
+        if (chunked or self.remaining) and headers.get('expect', '').lower() == '100-continue':
+            self.continue_needed = True
+        self.state = CHUNK_SIZE if chunked else BODY
+        return True
+
+    def _read_body(self):
+        tersedia = min(len(self.buffer) - self.pos, self.remaining)
+        if tersedia:
+            with memoryview(self.buffer) as view:
+                if isinstance(self.body, bytearray):
+                    if len(self.body) + tersedia > self.max_body:
+                        raise HttpParseError(413, 'Payload Too Large')
+                    self.body += view[self.pos:self.pos + tersedia]
+                else:
+                    try:
+                        self.body.write(view[self.pos:self.pos + tersedia])
+                    except OSError:
+                        # mis. ENOSPC: file sementara dibuang, koneksi dijawab 500
+                        self.close()
+                        raise HttpParseError(500, 'Internal Server Error')
+            self.pos += tersedia
+            self.remaining -= tersedia
+        return self.remaining == 0
+
+    def _finish(self):
+        request = self.request
+        # body sudah lengkap, client tidak perlu lagi `100 Continue`
+        self.continue_needed = False
+        request.body = bytes(self.body) if isinstance(self.body, bytearray) else self.body
+        self.request = None
+        self.body = None
+        self.state = HEADERS
+        return request
@@ -0,0 +1,499 @@
+import os
+import json
+import time
+import fcntl
+import atexit
+import struct
+from bisect import bisect_left
+import weakref
+import threading
+from multiprocessing import shared_memory
+from shm_cache import map_segment, SHM_DIR
+
+# === Konfigurasi metrics (bisa diubah lewat environment) ===
+# HTTP_METRICS=0 mematikan pencatatan (route /metrics tetap ada, isinya kosong)
+ENABLED = os.getenv("HTTP_METRICS", '1') == '1'
+# batas atas bucket histogram latensi dalam detik (le=... di format Prometheus)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# method di luar daftar ini dicatat sebagai 'other' agar jumlah label terbatas
+KNOWN_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'DELETE', 'OPTIONS', 'PATCH'))
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# nama segmen snapshot yang dibuka worker; diisi proses utama server berbasis proses
+METRICS_ENV = "HTTP_METRICS_SHM"
+# jeda antar penulisan snapshot proses ke segmen bersama (detik)
+FLUSH_INTERVAL = float(os.getenv("HTTP_METRICS_FLUSH", 1.0))
+# jumlah proses yang snapshot-nya bisa disimpan bersamaan, dan ukuran per slot
+SHARED_SLOTS = int(os.getenv("HTTP_METRICS_SLOTS", 256))
+SLOT_SIZE = 64 * 1024
+# pid pemilik, panjang snapshot
+SLOT_HEADER = struct.Struct('<QQ')
+
+HISTOGRAMS = {
+    'parse': ('http_parse_seconds', 'Waktu parse per potongan data yang diterima.'),
+    'handle': ('http_handle_seconds', 'Waktu handler menghasilkan respon, per route.'),
+    'send': ('http_send_seconds', 'Waktu mengirim respon ke socket, per route.'),
+}
+
+
+class Shard:
+    """Catatan milik satu thread; hanya thread pemiliknya yang menulis."""
+    __slots__ = ('thread', 'requests', 'histograms', 'bytes_in', 'bytes_out', 'connections')
+
+    def __init__(self, thread=None):
+        self.thread = thread
+        # (route, method, status) -> jumlah
+        self.requests = {}
+        # fase -> {route: [jumlah per bucket ..., +Inf, total detik]}
+        self.histograms = {phase: {} for phase in HISTOGRAMS}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        # selisih buka - tutup; dijumlah antar shard menjadi gauge
+        self.connections = 0
+
+    def merge(self, other):
+        for key, n in list(other.requests.items()):
+            self.requests[key] = self.requests.get(key, 0) + n
+        for phase, table in other.histograms.items():
+            mine = self.histograms[phase]
+            for route, h in list(table.items()):
+                total = mine.get(route)
+                if total is None:
+                    total = mine[route] = [0] * len(h)
+                for i, n in enumerate(h):
+                    total[i] += n
+        self.bytes_in += other.bytes_in
+        self.bytes_out += other.bytes_out
+        self.connections += other.connections
+
+    def dump(self):
+        return {'requests': [[r, m, s, n] for (r, m, s), n in self.requests.items()],
+                'histograms': self.histograms, 'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out, 'connections': self.connections}
+
+    @classmethod
+    def load(cls, data):
+        shard = cls()
+        shard.requests = {(r, m, s): n for r, m, s, n in data['requests']}
+        shard.histograms.update(data['histograms'])
+        shard.bytes_in = data['bytes_in']
+        shard.bytes_out = data['bytes_out']
+        shard.connections = data['connections']
+        return shard
+
+
+def observe(table, route, seconds):
+    h = table.get(route)
+    if h is None:
+        h = table[route] = [0] * (len(LATENCY_BUCKETS) + 2)
+    h[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    h[-1] += seconds
+
+
+class Metrics:
+    """
+    Counter, gauge, dan histogram latensi untuk server HTTP. Setiap thread
+    menulis ke Shard miliknya sendiri (threading.local) tanpa lock, sehingga
+    biaya di jalur request hanya beberapa operasi dict; shard baru
+    digabungkan ketika /metrics dibaca. Shard milik thread yang sudah
+    selesai dilebur ke satu shard `retired` agar jumlahnya tidak terus
+    bertambah pada server thread-per-koneksi.
+
+    Pada server berbasis proses (pre-fork, proses per koneksi, process
+    pool) setiap proses menulis snapshot miliknya ke SharedMetrics tiap
+    FLUSH_INTERVAL detik; proses yang menjawab /metrics menjumlahkan
+    snapshot semua proses, jadi hasilnya angka seluruh server (tertinggal
+    paling lama FLUSH_INTERVAL). Proses yang berakhir melebur angkanya ke
+    slot bersama lewat retire().
+    """
+
+    def __init__(self, enabled=ENABLED):
+        self.enabled = enabled
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.shards = []
+        self.retired = Shard()
+        self.sweep_at = 64
+        # nama -> (keterangan, fungsi tanpa argumen yang mengembalikan angka)
+        self.gauges = {}
+        self.started = time.time()
+        self.shared = SharedMetrics.attach(os.environ.get(METRICS_ENV)) if enabled else None
+        self.flusher = None
+        self.flush_lock = threading.Lock()
+
+    def reset(self):
+        """Dipanggil di proses anak setelah fork: mulai dari nol."""
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.shards = []
+        self.retired = Shard()
+        self.started = time.time()
+        self.flusher = None
+        self.flush_lock = threading.Lock()
+        if self.shared is not None:
+            self.shared.lock = threading.Lock()
+
+    def shard(self):
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = Shard(weakref.ref(threading.current_thread()))
+            with self.lock:
+                if len(self.shards) >= self.sweep_at:
+                    self.sweep()
+                    self.sweep_at = max(64, 2 * len(self.shards))
+                self.shards.append(shard)
+            self.local.shard = shard
+            if self.shared is not None and self.flusher is None:
+                self.start_flusher()
+            return shard
+
+    def sweep(self):
+        """Lebur shard milik thread yang sudah selesai (dipanggil dengan lock)."""
+        alive = []
+        for shard in self.shards:
+            thread = shard.thread()
+            if thread is not None and thread.is_alive():
+                alive.append(shard)
+            else:
+                self.retired.merge(shard)
+        self.shards = alive
+
+    # === pencatatan (jalur request) ===
+
+    def request(self, route, method, status, seconds):
+        if not self.enabled:
+            return
+        try:
+            shard = self.local.shard
+        except AttributeError:
+            shard = self.shard()
+        key = (route, method if method in KNOWN_METHODS else 'other', status)
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+        observe(shard.histograms['handle'], route, seconds)
+
+    def parsed(self, seconds, nbytes):
+        if not self.enabled:
+            return
+        try:
+            shard = self.local.shard
+        except AttributeError:
+            shard = self.shard()
+        shard.bytes_in += nbytes
+        observe(shard.histograms['parse'], '', seconds)
+
+    def sent(self, route, seconds, nbytes):
+        """`seconds` None: hanya byte yang dicatat."""
+        if not self.enabled:
+            return
+        try:
+            shard = self.local.shard
+        except AttributeError:
+            shard = self.shard()
+        shard.bytes_out += nbytes
+        if seconds is not None:
+            observe(shard.histograms['send'], route, seconds)
+
+    def connection(self, delta):
+        if self.enabled:
+            self.shard().connections += delta
+
+    def gauge(self, name, keterangan, fn, kind='gauge'):
+        """
+        Daftarkan nilai yang diambil dari fn() saat /metrics dibaca; kind
+        'counter' untuk angka yang hanya bertambah (dihitung di luar shard).
+        """
+        self.gauges[name] = (keterangan, fn, kind)
+        if self.shared is not None and self.flusher is None:
+            self.start_flusher()
+
+    # === gabungan antar proses ===
+
+    def share(self):
+        """
+        Dipanggil proses utama server berbasis proses sebelum membuat
+        worker: buat segmen snapshot dan umumkan lewat environment.
+        """
+        if not self.enabled or self.shared is not None:
+            return
+        self.shared = SharedMetrics.create()
+        self.shared.publish()
+        if self.gauges or self.shards:
+            self.start_flusher()
+
+    def unshare(self):
+        if self.shared is not None:
+            self.shared.unlink()
+
+    def start_flusher(self):
+        self.flusher = threading.Thread(target=self.flush_loop, daemon=True)
+        self.flusher.start()
+
+    def flush_loop(self):
+        terakhir = None
+        while self.flusher is not False:
+            time.sleep(FLUSH_INTERVAL)
+            terakhir = self.flush(terakhir)
+
+    def snapshot(self):
+        data = self.collect().dump()
+        gauges = {}
+        for name, (keterangan, fn, kind) in self.gauges.items():
+            try:
+                gauges[name] = [keterangan, kind, fn()]
+            except Exception:
+                continue
+        data['gauges'] = gauges
+        return json.dumps(data).encode()
+
+    def flush(self, terakhir=None):
+        """Simpan snapshot proses ini jika berubah sejak `terakhir`; kembalikan isinya."""
+        isi = self.snapshot()
+        with self.flush_lock:
+            if isi != terakhir and self.flusher is not False:
+                self.shared.store(os.getpid(), isi)
+        return isi
+
+    def retire(self):
+        """
+        Dipanggil proses worker sebelum berakhir: lebur angkanya ke slot
+        proses yang sudah selesai agar tidak hilang dari /metrics.
+        """
+        if self.shared is None:
+            return
+        with self.flush_lock:
+            # flusher tidak lagi menulis snapshot proses ini
+            self.flusher = False
+        self.shared.retire(os.getpid(), self.collect())
+
+    def collect(self):
+        total = Shard()
+        with self.lock:
+            self.sweep()
+            total.merge(self.retired)
+            for shard in self.shards:
+                total.merge(shard)
+        return total
+
+    def render(self):
+        """Semua metrics dalam format teks Prometheus (exposition 0.0.4)."""
+        total = self.collect()
+        gauges = {}
+        for name, (keterangan, fn, kind) in self.gauges.items():
+            try:
+                gauges[name] = [keterangan, kind, fn()]
+            except Exception:
+                continue
+        if self.shared is not None:
+            for name, (keterangan, kind, value) in self.shared.gather(total, os.getpid()).items():
+                gauges.setdefault(name, [keterangan, kind, 0])[2] += value
+        lines = [
+            '# HELP http_requests_total Jumlah request per route, method, dan status.',
+            '# TYPE http_requests_total counter',
+        ]
+        for (route, method, status), n in sorted(total.requests.items()):
+            lines.append(f'http_requests_total{{route="{route}",method="{method}",status="{status}"}} {n}')
+        lines += [
+            '# HELP http_received_bytes_total Byte yang diterima dari client.',
+            '# TYPE http_received_bytes_total counter',
+            f'http_received_bytes_total {total.bytes_in}',
+            '# HELP http_sent_bytes_total Byte respon (header + body) yang dikirim ke client.',
+            '# TYPE http_sent_bytes_total counter',
+            f'http_sent_bytes_total {total.bytes_out}',
+            '# HELP http_connections_active Koneksi client yang sedang terbuka.',
+            '# TYPE http_connections_active gauge',
+            f'http_connections_active {total.connections}',
+        ]
+        for phase, (name, keterangan) in HISTOGRAMS.items():
+            lines += [f'# HELP {name} {keterangan}', f'# TYPE {name} histogram']
+            for route, h in sorted(total.histograms[phase].items()):
+                # histogram parse tidak punya label route
+                label = f'route="{route}",' if route else ''
+                jalan = 0
+                for batas, n in zip(LATENCY_BUCKETS + ('+Inf',), h):
+                    jalan += n
+                    lines.append(f'{name}_bucket{{{label}le="{batas}"}} {jalan}')
+                label = f'{{route="{route}"}}' if route else ''
+                lines.append(f'{name}_sum{label} {h[-1]:.6f}')
+                lines.append(f'{name}_count{label} {jalan}')
+        for name, (keterangan, kind, value) in sorted(gauges.items()):
+            lines += [f'# HELP {name} {keterangan}', f'# TYPE {name} {kind}', f'{name} {value}']
+        lines += [
+            '# HELP process_start_time_seconds Waktu mulai proses (unix time).',
+            '# TYPE process_start_time_seconds gauge',
+            f'process_start_time_seconds {self.started:.3f}',
+        ]
+        return ('\n'.join(lines) + '\n').encode()
+
+
+class SharedMetrics:
+    """
+    Snapshot metrics semua proses server di satu segmen shared memory.
+    Slot 0 berisi gabungan proses yang sudah berakhir; slot lain milik satu
+    proses masing-masing (pid, panjang, snapshot JSON). Segmen dibuat proses
+    utama dan ikut dihapus resource tracker multiprocessing saat semua
+    proses berhenti, juga bila proses utama dimatikan dengan SIGTERM.
+    Akses dikunci lockf pada segmen.
+    """
+
+    def __init__(self, name, size, shm=None):
+        self.name = name
+        self.shm = shm
+        self.fd, self.buf = map_segment(name, size)
+        self.slots = size // SLOT_SIZE
+        self.lock = threading.Lock()
+
+    @classmethod
+    def create(cls, slots=SHARED_SLOTS):
+        shm = shared_memory.SharedMemory(create=True, size=slots * SLOT_SIZE)
+        shared = cls(shm.name, slots * SLOT_SIZE, shm)
+        shm.close()
+        atexit.register(shared.unlink)
+        return shared
+
+    @classmethod
+    def attach(cls, name):
+        """Segmen yang dibuat proses utama, atau None jika tidak ada."""
+        if not name:
+            return None
+        try:
+            return cls(name, os.stat(SHM_DIR + name).st_size)
+        except (OSError, ValueError):
+            return None
+
+    def publish(self):
+        os.environ[METRICS_ENV] = self.name
+
+    def unlink(self):
+        shm, self.shm = self.shm, None
+        if shm is not None:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def acquire(self):
+        self.lock.acquire()
+        fcntl.lockf(self.fd, fcntl.LOCK_EX)
+
+    def release(self):
+        fcntl.lockf(self.fd, fcntl.LOCK_UN)
+        self.lock.release()
+
+    def owner(self, index):
+        return SLOT_HEADER.unpack_from(self.buf, index * SLOT_SIZE)[0]
+
+    def read(self, index):
+        pos = index * SLOT_SIZE
+        pid, length = SLOT_HEADER.unpack_from(self.buf, pos)
+        if not length:
+            return pid, None
+        pos += SLOT_HEADER.size
+        return pid, json.loads(bytes(self.buf[pos:pos + length]))
+
+    def write(self, index, pid, isi):
+        pos = index * SLOT_SIZE
+        self.buf[pos + SLOT_HEADER.size:pos + SLOT_HEADER.size + len(isi)] = isi
+        SLOT_HEADER.pack_into(self.buf, pos, pid, len(isi))
+
+    def fold(self, shard, index=None):
+        """Lebur `shard` ke slot 0 dan kosongkan slot `index` (dipanggil dengan lock)."""
+        _, data = self.read(0)
+        retired = Shard.load(data) if data else Shard()
+        shard.connections = 0
+        retired.merge(shard)
+        isi = json.dumps(retired.dump()).encode()
+        if len(isi) <= SLOT_SIZE - SLOT_HEADER.size:
+            self.write(0, 0, isi)
+        if index is not None:
+            SLOT_HEADER.pack_into(self.buf, index * SLOT_SIZE, 0, 0)
+
+    def fold_dead(self):
+        """Kosongkan slot milik proses yang mati tanpa retire(); nomor slot pertama yang bebas."""
+        free = None
+        for index in range(1, self.slots):
+            pid, data = self.read(index)
+            if pid and not alive(pid):
+                self.fold(Shard.load(data) if data else Shard(), index)
+                pid = 0
+            if not pid and free is None:
+                free = index
+        return free
+
+    def store(self, pid, isi):
+        """Simpan snapshot proses `pid`; False jika terlalu besar atau slot habis."""
+        if len(isi) > SLOT_SIZE - SLOT_HEADER.size:
+            return False
+        self.acquire()
+        try:
+            free = None
+            for index in range(1, self.slots):
+                owner = self.owner(index)
+                if owner == pid:
+                    free = index
+                    break
+                if not owner and free is None:
+                    free = index
+            if free is None:
+                free = self.fold_dead()
+                if free is None:
+                    return False
+            self.write(free, pid, isi)
+            return True
+        finally:
+            self.release()
+
+    def retire(self, pid, shard):
+        self.acquire()
+        try:
+            index = None
+            for i in range(1, self.slots):
+                if self.owner(i) == pid:
+                    index = i
+                    break
+            self.fold(shard, index)
+        finally:
+            self.release()
+
+    def gather(self, total, pid):
+        """
+        Tambahkan angka proses lain (selain `pid`) ke `total`; kembalikan
+        jumlah gauge mereka: nama -> [keterangan, kind, nilai]. Slot proses
+        yang mati tanpa retire() (mis. worker yang dihentikan) dilebur ke
+        slot 0 lebih dulu.
+        """
+        gauges = {}
+        self.acquire()
+        try:
+            for index in range(1, self.slots):
+                owner, data = self.read(index)
+                if not owner or owner == pid:
+                    continue
+                shard = Shard.load(data) if data else Shard()
+                if not alive(owner):
+                    self.fold(shard, index)
+                    continue
+                total.merge(shard)
+                for name, (keterangan, kind, value) in data['gauges'].items():
+                    gauges.setdefault(name, [keterangan, kind, 0])[2] += value
+            _, data = self.read(0)
+            if data:
+                total.merge(Shard.load(data))
+        finally:
+            self.release()
+        return gauges
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+metrics = Metrics()
+# setiap proses (worker pre-fork, anak fork per koneksi) punya metrics sendiri
+os.register_at_fork(after_in_child=metrics.reset)
@@ -1,5 +1,12 @@
-#ab -n jumlah_request -c jumlah_konkuren http://localhost:8887/testingab -n jumlah_request -c jumlah_konkuren http://localhost:8887/testing.txt
-
-
-ab -n 100 -c 50 http://localhost:8887/testing.txt
+#!/bin/sh
+# Pengukuran performa semua varian server dengan bench_http.py (pengganti ab).
+# Setiap server_*_http.py dijalankan bergantian, hasil disimpan ke JSON dan CSV.
+#   ./perftest.sh                      # closed-loop, keep-alive
+#   ./perftest.sh --rate 500           # open-loop 500 request/detik
+#   ./perftest.sh --no-keepalive --mix get_small:70,get_large:10,list:15,upload:5
+#
+# dulu: ab -n 100 -c 50 http://localhost:8887/testing.txt
 
+cd "$(dirname "$0")"
+python3 bench_http.py --all --duration 10 --concurrency 50 \
+	--json perftest.json --csv perftest.csv "$@"
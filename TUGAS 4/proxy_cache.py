@@ -0,0 +1,452 @@
+import os
+import json
+import atexit
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from http import HttpServer
+from http_parser import Request
+from proxy_http import HttpProxy, RESPONSE_SKIP
+from static_cache import choose_encoding
+from upstream import UpstreamError
+
+# === Konfigurasi cache proxy (bisa diubah lewat environment) ===
+PROXY_CACHE_MEMORY = int(os.getenv("PROXY_CACHE_MEMORY", 32 * 1024 * 1024))
+PROXY_CACHE_DISK = int(os.getenv("PROXY_CACHE_DISK", 256 * 1024 * 1024))
+# objek lebih besar dari ini disimpan di disk dan dikirim dengan sendfile
+PROXY_CACHE_MEMORY_ENTRY = int(os.getenv("PROXY_CACHE_MEMORY_ENTRY", 256 * 1024))
+PROXY_CACHE_DIR = os.getenv("PROXY_CACHE_DIR", '')
+# umur segar respon yang punya validator (ETag/Last-Modified) tapi tanpa max-age
+PROXY_CACHE_TTL = float(os.getenv("PROXY_CACHE_TTL", 5))
+# berapa lama objek basi masih boleh dikirim sambil divalidasi ulang di belakang,
+# untuk respon tanpa max-age (TTL heuristik); respon dengan max-age hanya
+# memakai stale-while-revalidate dari backend sendiri
+PROXY_CACHE_SWR = float(os.getenv("PROXY_CACHE_SWR", 30))
+# jumlah path yang daftar header Vary-nya diingat (yang terlama dilupakan)
+PROXY_CACHE_VARY_TARGETS = int(os.getenv("PROXY_CACHE_VARY_TARGETS", 4096))
+STATS_PATH = '/_proxy/stats'
+# path yang isinya ikut berubah jika ada upload/delete (listing direktori)
+LISTING_PATHS = ('/list',)
+
+
+def parse_cache_control(value):
+    hasil = {}
+    for item in value.split(','):
+        name, _, arg = item.strip().partition('=')
+        if name:
+            hasil[name.lower()] = arg.strip('"') if arg else True
+    return hasil
+
+
+def seconds(value, default):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def lifetime(cc, upstream):
+    """Umur segar eksplisit dari s-maxage/max-age atau Expires (detik), None jika tidak ada."""
+    if 's-maxage' in cc or 'max-age' in cc:
+        return seconds(cc.get('s-maxage', cc.get('max-age')), 0)
+    expires = upstream.header('expires')
+    if not expires:
+        return None
+    try:
+        # relatif terhadap Date backend agar beda jam proxy-backend tidak berpengaruh
+        date = upstream.header('date')
+        now = parsedate_to_datetime(date).timestamp() if date else time.time()
+        return max(0.0, parsedate_to_datetime(expires).timestamp() - now)
+    except (TypeError, ValueError):
+        # Expires tidak valid (mis. "0") berarti sudah basi
+        return 0
+
+
+class CachedObject:
+    __slots__ = ('key', 'raw_headers', 'body', 'path', 'size', 'etag', 'last_modified',
+                 'stored', 'ttl', 'swr', 'must_revalidate')
+
+    def __init__(self, key, raw_headers, etag, last_modified, ttl, swr, must_revalidate=False):
+        self.key = key
+        self.raw_headers = raw_headers
+        self.body = None
+        self.path = None
+        self.size = 0
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored = time.monotonic()
+        self.ttl = ttl
+        self.swr = swr
+        # must-revalidate/proxy-revalidate: objek basi tidak boleh dipakai saat upstream error
+        self.must_revalidate = must_revalidate
+
+    def age(self, now):
+        return now - self.stored
+
+    def fresh(self, now):
+        return self.age(now) < self.ttl
+
+    def usable_stale(self, now):
+        return self.age(now) < self.ttl + self.swr
+
+
+class ObjectCache:
+    """
+    Cache objek LRU dua tingkat: body kecil di memori, body besar di file
+    dalam direktori cache. Masing-masing punya batas total bytes sendiri.
+    """
+
+    def __init__(self, directory=None, max_memory=PROXY_CACHE_MEMORY, max_disk=PROXY_CACHE_DISK,
+                 memory_entry=PROXY_CACHE_MEMORY_ENTRY):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        else:
+            # direktori sementara milik proses ini, dihapus saat proxy berhenti
+            directory = tempfile.mkdtemp(prefix='proxy-cache-')
+            atexit.register(shutil.rmtree, directory, True)
+        self.directory = directory
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self.memory_entry = memory_entry
+        self.entries = OrderedDict()
+        self.memory = 0
+        self.disk = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            obj = self.entries.get(key)
+            if obj is not None:
+                self.entries.move_to_end(key)
+            return obj
+
+    def store(self, obj, body):
+        """Simpan body (bytes atau file terbuka) untuk obj; body file ditutup."""
+        if type(body) is bytes and len(body) <= self.memory_entry:
+            obj.body = body
+            obj.size = len(body)
+        else:
+            name = hashlib.sha1(obj.key.encode('utf-8', 'surrogateescape')).hexdigest()
+            path = os.path.join(self.directory, name)
+            fd, temp = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                if type(body) is bytes:
+                    f.write(body)
+                else:
+                    shutil.copyfileobj(body, f, 1024 * 1024)
+                    body.close()
+                obj.size = f.tell()
+            # nama unik per versi agar pembaca file lama tidak ikut tertimpa
+            obj.path = f"{path}-{os.path.basename(temp)}"
+            os.replace(temp, obj.path)
+        with self.lock:
+            self._discard(obj.key)
+            self.entries[obj.key] = obj
+            if obj.path is None:
+                self.memory += obj.size
+            else:
+                self.disk += obj.size
+            self._evict()
+        return obj
+
+    def invalidate(self, match):
+        """Buang semua objek yang kuncinya memenuhi match(key)."""
+        with self.lock:
+            for key in [k for k in self.entries if match(k)]:
+                self._discard(key)
+
+    def _discard(self, key):
+        obj = self.entries.pop(key, None)
+        if obj is None:
+            return
+        if obj.path is None:
+            self.memory -= obj.size
+        else:
+            self.disk -= obj.size
+            try:
+                # file yang sedang dikirim tetap bisa dibaca sampai ditutup
+                os.remove(obj.path)
+            except OSError:
+                pass
+
+    def _evict(self):
+        for on_disk, limit in ((False, self.max_memory), (True, self.max_disk)):
+            while (self.disk if on_disk else self.memory) > limit:
+                key = next(k for k, o in self.entries.items() if (o.path is not None) == on_disk)
+                self._discard(key)
+
+    def stats(self):
+        with self.lock:
+            return {'objects': len(self.entries), 'memory_bytes': self.memory, 'disk_bytes': self.disk}
+
+
+class Flight:
+    """Satu pengambilan ke upstream yang sedang berjalan untuk satu kunci."""
+    __slots__ = ('event', 'obj')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.obj = None
+
+
+class CachingProxy(HttpProxy):
+    """
+    HttpProxy dengan cache objek untuk GET/HEAD:
+    - respon 200 dengan max-age/s-maxage/Expires, atau dengan ETag/Last-Modified
+      (segar selama PROXY_CACHE_TTL), disimpan; no-store/private/Vary: * tidak
+    - header request yang disebut Vary backend ikut menjadi bagian kunci
+    - request yang sama saat pengambilan masih berjalan menunggu hasil yang
+      sama (coalescing), jadi hanya satu request per kunci ke upstream
+    - objek basi masih dikirim selama jendela stale-while-revalidate
+      sementara validasi ulang (If-None-Match) berjalan di thread lain;
+      jika upstream error, objek basi juga dipakai (stale-if-error)
+    - upload/delete lewat proxy membuang objek path tersebut dan listing
+    Statistik (hit ratio, request upstream yang dihemat) ada di /_proxy/stats.
+    """
+
+    def __init__(self, pool, cache=None):
+        HttpProxy.__init__(self, pool)
+        self.cache = cache if cache is not None else ObjectCache(PROXY_CACHE_DIR or None)
+        self.inflight = {}
+        # target -> nama header request dari Vary respon terakhir (selain Accept-Encoding);
+        # paling banyak PROXY_CACHE_VARY_TARGETS, target terlama dilupakan lebih dulu
+        self.vary = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(('requests', 'hits', 'stale', 'misses', 'revalidated',
+                                       'coalesced', 'uncacheable', 'upstream'), 0)
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def forward(self, request, *args):
+        self.count('upstream')
+        return HttpProxy.forward(self, request, *args)
+
+    def proxy(self, request):
+        if request.path == STATS_PATH:
+            return self.response(200, 'OK', json.dumps(self.stats()), {'Content-Type': 'application/json'})
+        self.count('requests')
+        if request.method not in ('GET', 'HEAD') or request.path.startswith('/delete/'):
+            # dibuang sebelum dan sesudah diteruskan agar request lain yang
+            # berjalan bersamaan tidak menyimpan kembali versi lama
+            self.invalidate_for(request)
+            self.count('uncacheable')
+            hasil = HttpProxy.proxy(self, request)
+            self.invalidate_for(request)
+            return hasil
+        cc = parse_cache_control(request.headers.get('cache-control', ''))
+        if 'range' in request.headers or 'no-store' in cc or 'authorization' in request.headers:
+            self.count('uncacheable')
+            return HttpProxy.proxy(self, request)
+
+        key = self.cache_key(request)
+        obj = self.cache.get(key)
+        now = time.monotonic()
+        if obj is not None and 'no-cache' not in cc:
+            if obj.fresh(now):
+                self.count('hits')
+                return self.serve(obj, request, 'HIT')
+            if obj.usable_stale(now):
+                self.count('stale')
+                self.revalidate_later(key, request, obj)
+                return self.serve(obj, request, 'STALE')
+        return self.fetch(key, request, obj)
+
+    @staticmethod
+    def target(request):
+        return request.path + ('?' + request.query if request.query else '')
+
+    def cache_key(self, request):
+        # varian gzip/deflate dari backend dibedakan lewat encoding yang dipilih,
+        # varian lain lewat nilai header yang disebut Vary
+        target = self.target(request)
+        encoding = choose_encoding(request.headers.get('accept-encoding')) or 'identity'
+        key = f"{target}|{encoding}"
+        for name in self.vary.get(target, ()):
+            key += f"|{name}={request.headers.get(name, '')}"
+        return key
+
+    def invalidate_for(self, request):
+        path = request.path
+        for prefix in ('/upload/', '/delete/'):
+            if path.startswith(prefix):
+                path = '/' + path[len(prefix):]
+        self.cache.invalidate(lambda key: key.startswith((path + '|', path + '?') + LISTING_PATHS))
+
+    def fetch(self, key, request, stale):
+        """Ambil dari upstream dengan coalescing; request lain untuk kunci sama menunggu."""
+        with self.lock:
+            flight = self.inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[key] = Flight()
+        if not leader:
+            self.count('coalesced')
+            flight.event.wait()
+            # kunci bisa berubah setelah Vary backend diketahui (mis. Accept lain)
+            if flight.obj is not None and flight.obj.key == self.cache_key(request):
+                self.count('hits')
+                return self.serve(flight.obj, request, 'HIT')
+            # respon tidak bisa di-cache: teruskan sendiri
+            return HttpProxy.proxy(self, request)
+
+        try:
+            obj, upstream = self.refresh(key, request, stale)
+            flight.obj = obj
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            flight.event.set()
+        if obj is not None:
+            return self.serve(obj, request, 'MISS')
+        return self.to_response(upstream)
+
+    def refresh(self, key, request, stale, background=False):
+        """
+        (objek, None) jika hasilnya ada di cache, atau (None, UpstreamResponse)
+        jika respon upstream tidak boleh di-cache. Selalu meminta GET ke upstream
+        agar body HEAD juga ikut tersimpan. `background`: validasi ulang
+        stale-while-revalidate, objek basinya sudah dikirim (dan dihitung).
+        """
+        headers = {k: v for k, v in request.headers.items()
+                   if k not in ('if-none-match', 'if-modified-since', 'cache-control')}
+        if stale is not None:
+            if stale.etag:
+                headers['if-none-match'] = stale.etag
+            elif stale.last_modified:
+                headers['if-modified-since'] = stale.last_modified
+        target = self.target(request)
+        upstream_request = Request('GET', target, 'HTTP/1.1', headers)
+        try:
+            upstream = self.forward(upstream_request)
+        except UpstreamError:
+            if stale is not None and not stale.must_revalidate:
+                if not background:
+                    self.count('stale')
+                return stale, None
+            raise
+
+        if upstream.kode == 304 and stale is not None:
+            self.count('revalidated')
+            # 304 boleh membawa umur segar baru (max-age/Expires)
+            ttl = lifetime(parse_cache_control(upstream.header('cache-control')), upstream)
+            if ttl is not None:
+                stale.ttl = ttl
+            stale.stored = time.monotonic()
+            return stale, None
+        policy = self.policy(upstream)
+        if upstream.kode != 200 or policy is None:
+            self.count('uncacheable')
+            self.cache.invalidate(lambda k: k == key)
+            if request.method == 'HEAD':
+                if type(upstream.body) is not bytes:
+                    upstream.body.close()
+                upstream.body = b''
+            return None, upstream
+        self.count('misses')
+        ttl, swr, must_revalidate = policy
+        names = self.vary_names(upstream)
+        if names != self.vary.get(target, ()):
+            self.remember_vary(target, names)
+            key = self.cache_key(request)
+        raw_headers = ''.join(f"{k}: {v}\r\n" for k, v in upstream.headers
+                              if k.lower() not in RESPONSE_SKIP).encode('iso-8859-1')
+        obj = CachedObject(key, raw_headers, upstream.header('etag'), upstream.header('last-modified'),
+                           ttl, swr, must_revalidate)
+        return self.cache.store(obj, upstream.body), None
+
+    def remember_vary(self, target, names):
+        with self.lock:
+            self.vary.pop(target, None)
+            if names:
+                self.vary[target] = names
+                while len(self.vary) > PROXY_CACHE_VARY_TARGETS:
+                    # objek varian target yang dilupakan tidak lagi ditemukan
+                    # dan diambil ulang (lalu Vary-nya dipelajari kembali)
+                    self.vary.popitem(last=False)
+
+    @staticmethod
+    def vary_names(upstream):
+        """Nama header (huruf kecil, urut) dari Vary selain Accept-Encoding."""
+        names = {name.strip().lower() for name in upstream.header('vary').split(',')}
+        names.discard('')
+        names.discard('accept-encoding')
+        return tuple(sorted(names))
+
+    def policy(self, upstream):
+        """(ttl, swr, must_revalidate) jika respon boleh di-cache, selain itu None."""
+        cc = parse_cache_control(upstream.header('cache-control'))
+        if 'no-store' in cc or 'private' in cc or upstream.header('set-cookie'):
+            return None
+        if '*' in self.vary_names(upstream):
+            return None
+        must_revalidate = 'must-revalidate' in cc or 'proxy-revalidate' in cc
+        if 'no-cache' in cc:
+            return 0, 0, True
+        # objek basi hanya dikirim jika backend mengizinkan: stale-while-revalidate
+        # eksplisit, atau TTL heuristik (tanpa max-age) dengan jendela bawaan proxy
+        ttl = lifetime(cc, upstream)
+        swr = seconds(cc.get('stale-while-revalidate'), 0 if ttl is not None else PROXY_CACHE_SWR)
+        if must_revalidate:
+            swr = 0
+        if ttl is not None:
+            return ttl, swr, must_revalidate
+        if upstream.header('etag') or upstream.header('last-modified'):
+            return PROXY_CACHE_TTL, swr, must_revalidate
+        return None
+
+    def revalidate_later(self, key, request, obj):
+        with self.lock:
+            if key in self.inflight:
+                return
+            self.inflight[key] = flight = Flight()
+
+        def run():
+            try:
+                flight.obj = self.refresh(key, request, obj, background=True)[0]
+            except Exception as e:
+                logging.warning(f"revalidasi {key} gagal: {e}")
+            finally:
+                with self.lock:
+                    self.inflight.pop(key, None)
+                flight.event.set()
+        threading.Thread(target=run, daemon=True).start()
+
+    def serve(self, obj, request, status):
+        now = time.monotonic()
+        headers = {'Age': int(obj.age(now)), 'X-Cache': status}
+        # perbandingan lemah: prefix W/ dibuang, bukan karakter W dan /
+        etag = obj.etag[2:] if obj.etag.startswith('W/') else obj.etag
+        if etag and HttpServer.not_modified(etag, 0, {
+                k: v for k, v in request.headers.items() if k == 'if-none-match'}):
+            hasil = self.response(304, 'Not Modified', bytes(), headers)
+            hasil.raw_headers = obj.raw_headers
+            return hasil
+        hasil = self.response(200, 'OK', bytes(), headers)
+        hasil.raw_headers = obj.raw_headers
+        if obj.path is None:
+            hasil.body = obj.body
+        else:
+            try:
+                hasil.set_file(open(obj.path, 'rb'))
+            except FileNotFoundError:
+                # objek baru saja dibuang dari cache: ambil langsung
+                return HttpProxy.proxy(self, request)
+        hasil.head = request.method == 'HEAD'
+        return hasil
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+        served_from_cache = counters['hits'] + counters['stale']
+        counters['hit_ratio'] = round(served_from_cache / counters['requests'], 4) if counters['requests'] else 0.0
+        counters['upstream_saved'] = counters['requests'] - counters['upstream']
+        counters['cache'] = self.cache.stats()
+        counters['backends'] = self.pool.stats()
+        return counters
@@ -0,0 +1,277 @@
+import os
+import time
+import errno
+import socket
+import logging
+import selectors
+from selector_engine import listen_socket, BACKLOG, REAP_INTERVAL
+from upstream import BackendPool
+
+# === Konfigurasi proxy (bisa diubah lewat environment) ===
+# ukuran satu potongan yang dipindah per splice/recv (= kapasitas pipe default Linux)
+PROXY_CHUNK = int(os.getenv("PROXY_CHUNK", 64 * 1024))
+# koneksi tanpa aktivitas di kedua arah selama ini ditutup
+PROXY_TIMEOUT = float(os.getenv("PROXY_TIMEOUT", 60))
+# os.splice hanya ada di Linux (Python >= 3.10); selain itu lewat buffer
+HAS_SPLICE = hasattr(os, 'splice') and os.getenv("PROXY_SPLICE", "1") != "0"
+SPLICE_FLAGS = (os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK) if HAS_SPLICE else 0
+
+
+class Flow:
+    """
+    Satu arah aliran data src -> dst. Dengan splice data dipindah
+    socket -> pipe -> socket di dalam kernel tanpa pernah disalin ke memori
+    proses; tanpa splice dipakai satu buffer recv_into per arah. Hanya satu
+    potongan yang ditampung per arah, jadi pengirim yang cepat otomatis
+    tertahan oleh penerima yang lambat (backpressure).
+    """
+    __slots__ = ('src', 'dst', 'pipe_r', 'pipe_w', 'buffer', 'view', 'start', 'pending', 'eof', 'done')
+
+    def __init__(self, src, dst, use_splice):
+        self.src = src
+        self.dst = dst
+        self.pipe_r = self.pipe_w = None
+        self.buffer = self.view = None
+        if use_splice:
+            self.pipe_r, self.pipe_w = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+        else:
+            self.buffer = bytearray(PROXY_CHUNK)
+            self.view = memoryview(self.buffer)
+        self.start = 0
+        self.pending = 0
+        self.eof = False
+        self.done = False
+
+    def wants_read(self):
+        return not self.eof and not self.pending
+
+    def fill(self):
+        """Ambil satu potongan dari src; False jika src belum punya data."""
+        try:
+            if self.pipe_w is not None:
+                n = os.splice(self.src.fileno(), self.pipe_w, PROXY_CHUNK, flags=SPLICE_FLAGS)
+            else:
+                n = self.src.recv_into(self.buffer)
+                self.start = 0
+        except (BlockingIOError, InterruptedError):
+            return False
+        if not n:
+            self.eof = True
+        self.pending = n
+        return True
+
+    def drain(self):
+        """Kirim isi pipe/buffer ke dst; False jika dst penuh."""
+        while self.pending:
+            try:
+                if self.pipe_r is not None:
+                    n = os.splice(self.pipe_r, self.dst.fileno(), self.pending, flags=SPLICE_FLAGS)
+                else:
+                    n = self.dst.send(self.view[self.start:self.start + self.pending])
+                    self.start += n
+            except (BlockingIOError, InterruptedError):
+                return False
+            self.pending -= n
+        return True
+
+    def pump(self):
+        """Pindahkan data sampai salah satu sisi harus ditunggu."""
+        while not self.done:
+            if not self.drain():
+                return
+            if self.eof:
+                # src selesai mengirim: teruskan half-close ke dst
+                try:
+                    self.dst.shutdown(socket.SHUT_WR)
+                except OSError:
+                    pass
+                self.done = True
+                return
+            if not self.fill():
+                return
+
+    def close(self):
+        for fd in (self.pipe_r, self.pipe_w):
+            if fd is not None:
+                os.close(fd)
+        self.pipe_r = self.pipe_w = None
+
+
+class Tunnel:
+    """Pasangan koneksi client <-> upstream beserta dua Flow-nya."""
+    __slots__ = ('client', 'upstream', 'address', 'backend', 'upload', 'download', 'connecting',
+                 'attempts', 'events', 'last_active')
+
+    def __init__(self, client, address, use_splice):
+        self.client = client
+        self.upstream = None
+        self.address = address
+        self.backend = None
+        self.upload = Flow(client, None, use_splice)
+        self.download = Flow(None, client, use_splice)
+        self.connecting = True
+        self.attempts = 0
+        # socket -> event yang sedang didaftarkan di selector
+        self.events = {client: 0}
+        self.last_active = time.monotonic()
+
+    def set_upstream(self, upstream, backend):
+        self.upstream = upstream
+        self.backend = backend
+        self.upload.dst = upstream
+        self.download.src = upstream
+        self.events[upstream] = 0
+
+
+class TcpProxy:
+    """
+    Proxy TCP non-blocking satu thread berbasis selectors. Kedua arah
+    diteruskan sendiri-sendiri sehingga respon besar maupun protokol yang
+    tidak lock-step (pipelining, upload sambil download) tidak terpotong.
+    EOF dari satu sisi diteruskan sebagai shutdown(SHUT_WR) ke sisi lain;
+    tunnel ditutup setelah kedua arah selesai atau salah satu sisi error.
+
+    `backends` berupa BackendPool (atau satu alamat (host, port)); setiap
+    koneksi baru diarahkan ke backend pilihan pool, waktu connect menjadi
+    sampel latensi EWMA, dan connect yang gagal mengeluarkan backend dari
+    rotasi sampai health check meloloskannya lagi.
+    """
+
+    def __init__(self, port, backends, host='0.0.0.0', backlog=BACKLOG,
+                 timeout=PROXY_TIMEOUT, use_splice=HAS_SPLICE):
+        if not isinstance(backends, BackendPool):
+            backends = BackendPool([backends])
+        self.pool = backends
+        self.timeout = timeout
+        self.next_reap = time.monotonic() + REAP_INTERVAL
+        self.use_splice = use_splice
+        self.selector = selectors.DefaultSelector()
+        self.tunnels = set()
+        self.my_socket = listen_socket(host, port, backlog)
+        self.my_socket.setblocking(False)
+        self.selector.register(self.my_socket, selectors.EVENT_READ, None)
+
+    def serve_forever(self):
+        while True:
+            for key, mask in self.selector.select(timeout=1):
+                if key.data is None:
+                    self.accept()
+                    continue
+                tunnel = key.data
+                # tunnel sudah ditutup, atau socket upstream lama yang diganti saat retry
+                if key.fileobj is not tunnel.client and key.fileobj is not tunnel.upstream:
+                    continue
+                if tunnel.client.fileno() < 0:
+                    continue
+                self.handle(tunnel, key.fileobj, mask)
+            # pemeriksaan O(n) atas semua tunnel cukup sekali per REAP_INTERVAL
+            now = time.monotonic()
+            if now >= self.next_reap:
+                self.next_reap = now + REAP_INTERVAL
+                self.reap_idle(now)
+
+    def accept(self):
+        while True:
+            try:
+                client, address = self.my_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logging.warning(f"accept error: {e}")
+                return
+            client.setblocking(False)
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            tunnel = Tunnel(client, address, self.use_splice)
+            self.tunnels.add(tunnel)
+            self.connect(tunnel)
+
+    def connect(self, tunnel):
+        """
+        Connect non-blocking ke backend pilihan pool; jika gagal dicoba
+        backend lain (paling banyak sekali per backend) sebelum client ditutup.
+        """
+        while tunnel.attempts < len(self.pool.backends):
+            tunnel.attempts += 1
+            if tunnel.upstream is not None:
+                self.drop_upstream(tunnel)
+            backend = self.pool.pick()
+            upstream = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            upstream.setblocking(False)
+            upstream.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            backend.begin()
+            tunnel.set_upstream(upstream, backend)
+            tunnel.last_active = time.monotonic()
+            err = upstream.connect_ex(backend.address)
+            if err in (0, errno.EINPROGRESS):
+                self.set_events(tunnel, upstream, selectors.EVENT_WRITE)
+                return
+            logging.warning(f"backend {backend.name} error: {os.strerror(err)}")
+            backend.fail()
+        self.close(tunnel)
+
+    def drop_upstream(self, tunnel):
+        if tunnel.events.pop(tunnel.upstream):
+            self.selector.unregister(tunnel.upstream)
+        tunnel.upstream.close()
+        tunnel.backend.end()
+        tunnel.upstream = tunnel.backend = None
+
+    def handle(self, tunnel, sock, mask):
+        now = time.monotonic()
+        try:
+            if tunnel.connecting:
+                err = tunnel.upstream.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if err:
+                    logging.warning(f"backend {tunnel.backend.name} error: {os.strerror(err)}")
+                    tunnel.backend.fail()
+                    self.connect(tunnel)
+                    return
+                tunnel.connecting = False
+                tunnel.backend.observe(now - tunnel.last_active)
+            tunnel.last_active = now
+            # data client -> upstream dan upstream -> client dipompa sendiri-sendiri
+            tunnel.upload.pump()
+            tunnel.download.pump()
+        except OSError as e:
+            logging.warning(f"tunnel {tunnel.address}: {e}")
+            self.close(tunnel)
+            return
+        if tunnel.upload.done and tunnel.download.done:
+            self.close(tunnel)
+            return
+        self.update(tunnel)
+
+    def update(self, tunnel):
+        for sock, outgoing, incoming in ((tunnel.client, tunnel.upload, tunnel.download),
+                                         (tunnel.upstream, tunnel.download, tunnel.upload)):
+            # baca dari sock jika arah keluarnya kosong; tulis jika arah masuknya tertahan
+            events = selectors.EVENT_READ if outgoing.wants_read() else 0
+            if incoming.pending and not incoming.done:
+                events |= selectors.EVENT_WRITE
+            self.set_events(tunnel, sock, events)
+
+    def set_events(self, tunnel, sock, events):
+        current = tunnel.events[sock]
+        if events != current:
+            if not current:
+                self.selector.register(sock, events, tunnel)
+            elif events:
+                self.selector.modify(sock, events, tunnel)
+            else:
+                self.selector.unregister(sock)
+            tunnel.events[sock] = events
+
+    def close(self, tunnel):
+        self.tunnels.discard(tunnel)
+        if tunnel.upstream is not None:
+            self.drop_upstream(tunnel)
+        if tunnel.events.pop(tunnel.client, 0):
+            self.selector.unregister(tunnel.client)
+        tunnel.client.close()
+        tunnel.upload.close()
+        tunnel.download.close()
+
+    def reap_idle(self, now):
+        batas = now - self.timeout
+        for tunnel in [t for t in self.tunnels if t.last_active < batas]:
+            self.close(tunnel)
@@ -0,0 +1,132 @@
+import time
+import socket
+import logging
+from http import Response, HttpServer
+from upstream import BackendPool, Spool, UpstreamError, SPOOL_SIZE
+
+# header hop-by-hop tidak diteruskan (RFC 7230 6.1); Content-Length,
+# Date, dan Server dibuat ulang oleh Response milik proxy
+HOP_HEADERS = frozenset(('connection', 'keep-alive', 'proxy-connection', 'te', 'trailer',
+                         'transfer-encoding', 'upgrade', 'expect', 'content-length'))
+RESPONSE_SKIP = HOP_HEADERS | {'date', 'server'}
+# request yang aman diulang ke koneksi baru jika koneksi pool ternyata basi
+IDEMPOTENT = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+
+
+class HttpProxy:
+    """
+    Reverse proxy HTTP dengan antarmuka yang sama seperti HttpServer
+    (response, body_sink, handle) sehingga bisa dijalankan oleh
+    serve_connection maupun server asyncio. Setiap request diteruskan ke
+    backend pilihan BackendPool lewat koneksi keep-alive dari pool; body
+    besar (upload maupun respon) ditampung di file sementara dan dikirim
+    dengan sendfile.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def response(self, kode=404, message='Not Found', messagebody=bytes(), headers={}):
+        return Response(kode, message, messagebody, headers)
+
+    def body_sink(self, request):
+        return Spool()
+
+    def handle(self, request):
+        if request.version not in ('HTTP/1.0', 'HTTP/1.1'):
+            return self.response(505, 'HTTP Version Not Supported', '', {})
+        try:
+            hasil = self.proxy(request)
+        except UpstreamError as e:
+            hasil = self.response(e.kode, e.message, e.message, {'Content-Type': 'text/plain'})
+        hasil.keep_alive = HttpServer.wants_keep_alive(request.version, request.headers)
+        return hasil
+
+    def proxy(self, request):
+        """Teruskan request apa adanya; diganti subclass (mis. CachingProxy)."""
+        return self.to_response(self.forward(request))
+
+    def request_head(self, request, length):
+        target = request.path + ('?' + request.query if request.query else '')
+        lines = [f"{request.method} {target} HTTP/1.1\r\n"]
+        for k, v in request.headers.items():
+            if k not in HOP_HEADERS:
+                lines.append(f"{k}: {v}\r\n")
+        if length or request.method in ('POST', 'PUT'):
+            lines.append(f"Content-Length: {length}\r\n")
+        lines.append("\r\n")
+        return ''.join(lines).encode('iso-8859-1')
+
+    def forward(self, request, spool_limit=SPOOL_SIZE):
+        """Kirim request ke backend dan kembalikan UpstreamResponse."""
+        body = request.body
+        if isinstance(body, Spool):
+            body = body.finish()
+        length = len(body) if type(body) is bytes else body_size(body)
+        head = self.request_head(request, length)
+        # POST dan sejenisnya tidak boleh terkirim ke koneksi pool yang basi
+        # (tidak bisa diulang), jadi selalu memakai koneksi baru
+        idempotent = request.method in IDEMPOTENT
+        try:
+            for attempt in range(2):
+                backend = self.pool.pick()
+                backend.begin()
+                mulai = time.monotonic()
+                try:
+                    conn = backend.acquire(fresh=not idempotent or attempt > 0)
+                except OSError as e:
+                    backend.end()
+                    backend.fail()
+                    logging.warning(f"backend {backend.name} tidak bisa dihubungi: {e}")
+                    continue
+                try:
+                    if type(body) is not bytes:
+                        body.seek(0)
+                    conn.send_request(head, body)
+                    hasil = conn.read_response(request.method, spool_limit)
+                except socket.timeout:
+                    conn.close()
+                    raise UpstreamError(504, 'Gateway Timeout')
+                except UpstreamError:
+                    # head upstream rusak/terlalu besar: koneksi tidak bisa dipakai lagi
+                    conn.close()
+                    raise
+                except (OSError, ValueError) as e:
+                    conn.close()
+                    # ulangi sekali dengan koneksi baru
+                    if attempt == 0 and idempotent:
+                        continue
+                    # koneksi pool yang sudah ditutup backend bukan tanda backend sakit
+                    if not conn.reused:
+                        backend.fail()
+                    raise UpstreamError(502, f'Bad Gateway: {e}')
+                finally:
+                    backend.end()
+                backend.observe(time.monotonic() - mulai)
+                backend.release(conn, hasil.keep_alive)
+                return hasil
+            raise UpstreamError(502, 'Bad Gateway: tidak ada backend yang bisa dihubungi')
+        finally:
+            if type(body) is not bytes:
+                body.close()
+
+    def to_response(self, upstream):
+        hasil = self.response(upstream.kode, upstream.message, bytes(), {})
+        hasil.raw_headers = ''.join(f"{k}: {v}\r\n" for k, v in upstream.headers
+                                    if k.lower() not in RESPONSE_SKIP).encode('iso-8859-1')
+        if type(upstream.body) is bytes:
+            hasil.body = upstream.body
+        else:
+            hasil.set_file(upstream.body)
+        length = upstream.header('content-length')
+        if not hasil.content_length() and length.isdigit():
+            # respon HEAD: Content-Length dari backend tetap diteruskan
+            hasil.length = int(length)
+        return hasil
+
+
+def body_size(f):
+    f.seek(0, 2)
+    size = f.tell()
+    f.seek(0)
+    return size
@@ -0,0 +1,93 @@
+class Route:
+    __slots__ = ('handlers', 'safe')
+
+    def __init__(self):
+        # method -> fungsi handler
+        self.handlers = {}
+        # False untuk GET yang mengubah data (mis. /delete/): HEAD tidak
+        # boleh jatuh ke handler GET-nya
+        self.safe = True
+
+    def allowed(self):
+        methods = set(self.handlers)
+        if 'GET' in methods and self.safe:
+            methods.add('HEAD')
+        return ', '.join(sorted(methods))
+
+
+class TrieNode:
+    __slots__ = ('children', 'route')
+
+    def __init__(self):
+        self.children = {}
+        self.route = None
+
+
+class Router:
+    """
+    Tabel routing: path persis disimpan di dict (satu lookup), route prefix
+    disimpan di trie per segmen path sehingga biaya pencarian sebanding
+    dengan kedalaman path, bukan jumlah route yang terdaftar.
+
+    match() mengembalikan (route, sisa_path) untuk prefix terpanjang yang
+    cocok, atau (None, None). Pemilihan handler per method (termasuk HEAD
+    yang jatuh ke GET, hanya untuk route.safe) dilakukan oleh pemanggil
+    lewat route.handlers.
+    """
+
+    def __init__(self):
+        self.exact = {}
+        self.root = TrieNode()
+
+    def route(self, path, methods=('GET',), prefix=False, safe=True):
+        """
+        Decorator: daftarkan handler untuk `path` (atau semua path di
+        bawahnya). safe=False untuk handler GET yang mengubah data.
+        """
+        def decorator(func):
+            if prefix:
+                node = self.root
+                for segment in self.segments(path):
+                    node = node.children.setdefault(segment, TrieNode())
+                if node.route is None:
+                    node.route = Route()
+                route = node.route
+            else:
+                route = self.exact.setdefault(path, Route())
+            if not safe:
+                route.safe = False
+            for method in methods:
+                route.handlers[method] = func
+            return func
+        return decorator
+
+    def get(self, path, prefix=False, safe=True):
+        return self.route(path, ('GET',), prefix, safe)
+
+    def post(self, path, prefix=False):
+        return self.route(path, ('POST', 'PUT'), prefix)
+
+    @staticmethod
+    def segments(path):
+        return [segment for segment in path.split('/') if segment]
+
+    def match(self, path):
+        route = self.exact.get(path)
+        if route is not None:
+            return route, ''
+        node = self.root
+        best = node.route
+        rest = path.lstrip('/')
+        sisa = rest
+        while rest:
+            segment, _, tail = rest.partition('/')
+            node = node.children.get(segment)
+            if node is None:
+                break
+            rest = tail
+            if node.route is not None:
+                best = node.route
+                sisa = rest
+        if best is None:
+            return None, None
+        return best, sisa
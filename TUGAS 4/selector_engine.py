@@ -0,0 +1,350 @@
+import os
+import ssl
+import time
+import socket
+import logging
+import selectors
+import collections
+from http_connection import (finalize, error_response, KEEPALIVE_TIMEOUT, KEEPALIVE_MAX, RECV_SIZE, CONTINUE,
+                             BACKLOG, WRITE_TIMEOUT)
+from http_parser import RequestParser, HttpParseError, abort_bodies
+from metrics import metrics
+from access_log import access_log
+
+# === Konfigurasi engine (bisa diubah lewat environment) ===
+# jika antrian keluaran melebihi ini, berhenti membaca request baru dari
+# koneksi tersebut sampai client mengambil datanya (backpressure)
+MAX_PENDING_OUTPUT = int(os.getenv("HTTP_MAX_PENDING_OUTPUT", 1024 * 1024))
+# jumlah buffer maksimum per sendmsg (di bawah IOV_MAX Linux)
+MAX_IOV = 64
+# socket TLS tidak bisa sendfile; file dibaca dan dienkripsi per potongan ini
+TLS_FILE_CHUNK = 256 * 1024
+# jarak antar pemeriksaan koneksi idle/macet (detik)
+REAP_INTERVAL = 1.0
+
+
+def listen_socket(host, port, backlog=BACKLOG, reuse_port=False):
+    """Socket listen TCP; dengan reuse_port beberapa proses bisa bind port yang sama."""
+    my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    my_socket.bind((host, port))
+    my_socket.listen(backlog)
+    return my_socket
+
+
+class Connection:
+    __slots__ = ('sock', 'address', 'parser', 'outgoing', 'pending', 'served',
+                 'closing', 'last_active', 'last_write', 'events', 'tls', 'handshaking')
+
+    def __init__(self, sock, address, parser):
+        self.sock = sock
+        self.address = address
+        self.parser = parser
+        # antrian keluaran: memoryview, [file, offset, count] untuk
+        # os.sendfile, atau objek file sebagai penanda file harus ditutup
+        self.outgoing = collections.deque()
+        self.pending = 0
+        self.served = 0
+        self.closing = False
+        self.last_active = self.last_write = time.monotonic()
+        self.events = selectors.EVENT_READ
+        self.tls = isinstance(sock, ssl.SSLSocket)
+        self.handshaking = self.tls
+
+
+class SelectorServer:
+    """
+    Server HTTP non-blocking satu thread berbasis modul selectors (epoll di
+    Linux). Setiap koneksi punya parser, buffer, dan antrian keluaran sendiri.
+    Setiap event dikuras sampai EAGAIN (accept/recv/send diulang sampai socket
+    kosong atau penuh) seperti gaya edge-triggered, dan minat EVENT_WRITE
+    hanya didaftarkan selama masih ada data yang belum terkirim.
+
+    Dengan `ssl_context` setiap koneksi dibungkus TLS dan handshake-nya
+    dijalankan non-blocking di event loop yang sama, sehingga handshake yang
+    lambat tidak pernah menahan accept maupun koneksi lain.
+    """
+
+    def __init__(self, httpserver, port, host='0.0.0.0', backlog=BACKLOG,
+                 timeout=KEEPALIVE_TIMEOUT, max_requests=KEEPALIVE_MAX, trace=False,
+                 sock=None, reuse_port=False, ssl_context=None, write_timeout=WRITE_TIMEOUT):
+        self.httpserver = httpserver
+        self.ssl_context = ssl_context
+        self.timeout = timeout
+        self.write_timeout = write_timeout
+        self.next_reap = time.monotonic() + REAP_INTERVAL
+        self.max_requests = max_requests
+        self.trace = trace
+        self.selector = selectors.DefaultSelector()
+        self.buffer = bytearray(RECV_SIZE)
+        self.view = memoryview(self.buffer)
+        self.connections = {}
+        # `sock`: listener yang sudah dibuat (mis. diwarisi dari master pre-fork)
+        self.my_socket = sock if sock is not None else listen_socket(host, port, backlog, reuse_port)
+        self.my_socket.setblocking(False)
+        self.selector.register(self.my_socket, selectors.EVENT_READ, None)
+
+    def serve_forever(self):
+        while True:
+            for key, mask in self.selector.select(timeout=1):
+                if key.data is None:
+                    self.accept()
+                    continue
+                conn = key.data
+                try:
+                    if conn.handshaking:
+                        self.handshake(conn)
+                        continue
+                    if mask & selectors.EVENT_READ:
+                        self.read(conn)
+                    if mask & selectors.EVENT_WRITE and conn.sock.fileno() >= 0:
+                        self.flush(conn)
+                except Exception:
+                    # error tak terduga hanya menutup koneksi ini, bukan event loop
+                    logging.exception(f"koneksi {conn.address} error")
+                    self.close(conn)
+            # pemeriksaan O(n) atas semua koneksi cukup sekali per REAP_INTERVAL
+            now = time.monotonic()
+            if now >= self.next_reap:
+                self.next_reap = now + REAP_INTERVAL
+                self.reap_idle(now)
+
+    def accept(self):
+        while True:
+            try:
+                sock, address = self.my_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                # mis. EMFILE: coba lagi pada event berikutnya
+                logging.warning(f"accept error: {e}")
+                return
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.ssl_context is not None:
+                sock = self.ssl_context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False)
+            conn = Connection(sock, address, RequestParser(body_sink=self.httpserver.body_sink))
+            self.connections[sock.fileno()] = conn
+            metrics.connection(1)
+            self.selector.register(sock, selectors.EVENT_READ, conn)
+
+    def handshake(self, conn):
+        """Lanjutkan handshake TLS sejauh mungkin tanpa blocking."""
+        try:
+            conn.sock.do_handshake()
+        except ssl.SSLWantReadError:
+            self.set_events(conn, selectors.EVENT_READ)
+            return
+        except ssl.SSLWantWriteError:
+            self.set_events(conn, selectors.EVENT_WRITE)
+            return
+        except OSError as e:
+            if self.trace:
+                logging.warning(f"handshake {conn.address} gagal: {e}")
+            self.close(conn)
+            return
+        conn.handshaking = False
+        conn.last_active = time.monotonic()
+        # request pertama bisa sudah ikut terbaca bersama akhir handshake
+        self.read(conn)
+
+    def read(self, conn):
+        while not conn.closing and conn.pending < MAX_PENDING_OUTPUT:
+            try:
+                n = conn.sock.recv_into(self.buffer)
+            except (BlockingIOError, InterruptedError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                break
+            except OSError:
+                self.close(conn)
+                return
+            if not n:
+                self.close(conn)
+                return
+            conn.last_active = mulai = time.monotonic()
+            try:
+                requests = conn.parser.feed(self.view[:n])
+            except HttpParseError as e:
+                self.queue(conn, error_response(self.httpserver, e))
+                conn.closing = True
+                break
+            metrics.parsed(time.monotonic() - mulai, n)
+            self.process(conn, requests)
+            # request terakhir masih menunggu body: minta client melanjutkan
+            if conn.parser.take_continue() and not conn.closing:
+                conn.outgoing.append(memoryview(CONTINUE))
+                conn.pending += len(CONTINUE)
+        self.flush(conn)
+
+    def process(self, conn, requests):
+        # semua request lengkap langsung dilayani; backpressure hanya
+        # menahan recv berikutnya, bukan request yang sudah diparse
+        try:
+            while requests:
+                request = requests.pop(0)
+                conn.served += 1
+                mulai = time.perf_counter()
+                respon = finalize(self.httpserver.handle(request), conn.served, self.max_requests, self.timeout)
+                nbytes = self.queue(conn, respon)
+                if self.trace:
+                    # durasi sampai respon masuk antrian keluaran (pengiriman berjalan di flush)
+                    access_log.request(conn.address, request, respon, nbytes, time.perf_counter() - mulai)
+                if not respon.keep_alive:
+                    conn.closing = True
+                    return
+        finally:
+            # koneksi ditutup sebelum request sisanya dilayani: buang body upload-nya
+            abort_bodies(requests)
+
+    def queue(self, conn, respon):
+        header = respon.header_bytes()
+        conn.outgoing.append(memoryview(header))
+        conn.pending += len(header)
+        # waktu kirim tidak bisa diatribusikan per respon di sini (antrian
+        # dikirim bertahap oleh flush); yang dicatat hanya jumlah byte
+        nbytes = len(header) + (0 if respon.head else respon.content_length())
+        metrics.sent(respon.route, None, nbytes)
+        for part in respon.body_parts():
+            if type(part) is tuple:
+                conn.outgoing.append([respon.file, part[0], part[1]])
+            else:
+                conn.outgoing.append(memoryview(part))
+            conn.pending += part[1] if type(part) is tuple else len(part)
+        if respon.file is not None:
+            conn.outgoing.append(respon.file)
+        return nbytes
+
+    def flush(self, conn):
+        """Kirim sebanyak mungkin dari antrian tanpa blocking."""
+        mulai = time.monotonic() if conn.outgoing else None
+        awal = conn.pending
+        try:
+            while conn.outgoing:
+                item = conn.outgoing[0]
+                if conn.tls:
+                    # SSLSocket tidak mendukung sendmsg maupun sendfile
+                    if not self.send_tls(conn, item):
+                        break
+                    continue
+                if type(item) is memoryview:
+                    # header dan body bytes yang berurutan dikirim dengan satu sendmsg
+                    views = []
+                    for item in conn.outgoing:
+                        if type(item) is not memoryview or len(views) == MAX_IOV:
+                            break
+                        views.append(item)
+                    sent = total = conn.sock.sendmsg(views)
+                    conn.pending -= sent
+                    while sent and sent >= len(conn.outgoing[0]):
+                        sent -= len(conn.outgoing.popleft())
+                    if sent:
+                        conn.outgoing[0] = conn.outgoing[0][sent:]
+                    if total < sum(map(len, views)):
+                        # socket penuh; lanjutkan saat EVENT_WRITE
+                        break
+                    continue
+                elif type(item) is list:
+                    f, offset, count = item
+                    sent = os.sendfile(conn.sock.fileno(), f.fileno(), offset, count) if count else 0
+                    conn.pending -= sent
+                    item[1] += sent
+                    item[2] -= sent
+                    if item[2] > 0:
+                        if not sent:
+                            # file menyusut di tengah pengiriman; tidak bisa dilanjutkan
+                            self.close(conn)
+                            return
+                        continue
+                else:
+                    item.close()
+                conn.outgoing.popleft()
+        except (BlockingIOError, InterruptedError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+            pass
+        except OSError:
+            self.close(conn)
+            return
+        if mulai is not None:
+            selesai = time.monotonic()
+            metrics.sent('-', selesai - mulai, 0)
+            if conn.pending != awal:
+                conn.last_write = selesai
+
+        if not conn.outgoing and conn.closing:
+            self.close(conn)
+            return
+        events = selectors.EVENT_WRITE if conn.outgoing else 0
+        if not conn.closing and conn.pending < MAX_PENDING_OUTPUT:
+            events |= selectors.EVENT_READ
+            if conn.tls and not conn.outgoing and conn.sock.pending():
+                # data terdekripsi yang tertahan di SSLSocket tidak memicu
+                # event di selector; baca langsung setelah backpressure lepas
+                self.set_events(conn, events)
+                self.read(conn)
+                return
+        self.set_events(conn, events)
+
+    def send_tls(self, conn, item):
+        """Kirim satu item antrian lewat SSLSocket; False jika harus menunggu."""
+        if type(item) is memoryview:
+            sent = conn.sock.send(item)
+            conn.pending -= sent
+            if sent < len(item):
+                conn.outgoing[0] = item[sent:]
+                return False
+        elif type(item) is list:
+            f, offset, count = item
+            if count:
+                # potongan yang sama dibaca ulang jika send harus diulang
+                data = os.pread(f.fileno(), min(count, TLS_FILE_CHUNK), offset)
+                if not data:
+                    # file menyusut di tengah pengiriman; tidak bisa dilanjutkan
+                    raise OSError('file truncated')
+                sent = conn.sock.send(data)
+                conn.pending -= sent
+                item[1] += sent
+                item[2] -= sent
+                return True
+        else:
+            item.close()
+        conn.outgoing.popleft()
+        return True
+
+    def set_events(self, conn, events):
+        if events != conn.events:
+            if not conn.events:
+                self.selector.register(conn.sock, events, conn)
+            elif events:
+                self.selector.modify(conn.sock, events, conn)
+            else:
+                self.selector.unregister(conn.sock)
+            conn.events = events
+
+    def close(self, conn):
+        if conn.sock.fileno() < 0:
+            return
+        metrics.connection(-1)
+        self.connections.pop(conn.sock.fileno(), None)
+        if conn.events:
+            self.selector.unregister(conn.sock)
+        conn.events = 0
+        for item in conn.outgoing:
+            if type(item) is not memoryview and type(item) is not list:
+                item.close()
+        conn.outgoing.clear()
+        conn.parser.close()
+        conn.sock.close()
+
+    def reap_idle(self, now):
+        # tutup koneksi keep-alive yang menganggur lebih lama dari timeout, dan
+        # koneksi yang keluarannya tidak terkirim selama write_timeout
+        batas = now - self.timeout
+        batas_tulis = now - self.write_timeout
+        for conn in list(self.connections.values()):
+            if not conn.outgoing:
+                if conn.last_active < batas:
+                    self.close(conn)
+            elif max(conn.last_write, conn.last_active) < batas_tulis:
+                if self.trace:
+                    logging.warning(f"koneksi {conn.address} macet, ditutup")
+                self.close(conn)
@@ -0,0 +1,22 @@
+import sys
+import logging
+from http import HttpServer
+from selector_engine import SelectorServer
+from tls_context import server_context
+
+# versi TLS dari server_async_http: handshake, keep-alive, dan pengiriman
+# semuanya non-blocking di satu event loop (lihat SelectorServer.handshake)
+httpserver = HttpServer()
+
+def main():
+	portnumber=8444
+	try:
+		portnumber=int(sys.argv[1])
+	except:
+		pass
+	svr = SelectorServer(httpserver, portnumber, ssl_context=server_context())
+	logging.warning("running on port {}" . format(portnumber))
+	svr.serve_forever()
+
+if __name__=="__main__":
+	main()
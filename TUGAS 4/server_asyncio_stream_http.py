@@ -1,46 +1,128 @@
-from socket import *
-import socket
+import os
 import time
-import sys
 import logging
-import multiprocessing
-from concurrent.futures import ProcessPoolExecutor
 import asyncio
+import resource
+from concurrent.futures import ThreadPoolExecutor
 from http import HttpServer
+from http_connection import finalize, error_response, KEEPALIVE_TIMEOUT, RECV_SIZE, CONTINUE, BACKLOG, WRITE_TIMEOUT
+from http_parser import RequestParser, HttpParseError, abort_bodies
+from metrics import metrics
+
+# === Konfigurasi (bisa diubah lewat environment) ===
+PORT = int(os.getenv("HTTP_PORT", 8886))
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 10000))
+IO_WORKERS = int(os.getenv("HTTP_IO_WORKERS", 8))
 
 httpserver = HttpServer()
+# handle() bisa stat/open/read file; jalankan di thread pool terbatas agar
+# event loop tidak pernah menunggu disk
+executor = ThreadPoolExecutor(IO_WORKERS)
+active = 0
+metrics.gauge('http_worker_queue_depth', 'Pekerjaan yang menunggu thread pool IO.', lambda: executor._work_queue.qsize())
 
-class ProcessTheClient(asyncio.Protocol):
-		def connection_made(self, transport):
-			peername = transport.get_extra_info('peername')
-			print('Connection from {}'.format(peername))
-			self.transport = transport
-			self.rcv = ""
-		def data_received(self, data: bytes) -> None:
-			try:
-				d = data.decode()
-				self.rcv=self.rcv+d
-				if self.rcv[-2:]=='\r\n':
-					hasil = httpserver.proses(self.rcv)
-					hasil=hasil+"\r\n\r\n".encode()
-					self.transport.write(hasil)
-					self.transport.close()
-					self.rcv=""
-			except OSError as e:
-				pass
 
+async def write_response(writer, hasil):
+	loop = asyncio.get_running_loop()
+	try:
+		buffers = [hasil.header_bytes()]
+		total = len(buffers[0]) + (0 if hasil.head else hasil.content_length())
+		for part in hasil.body_parts():
+			if type(part) is tuple:
+				#body file dikirim langsung dari disk (os.sendfile)
+				writer.writelines(buffers)
+				buffers = []
+				if part[1]:
+					await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+					await asyncio.wait_for(loop.sendfile(writer.transport, hasil.file, part[0], part[1]), WRITE_TIMEOUT)
+			else:
+				buffers.append(part)
+		#header dan body bytes ditulis sekaligus
+		writer.writelines(buffers)
+		#backpressure: tunggu buffer kirim turun sebelum request berikutnya
+		await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+		return total
+	finally:
+		hasil.close()
 
 
-async def Server():
+async def ProcessTheClient(reader, writer):
+	global active
 	loop = asyncio.get_running_loop()
+	if active >= MAX_CONNECTIONS:
+		#batas koneksi tercapai: tolak dengan cepat daripada menumpuk
+		hasil = httpserver.response(503, 'Service Unavailable', 'Server sibuk', {'Retry-After': '1'})
+		writer.write(hasil.to_bytes())
+		writer.close()
+		return
+	active += 1
+	metrics.connection(1)
+	parser = RequestParser(body_sink=httpserver.body_sink)
+	served = 0
+	#request pipelined yang sudah diparse tetapi belum dilayani
+	requests = []
+	try:
+		while True:
+			try:
+				data = await asyncio.wait_for(reader.read(RECV_SIZE), KEEPALIVE_TIMEOUT)
+			except asyncio.TimeoutError:
+				break
+			if not data:
+				break
+			mulai = time.perf_counter()
+			try:
+				if parser.streaming():
+					#body upload ditulis ke disk di thread pool, bukan di loop
+					requests = await loop.run_in_executor(executor, parser.feed, data)
+				else:
+					requests = parser.feed(data)
+			except HttpParseError as e:
+				await write_response(writer, error_response(httpserver, e))
+				break
+			metrics.parsed(time.perf_counter() - mulai, len(data))
+			keep_alive = True
+			while requests:
+				request = requests.pop(0)
+				served += 1
+				hasil = finalize(await loop.run_in_executor(executor, httpserver.handle, request), served)
+				mulai = time.perf_counter()
+				nbytes = await write_response(writer, hasil)
+				metrics.sent(hasil.route, time.perf_counter() - mulai, nbytes)
+				keep_alive = hasil.keep_alive
+				if not keep_alive:
+					break
+			if not keep_alive:
+				break
+			#request terakhir masih menunggu body: minta client melanjutkan
+			if parser.take_continue():
+				writer.write(CONTINUE)
+	except (OSError, asyncio.TimeoutError) as e:
+		logging.info(f"connection error: {e}")
+	finally:
+		active -= 1
+		metrics.connection(-1)
+		parser.close()
+		#upload milik request yang tidak sempat dilayani dibuang
+		abort_bodies(requests)
+		writer.close()
+
+
+def raise_fd_limit():
+	#10k+ koneksi butuh file descriptor lebih dari batas default (1024)
+	soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+	if soft != resource.RLIM_INFINITY and (hard == resource.RLIM_INFINITY or soft < hard):
+		try:
+			resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+		except (ValueError, OSError):
+			pass
 
-	server = await loop.create_server(
-		lambda: ProcessTheClient(),
-		'0.0.0.0', 8886)
 
+async def Server():
+	raise_fd_limit()
+	server = await asyncio.start_server(ProcessTheClient, '0.0.0.0', PORT, backlog=BACKLOG)
+	logging.warning("running on port {}".format(PORT))
 	async with server:
 		await server.serve_forever()
 
 if __name__=="__main__":
 	asyncio.run(Server())
-
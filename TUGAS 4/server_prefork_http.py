@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from http import HttpServer
+from http_connection import serve_connection
+from selector_engine import SelectorServer, listen_socket
+from metrics import metrics
+from shm_cache import SharedCache
+
+# === Konfigurasi (bisa diubah lewat environment) ===
+PORT = int(os.getenv("HTTP_PORT", 8888))
+# jumlah proses worker (HTTP_WORKERS di server pool berarti jumlah thread/proses pool)
+PROCESSES = int(os.getenv("HTTP_PROCESSES", os.cpu_count() or 1))
+# 'selector': tiap worker satu event loop; 'thread': tiap worker thread pool
+WORKER_MODE = os.getenv("HTTP_WORKER_MODE", "selector")
+WORKER_THREADS = int(os.getenv("HTTP_WORKER_THREADS", 20))
+# worker yang mati lebih cepat dari ini dianggap crash-loop; respawn ditunda
+MIN_WORKER_LIFETIME = 1.0
+RESPAWN_DELAY = 1.0
+
+HAS_REUSEPORT = hasattr(socket, 'SO_REUSEPORT')
+
+
+def worker_main(shared_socket):
+    """
+    Isi proses worker. Dengan SO_REUSEPORT setiap worker bind socket sendiri
+    ke port yang sama sehingga kernel yang membagi koneksi antar worker;
+    tanpa itu worker memakai listener warisan dari master.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    my_socket = shared_socket if shared_socket is not None else listen_socket('0.0.0.0', PORT, reuse_port=True)
+    httpserver = HttpServer()
+    if WORKER_MODE == 'thread':
+        my_socket.setblocking(True)
+        with ThreadPoolExecutor(WORKER_THREADS) as executor:
+            metrics.gauge('http_worker_queue_depth', 'Koneksi yang menunggu thread pool.', lambda: executor._work_queue.qsize())
+            while True:
+                connection, client_address = my_socket.accept()
+                executor.submit(serve_connection, connection, client_address, httpserver)
+    else:
+        SelectorServer(httpserver, PORT, sock=my_socket).serve_forever()
+
+
+class Master:
+    """Proses master: fork N worker, awasi, dan respawn worker yang mati."""
+
+    def __init__(self, workers=PROCESSES):
+        self.workers = workers
+        self.children = {}
+        self.running = True
+        # tanpa SO_REUSEPORT listener dibuat sekali di master lalu diwarisi worker
+        self.shared_socket = None if HAS_REUSEPORT else listen_socket('0.0.0.0', PORT)
+        # isi file statis disimpan sekali di shared memory untuk semua worker
+        self.shared_cache = SharedCache.create()
+        self.shared_cache.publish()
+        # /metrics di worker mana pun menjumlahkan angka semua worker
+        metrics.share()
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                worker_main(self.shared_socket)
+            except KeyboardInterrupt:
+                pass
+            except BaseException:
+                # worker crash: catat traceback dan laporkan ke master lewat status
+                logging.exception("worker {} crashed".format(os.getpid()))
+                status = 1
+            finally:
+                logging.shutdown()
+                os._exit(status)
+        self.children[pid] = time.monotonic()
+        return pid
+
+    def stop(self, signum, frame):
+        self.running = False
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        logging.warning("master {} running on port {} with {} {} workers ({})".format(
+            os.getpid(), PORT, self.workers, WORKER_MODE,
+            'SO_REUSEPORT' if HAS_REUSEPORT else 'shared listener'))
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            started = self.children.pop(pid, None)
+            if not self.running or started is None:
+                continue
+            logging.warning("worker {} exited with status {}, respawning".format(pid, os.waitstatus_to_exitcode(status)))
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                time.sleep(RESPAWN_DELAY)
+            if self.running:
+                self.spawn()
+
+
+def main():
+    workers = PROCESSES
+    try:
+        workers = int(sys.argv[1])
+    except (IndexError, ValueError):
+        pass
+    Master(workers).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,9 @@ import sys
 import logging
 import multiprocessing
 from http import HttpServer
+from http_connection import serve_connection
+from shm_cache import SharedCache
+from metrics import metrics
 
 httpserver = HttpServer()
 
@@ -16,32 +19,12 @@ class ProcessTheClient(multiprocessing.Process):
 		multiprocessing.Process.__init__(self)
 
 	def run(self):
-		rcv=""
-		while True:
-			try:
-				data = self.connection.recv(32)
-				if data:
-					#merubah input dari socket (berupa bytes) ke dalam string
-					#agar bisa mendeteksi \r\n
-					d = data.decode()
-					rcv=rcv+d
-					if rcv[-2:]=='\r\n':
-						#end of command, proses string
-						#logging.warning("data dari client: {}" . format(rcv))
-						hasil = httpserver.proses(rcv)
-						#hasil akan berupa bytes
-						#untuk bisa ditambahi dengan string, maka string harus di encode
-						hasil=hasil+"\r\n\r\n".encode()
-						#logging.warning("balas ke  client: {}" . format(hasil))
-						#hasil sudah dalam bentuk bytes
-						self.connection.sendall(hasil)
-						rcv=""
-						self.connection.close()
-				else:
-					break
-			except OSError as e:
-				pass
-		self.connection.close()
+		#satu koneksi bisa membawa beberapa request (keep-alive / pipelining)
+		try:
+			serve_connection(self.connection, self.address, httpserver)
+		finally:
+			#angka proses ini tetap terhitung di /metrics setelah proses selesai
+			metrics.retire()
 
 
 
@@ -55,13 +38,28 @@ class Server(multiprocessing.Process):
 	def run(self):
 		self.my_socket.bind(('0.0.0.0', 8889))
 		self.my_socket.listen(1)
-		while True:
-			self.connection, self.client_address = self.my_socket.accept()
-			logging.warning("connection from {}".format(self.client_address))
+		#isi file statis disimpan sekali di shared memory dan diwarisi
+		#setiap proses anak lewat fork, bukan dibaca ulang per koneksi
+		httpserver.cache.shared = SharedCache.create()
+		httpserver.cache.shared.publish()
+		#/metrics dijawab proses anak: angka semua proses digabung lewat
+		#segmen shared memory
+		metrics.share()
+		try:
+			while True:
+				self.connection, self.client_address = self.my_socket.accept()
+				logging.warning("connection from {}".format(self.client_address))
 
-			clt = ProcessTheClient(self.connection, self.client_address)
-			clt.start()
-			self.the_clients.append(clt)
+				clt = ProcessTheClient(self.connection, self.client_address)
+				clt.start()
+				#salinan socket di proses ini tidak dipakai lagi; tanpa ditutup
+				#client tidak akan menerima EOF saat proses anak menutup koneksi
+				self.connection.close()
+				self.the_clients.append(clt)
+		finally:
+			#atexit tidak dijalankan di multiprocessing.Process
+			httpserver.cache.shared.unlink()
+			metrics.unshare()
 
 
 
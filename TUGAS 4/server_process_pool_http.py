@@ -1,56 +1,67 @@
 import socket
 import logging
+import multiprocessing
 from concurrent.futures import ProcessPoolExecutor
 from http import HttpServer
+from http_connection import serve_connection, BACKLOG
+from selector_engine import listen_socket
+from admission import Admission, expired, reject, WORKERS
+from shm_cache import SharedCache
+from metrics import metrics
 
 httpserver = HttpServer()
+# jumlah koneksi yang menunggu worker, dibagi proses utama (Admission.share)
+waiting = None
 
-def ProcessTheClient(connection, address):
-    try:
-        rcv = ""
-        while True:
-            data = connection.recv(1024)
-            if not data:
-                break
-            rcv += data.decode()
-            if '\r\n\r\n' in rcv:
-                # pisahkan header dan body
-                headers, body = rcv.split('\r\n\r\n', 1)
-                content_length = 0
-                for line in headers.split('\r\n'):
-                    if line.lower().startswith('content-length:'):
-                        content_length = int(line.split(':')[1].strip())
-                # lanjutkan membaca jika body belum lengkap
-                while len(body.encode()) < content_length:
-                    data = connection.recv(1024)
-                    if not data:
-                        break
-                    body += data.decode()
-                break
-
-        full_request = headers + '\r\n\r\n' + body
-        hasil = httpserver.proses(full_request)
-        hasil += b"\r\n\r\n"
-        connection.sendall(hasil)
-    except Exception as e:
-        logging.warning(f"Error processing client {address}: {e}")
-    finally:
-        connection.close()
+def init_worker(shared):
+    global waiting
+    waiting = shared
+
+def busy():
+    return waiting is not None and waiting.value > 0
+
+def ProcessTheClient(connection, address, accepted):
+    # terlalu lama menunggu worker: jawab 503 daripada melayani terlambat
+    # (time.monotonic sama untuk semua proses di satu mesin)
+    if expired(accepted):
+        reject(connection, httpserver)
+        return False
+    # koneksi tetap dibuka untuk request berikutnya (keep-alive / pipelining)
+    # selama tidak ada koneksi lain yang menunggu worker
+    serve_connection(connection, address, httpserver, busy=busy)
+    return True
+
+def finished(admission, ticket, connection, f):
+    # salinan socket di proses utama baru ditutup setelah worker selesai,
+    # agar client menerima EOF ketika koneksi diakhiri
+    connection.close()
+    admission.done(ticket, not f.exception() and f.result())
 
 def Server():
-    the_clients = []
-    my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    my_socket.bind(('0.0.0.0', 8889))
-    my_socket.listen(5)
+    admission = Admission()
+    my_socket = listen_socket('0.0.0.0', 8889, BACKLOG)
     print("Server running on port 8889...")
+    # isi file statis disimpan sekali di shared memory; worker membukanya
+    # lewat HTTP_SHM_CACHE saat membuat HttpServer
+    SharedCache.create().publish()
+    # /metrics dijawab worker: angka semua worker dan gauge admission milik
+    # proses ini digabung lewat segmen shared memory
+    metrics.share()
 
-    with ProcessPoolExecutor(20) as executor:
+    # forkserver: worker tidak ikut mewarisi socket client milik proses utama
+    ctx = multiprocessing.get_context('forkserver')
+    with ProcessPoolExecutor(WORKERS, mp_context=ctx, initializer=init_worker,
+                             initargs=(admission.share(ctx),)) as executor:
         while True:
             connection, client_address = my_socket.accept()
+            ticket = admission.admit(client_address)
+            if ticket is None:
+                # antrian penuh: gagal cepat, latensi tidak ikut menumpuk
+                reject(connection, httpserver)
+                continue
             print(f"Connection from {client_address}")
-            p = executor.submit(ProcessTheClient, connection, client_address)
-            the_clients.append(p)
+            p = executor.submit(ProcessTheClient, connection, client_address, admission.accepted_at(ticket))
+            p.add_done_callback(lambda f, t=ticket, c=connection: finished(admission, t, c, f))
 
 def main():
     Server()
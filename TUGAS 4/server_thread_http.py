@@ -5,6 +5,8 @@ import time
 import sys
 import logging
 from http import HttpServer
+from http_connection import serve_connection
+from access_log import access_log
 
 httpserver = HttpServer()
 
@@ -16,32 +18,8 @@ class ProcessTheClient(threading.Thread):
 		threading.Thread.__init__(self)
 
 	def run(self):
-		rcv=""
-		while True:
-			try:
-				data = self.connection.recv(32)
-				if data:
-					#merubah input dari socket (berupa bytes) ke dalam string
-					#agar bisa mendeteksi \r\n
-					d = data.decode()
-					rcv=rcv+d
-					if rcv[-2:]=='\r\n':
-						#end of command, proses string
-						logging.warning("data dari client: {}" . format(rcv))
-						hasil = httpserver.proses(rcv)
-						#hasil akan berupa bytes
-						#untuk bisa ditambahi dengan string, maka string harus di encode
-						hasil=hasil+"\r\n\r\n".encode()
-						logging.warning("balas ke  client: {}" . format(hasil))
-						#hasil sudah dalam bentuk bytes
-						self.connection.sendall(hasil)
-						rcv=""
-						self.connection.close()
-				else:
-					break
-			except OSError as e:
-				pass
-		self.connection.close()
+		#satu koneksi bisa membawa beberapa request (keep-alive / pipelining)
+		serve_connection(self.connection, self.address, httpserver, trace=True)
 
 
 
@@ -66,6 +44,8 @@ class Server(threading.Thread):
 
 
 def main():
+	#log (access log maupun logging.warning) ditulis thread latar
+	access_log.start()
 	svr = Server()
 	svr.start()
 
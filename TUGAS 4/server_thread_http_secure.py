@@ -7,43 +7,32 @@ import sys
 import logging
 import ssl
 from http import HttpServer
+from http_connection import serve_connection, BACKLOG
+from access_log import access_log
+from tls_context import server_context, HANDSHAKE_TIMEOUT
 
 httpserver = HttpServer()
 
 
 class ProcessTheClient(threading.Thread):
-	def __init__(self, connection, address):
+	def __init__(self, connection, address, context):
 		self.connection = connection
 		self.address = address
+		self.context = context
 		threading.Thread.__init__(self)
 
 	def run(self):
-		rcv=""
-		while True:
-			try:
-				data = self.connection.recv(32)
-				if data:
-					#merubah input dari socket (berupa bytes) ke dalam string
-					#agar bisa mendeteksi \r\n
-					d = data.decode()
-					rcv=rcv+d
-					if rcv[-2:]=='\r\n':
-						#end of command, proses string
-						logging.warning("data dari client: {}" . format(rcv))
-						hasil = httpserver.proses(rcv)
-						#hasil akan berupa bytes
-						#untuk bisa ditambahi dengan string, maka string harus di encode
-						hasil=hasil+"\r\n\r\n".encode()
-						logging.warning("balas ke  client: {}" . format(hasil))
-						#hasil sudah dalam bentuk bytes
-						self.connection.sendall(hasil)
-						rcv=""
-						self.connection.close()
-				else:
-					break
-			except OSError as e:
-				pass
-		self.connection.close()
+		#handshake TLS dilakukan di thread ini, bukan di thread accept,
+		#sehingga client yang lambat tidak menahan client lain
+		try:
+			self.connection.settimeout(HANDSHAKE_TIMEOUT)
+			secure_connection = self.context.wrap_socket(self.connection, server_side=True)
+		except (ssl.SSLError, OSError) as essl:
+			logging.warning("handshake {} gagal: {}".format(self.address, essl))
+			self.connection.close()
+			return
+		#satu koneksi bisa membawa beberapa request (keep-alive / pipelining)
+		serve_connection(secure_connection, self.address, httpserver, trace=True)
 
 
 
@@ -52,10 +41,8 @@ class Server(threading.Thread):
 		self.the_clients = []
 #------------------------------
 		self.hostname = hostname
-		cert_location = os.getcwd() + '/certs/'
-		self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-		self.context.load_cert_chain(certfile=cert_location + 'domain.crt',
-									 keyfile=cert_location + 'domain.key')
+		#session ticket / session cache aktif agar client bisa resume
+		self.context = server_context()
 #---------------------------------
 		self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 		self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -63,20 +50,18 @@ class Server(threading.Thread):
 
 	def run(self):
 		self.my_socket.bind(('0.0.0.0', 8443))
-		self.my_socket.listen(1)
+		self.my_socket.listen(BACKLOG)
 		while True:
 			self.connection, self.client_address = self.my_socket.accept()
-			try:
-				self.secure_connection = self.context.wrap_socket(self.connection, server_side=True)
-				logging.warning("connection from {}".format(self.client_address))
-				clt = ProcessTheClient(self.secure_connection, self.client_address)
-				clt.start()
-				self.the_clients.append(clt)
-			except ssl.SSLError as essl:
-				print(str(essl))
+			logging.warning("connection from {}".format(self.client_address))
+			clt = ProcessTheClient(self.connection, self.client_address, self.context)
+			clt.start()
+			self.the_clients.append(clt)
 
 
 def main():
+	#log (access log maupun logging.warning) ditulis thread latar
+	access_log.start()
 	svr = Server()
 	svr.start()
 
@@ -1,55 +1,40 @@
+import time
 import socket
 import logging
 from concurrent.futures import ThreadPoolExecutor
 from http import HttpServer
+from http_connection import serve_connection, BACKLOG
+from selector_engine import listen_socket
+from admission import Admission, expired, reject, WORKERS
 
 httpserver = HttpServer()
+admission = Admission()
 
-def ProcessTheClient(connection, address):
-    try:
-        rcv = ""
-        while True:
-            data = connection.recv(1024)
-            if not data:
-                break
-            rcv += data.decode()
-            if '\r\n\r\n' in rcv:
-                # cek jika ada Content-Length (POST)
-                headers, body = rcv.split('\r\n\r\n', 1)
-                content_length = 0
-                for line in headers.split('\r\n'):
-                    if line.lower().startswith('content-length:'):
-                        content_length = int(line.split(':')[1].strip())
-                # jika POST dan belum lengkap, terus baca
-                while len(body) < content_length:
-                    data = connection.recv(1024)
-                    if not data:
-                        break
-                    body += data.decode()
-                break
-
-        hasil = httpserver.proses(rcv)
-        hasil += b"\r\n\r\n"
-        connection.sendall(hasil)
-    except Exception as e:
-        logging.warning(f"Error processing client {address}: {e}")
-    finally:
-        connection.close()
+def ProcessTheClient(connection, address, accepted):
+    # terlalu lama menunggu worker: jawab 503 daripada melayani terlambat
+    if expired(accepted):
+        reject(connection, httpserver)
+        return False
+    # koneksi tetap dibuka untuk request berikutnya (keep-alive / pipelining)
+    # selama tidak ada koneksi lain yang menunggu worker
+    serve_connection(connection, address, httpserver, busy=admission.busy)
+    return True
 
 def Server():
-    the_clients = []
-    my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    my_socket.bind(('0.0.0.0', 8885))
-    my_socket.listen(5)
+    my_socket = listen_socket('0.0.0.0', 8885, BACKLOG)
     print("Server running on port 8885...")
 
-    with ThreadPoolExecutor(20) as executor:
+    with ThreadPoolExecutor(WORKERS) as executor:
         while True:
             connection, client_address = my_socket.accept()
+            ticket = admission.admit(client_address)
+            if ticket is None:
+                # antrian penuh: gagal cepat, latensi tidak ikut menumpuk
+                reject(connection, httpserver)
+                continue
             print(f"Connection from {client_address}")
-            p = executor.submit(ProcessTheClient, connection, client_address)
-            the_clients.append(p)
+            p = executor.submit(ProcessTheClient, connection, client_address, admission.accepted_at(ticket))
+            p.add_done_callback(lambda f, t=ticket: admission.done(t, not f.exception() and f.result()))
 
 def main():
     Server()
@@ -0,0 +1,199 @@
+import os
+import zlib
+import mmap
+import fcntl
+import struct
+import atexit
+import threading
+from multiprocessing import shared_memory
+
+# === Konfigurasi cache shared memory (bisa diubah lewat environment) ===
+# nama segmen yang dibuka worker; diisi proses utama server berbasis proses
+SHM_ENV = "HTTP_SHM_CACHE"
+SHM_SIZE = int(os.getenv("HTTP_SHM_SIZE", 64 * 1024 * 1024))
+SHM_SLOTS = int(os.getenv("HTTP_SHM_SLOTS", 1024))
+# file lebih besar dari ini (mis. rfc2616.pdf) tetap dikirim dengan sendfile:
+# isinya sudah ada sekali di page cache kernel untuk semua proses, dan
+# sendfile lebih cepat daripada menyalin dari shared memory ke socket
+SHM_MAX_ENTRY = int(os.getenv("HTTP_SHM_MAX_ENTRY", 256 * 1024))
+# tempat segmen POSIX shared memory (shm_open) di Linux
+SHM_DIR = '/dev/shm/'
+
+MAGIC = 0x3143484D53505448  # 'HTPSMHC1'
+# magic, jumlah slot, awal area data, posisi alokasi berikutnya
+HEADER = struct.Struct('<QQQQ')
+# seq, panjang nama, offset, length, mtime_ns, size, ino, nama
+SLOT = struct.Struct('<IIQQqQQ200s')
+SEQ = struct.Struct('<I')
+NEXT = struct.Struct('<Q')
+NEXT_OFFSET = 24
+NAME_SIZE = 200
+# slot yang dicoba (linear probing) sebelum nama dianggap tidak muat
+PROBES = 8
+ALIGN = 64
+
+
+class SharedCache:
+    """
+    Isi file statis di satu segmen multiprocessing.shared_memory yang
+    dipakai bersama semua proses worker: setiap file hanya ada sekali di
+    RAM dan dikirim langsung dari memoryview segmen, tanpa salinan per
+    proses. Index berupa tabel slot berukuran tetap di awal segmen
+    (nama, offset, length, dan validator mtime_ns/size/ino). Area data
+    hanya ditambah (append-only): versi file yang lama tidak pernah ditimpa
+    sehingga memoryview yang sedang dikirim proses lain tetap utuh; saat
+    segmen penuh, file baru tidak lagi dimasukkan (`full`). Penulisan
+    dikunci dengan lockf pada segmen; pembaca tidak mengunci, cukup
+    memeriksa nomor seq slot (ganjil = sedang ditulis).
+    """
+
+    def __init__(self, shm, slots, owner=False):
+        self.shm = shm
+        self.name = shm.name
+        self.size = shm.size
+        # mmap dan fd sendiri: SharedMemory.close() (juga lewat __del__) gagal
+        # selama masih ada memoryview body yang dipegang StaticCache
+        self.fd, self.buf = map_segment(self.name, self.size)
+        shm.close()
+        self.slots = slots
+        self.data_start = HEADER.size + slots * SLOT.size
+        self.max_entry = SHM_MAX_ENTRY
+        self.owner = owner
+        self.full = False
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.stores = 0
+
+    @classmethod
+    def create(cls, size=SHM_SIZE, slots=SHM_SLOTS):
+        """Segmen baru milik proses ini; dihapus saat proses berakhir."""
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        data_start = HEADER.size + slots * SLOT.size
+        shm.buf[:data_start] = bytes(data_start)
+        HEADER.pack_into(shm.buf, 0, MAGIC, slots, data_start, data_start)
+        cache = cls(shm, slots, owner=True)
+        atexit.register(cache.unlink)
+        return cache
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Buka segmen yang dibuat proses utama (dari worker); None jika tidak
+        bisa. Worker berbagi resource tracker dengan proses utama, jadi
+        segmen tetap dihapus sekali saat semua proses berhenti.
+        """
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except (FileNotFoundError, ValueError):
+            return None
+        magic, slots, _, _ = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            shm.close()
+            return None
+        return cls(shm, slots)
+
+    def publish(self):
+        """Umumkan nama segmen ke worker yang dibuat setelah ini (lewat environment)."""
+        os.environ[SHM_ENV] = self.name
+
+    def acquire(self):
+        # lockf (record lock POSIX) dimiliki per proses, juga untuk fd yang
+        # diwarisi lewat fork; antar thread di satu proses memakai Lock
+        self.lock.acquire()
+        fcntl.lockf(self.fd, fcntl.LOCK_EX)
+
+    def release(self):
+        fcntl.lockf(self.fd, fcntl.LOCK_UN)
+        self.lock.release()
+
+    def slot(self, index):
+        return HEADER.size + index * SLOT.size
+
+    def find(self, raw):
+        """(posisi slot, isi slot) untuk nama `raw`, atau slot kosong pertama; None jika tidak ada tempat."""
+        start = zlib.crc32(raw) % self.slots
+        for i in range(PROBES):
+            pos = self.slot((start + i) % self.slots)
+            fields = SLOT.unpack_from(self.buf, pos)
+            if fields[0] == 0 or fields[7][:fields[1]] == raw:
+                return pos, fields
+        return None
+
+    def get(self, filename, st):
+        """memoryview isi `filename` jika versi di segmen sama dengan `st`, selain itu None."""
+        raw = filename.encode()
+        if len(raw) > NAME_SIZE:
+            return None
+        found = self.find(raw)
+        if found is None:
+            return None
+        pos, (seq, _, offset, length, mtime_ns, size, ino, _) = found
+        if seq == 0 or seq & 1:
+            return None
+        if (mtime_ns, size, ino) != (st.st_mtime_ns, st.st_size, st.st_ino):
+            return None
+        # slot berubah selama dibaca: anggap tidak ada
+        if SLOT.unpack_from(self.buf, pos)[0] != seq:
+            return None
+        self.hits += 1
+        return self.buf[offset:offset + length].toreadonly()
+
+    def put(self, filename, st, data):
+        """Simpan `data` (isi file versi `st`); memoryview di segmen, None jika tidak muat."""
+        raw = filename.encode()
+        if len(raw) > NAME_SIZE or len(data) > self.max_entry or self.full:
+            return None
+        self.acquire()
+        try:
+            found = self.find(raw)
+            if found is None:
+                return None
+            pos, fields = found
+            seq = fields[0]
+            if (fields[4], fields[5], fields[6]) == (st.st_mtime_ns, st.st_size, st.st_ino) and seq:
+                # proses lain baru saja menyimpan versi yang sama
+                offset, length = fields[2], fields[3]
+                return self.buf[offset:offset + length].toreadonly()
+            offset = NEXT.unpack_from(self.buf, NEXT_OFFSET)[0]
+            length = len(data)
+            if offset + length > self.size:
+                self.full = True
+                return None
+            self.buf[offset:offset + length] = data
+            NEXT.pack_into(self.buf, NEXT_OFFSET, offset + (length + ALIGN - 1) // ALIGN * ALIGN)
+            # seq ganjil selama slot diisi; data lama tetap ada di segmen
+            SEQ.pack_into(self.buf, pos, seq + 1)
+            SLOT.pack_into(self.buf, pos, seq + 1, len(raw), offset, length,
+                           st.st_mtime_ns, st.st_size, st.st_ino, raw)
+            SEQ.pack_into(self.buf, pos, seq + 2)
+            self.stores += 1
+            return self.buf[offset:offset + length].toreadonly()
+        finally:
+            self.release()
+
+    def unlink(self):
+        if not self.owner:
+            return
+        self.owner = False
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def map_segment(name, size):
+    """(fd, memoryview) segmen shared memory `name`, dibuka sendiri lewat /dev/shm."""
+    fd = os.open(SHM_DIR + name, os.O_RDWR)
+    try:
+        return fd, memoryview(mmap.mmap(fd, size))
+    except BaseException:
+        os.close(fd)
+        raise
+
+
+def shared_cache():
+    """Segmen yang diumumkan proses utama lewat HTTP_SHM_CACHE, atau None."""
+    name = os.environ.get(SHM_ENV)
+    if not name:
+        return None
+    return SharedCache.attach(name)
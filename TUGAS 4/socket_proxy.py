@@ -1,66 +1,67 @@
-from socket import *
+import os
+import sys
 import socket
 import threading
-import time
-import sys
 import logging
-
+from proxy_engine import TcpProxy, HAS_SPLICE
+from proxy_http import HttpProxy
+from proxy_cache import CachingProxy
+from upstream import BackendPool, parse_backends
+from http_connection import serve_connection
+from selector_engine import listen_socket
+
+# === Konfigurasi proxy (bisa diubah lewat environment) ===
+PORT = int(os.getenv("PROXY_PORT", 18000))
+# tcp: tunnel byte apa adanya (selectors + splice), satu koneksi upstream per client
+# http: request diparse lalu diteruskan lewat pool koneksi keep-alive ke backend
+# cache: seperti http, ditambah cache objek memori + disk (lihat proxy_cache)
+MODE = os.getenv("PROXY_MODE", 'tcp')
+BACKENDS = os.getenv("PROXY_BACKENDS", 'localhost:8885,localhost:8889,localhost:8886')
+STRATEGY = os.getenv("PROXY_STRATEGY", 'round_robin')
 
 
 class ProcessTheClient(threading.Thread):
-	def __init__(self, connection, address, destination_sock_address):
-		self.destination_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-		self.destination_sock.connect(destination_sock_address)
+	def __init__(self, connection, address, proxy):
 		self.connection = connection
 		self.address = address
-		threading.Thread.__init__(self)
+		self.proxy = proxy
+		threading.Thread.__init__(self, daemon=True)
 
 	def run(self):
-		rcv=""
-		while True:
-			try:
-				data = self.connection.recv(8192)
-				if data:
-					self.destination_sock.sendall(data)
-					data_balasan = self.destination_sock.recv(8192)
-					self.connection.sendall(data_balasan)
-					logging.warning(data)
-					logging.warning(data_balasan)
-
-				else:
-					break
-			except OSError as e:
-				pass
-		self.connection.close()
-
+		serve_connection(self.connection, self.address, self.proxy)
 
 
 class Server(threading.Thread):
-	def __init__(self):
-		self.the_clients = []
-		self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-		self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-
-		self.destination_sock_address = ('localhost',8889)
+	"""Mode http: satu thread per client, koneksi ke backend diambil dari pool."""
+	def __init__(self, proxy):
+		self.proxy = proxy
+		self.my_socket = listen_socket('0.0.0.0', PORT)
 		threading.Thread.__init__(self)
 
 	def run(self):
-		self.my_socket.bind(('0.0.0.0', 18000))
-		self.my_socket.listen(1)
 		while True:
-			self.connection, self.client_address = self.my_socket.accept()
-			logging.warning("connection from {}".format(self.client_address))
-
-			clt = ProcessTheClient(self.connection, self.client_address,self.destination_sock_address)
+			connection, client_address = self.my_socket.accept()
+			connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+			clt = ProcessTheClient(connection, client_address, self.proxy)
 			clt.start()
-			self.the_clients.append(clt)
-
 
 
 def main():
-	svr = Server()
-	svr.start()
+	backends = BACKENDS
+	try:
+		backends = sys.argv[1]
+	except:
+		pass
+	pool = BackendPool(parse_backends(backends), STRATEGY)
+	pool.start_health_checks()
+	logging.warning("proxy {} :{} -> {} ({}{})".format(MODE, PORT, backends, STRATEGY,
+		', splice' if MODE == 'tcp' and HAS_SPLICE else ''))
+	if MODE in ('http', 'cache'):
+		svr = Server(CachingProxy(pool) if MODE == 'cache' else HttpProxy(pool))
+		svr.start()
+	else:
+		svr = TcpProxy(PORT, pool)
+		svr.serve_forever()
 
 if __name__=="__main__":
 	main()
-
@@ -0,0 +1,354 @@
+import os
+import json
+import gzip
+import zlib
+import stat
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from metrics import metrics
+
+# === Konfigurasi cache (bisa diubah lewat environment) ===
+CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+CACHE_MAX_ENTRY = int(os.getenv("HTTP_CACHE_MAX_ENTRY", 256 * 1024))
+# body lebih kecil dari ini tidak dikompresi (overhead gzip tidak sebanding)
+COMPRESS_MIN_SIZE = int(os.getenv("HTTP_COMPRESS_MIN_SIZE", 128))
+COMPRESS_LEVEL = int(os.getenv("HTTP_COMPRESS_LEVEL", 6))
+# hanya tipe teks yang dikompresi; JPEG/PDF sudah terkompresi
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript',
+                      'application/xml', 'image/svg+xml')
+# jumlah halaman hasil render yang disimpan per listing direktori
+LISTING_MAX_PAGES = int(os.getenv("HTTP_LISTING_MAX_PAGES", 64))
+# file sementara upload yang belum selesai tidak ikut ditampilkan
+HIDDEN_PREFIX = '.upload-'
+
+
+def make_etag(st):
+    """ETag kuat dari inode, ukuran, dan mtime (ns) hasil os.stat."""
+    return f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def http_date(timestamp):
+    return formatdate(timestamp, usegmt=True)
+
+
+def is_compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body, encoding):
+    if encoding == 'gzip':
+        # mtime=0 agar hasil kompresi (dan ETag-nya) deterministik
+        return gzip.compress(body, COMPRESS_LEVEL, mtime=0)
+    return zlib.compress(body, COMPRESS_LEVEL)
+
+
+def choose_encoding(accept_encoding):
+    """Pilih 'gzip', 'deflate', atau None dari header Accept-Encoding."""
+    if not accept_encoding:
+        return None
+    q = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        q[name.strip().lower()] = weight
+    star = q.get('*', 0.0)
+    best = None
+    for encoding in ('gzip', 'deflate'):
+        weight = q.get(encoding, star)
+        if weight > 0 and (best is None or weight > q.get(best, star)):
+            best = encoding
+    return best
+
+
+class CacheEntry:
+    __slots__ = ('key', 'size', 'mtime', 'etag', 'last_modified', 'content_type',
+                 'compressible', 'header_block', 'body', 'variants', 'shared')
+
+    def __init__(self, st, content_type, body):
+        self.key = (st.st_mtime_ns, st.st_size)
+        self.size = st.st_size
+        self.mtime = int(st.st_mtime)
+        self.etag = make_etag(st)
+        self.last_modified = http_date(st.st_mtime)
+        self.content_type = content_type
+        self.compressible = (body is not None and len(body) >= COMPRESS_MIN_SIZE
+                             and is_compressible(content_type))
+        self.header_block = (f"Content-Type: {content_type}\r\n"
+                             "Accept-Ranges: bytes\r\n"
+                             f"ETag: {self.etag}\r\n"
+                             f"Last-Modified: {self.last_modified}\r\n"
+                             + ("Vary: Accept-Encoding\r\n" if self.compressible else "")).encode()
+        self.body = body
+        # varian terkompresi: encoding -> Variant, dibuat sekali per versi file
+        self.variants = {}
+        # body berupa memoryview di SharedCache, tidak dihitung ke memori proses ini
+        self.shared = False
+
+    def cost(self):
+        total = len(self.header_block)
+        if self.body is not None and not self.shared:
+            total += len(self.body)
+        for variant in self.variants.values():
+            if variant.body is not None:
+                total += len(variant.header_block) + len(variant.body)
+        return total
+
+
+class Variant:
+    __slots__ = ('etag', 'header_block', 'body')
+
+    def __init__(self, entry, encoding, body):
+        # ETag berbeda per encoding agar cache di client tidak tertukar
+        self.etag = entry.etag[:-1] + '-' + encoding + '"'
+        self.header_block = (f"Content-Type: {entry.content_type}\r\n"
+                             f"Content-Encoding: {encoding}\r\n"
+                             f"ETag: {self.etag}\r\n"
+                             f"Last-Modified: {entry.last_modified}\r\n"
+                             "Vary: Accept-Encoding\r\n").encode()
+        self.body = body
+
+
+class StaticCache:
+    """
+    Cache LRU untuk file statis dengan batas total ukuran (bytes).
+    Setiap entri menyimpan validator (ETag, Last-Modified), blok header yang
+    sudah dirender, dan isi file; entri divalidasi ulang dengan os.stat
+    (mtime_ns + size) setiap kali dipakai. Untuk file yang lebih besar dari
+    `max_entry` hanya metadata yang disimpan (body None); pemanggil
+    mengirim isinya langsung dari disk.
+    Dengan `shared` (SharedCache) body disimpan sekali di shared memory
+    untuk semua proses worker; cache ini hanya memegang memoryview-nya.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, max_entry=CACHE_MAX_ENTRY, shared=None):
+        self.max_bytes = max_bytes
+        self.max_entry = max_entry
+        self.shared = shared
+        self.entries = OrderedDict()
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+        self.bypass = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        metrics.gauge('http_static_cache_entries', 'File statis di cache.', lambda: len(self.entries))
+        metrics.gauge('http_static_cache_bytes', 'Ukuran cache file statis (byte).', lambda: self.total)
+        metrics.gauge('http_static_cache_hits_total', 'File statis dilayani dari cache.',
+                      lambda: self.hits, 'counter')
+        metrics.gauge('http_static_cache_misses_total', 'File statis dibaca dari disk lalu disimpan di cache.',
+                      lambda: self.misses, 'counter')
+        metrics.gauge('http_static_cache_bypass_total', 'File statis terlalu besar untuk cache (dikirim dari disk).',
+                      lambda: self.bypass, 'counter')
+        metrics.gauge('http_static_cache_evictions_total', 'Entri dibuang karena cache penuh.',
+                      lambda: self.evictions, 'counter')
+        if shared is not None:
+            metrics.gauge('http_shm_cache_hits_total', 'File statis ditemukan di shared memory.',
+                          lambda: shared.hits, 'counter')
+            metrics.gauge('http_shm_cache_stores_total', 'File statis disimpan ke shared memory.',
+                          lambda: shared.stores, 'counter')
+
+    def get(self, filename, content_type, st=None):
+        """
+        Ambil entri untuk `filename`; FileNotFoundError jika file tidak ada.
+        `st`: hasil stat yang sudah diketahui pemanggil (mis. dari index
+        DocumentRoot) sehingga os.stat tidak perlu diulang.
+        """
+        if st is None:
+            st = os.stat(filename)
+        if not stat.S_ISREG(st.st_mode):
+            raise FileNotFoundError(filename)
+        key = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            entry = self.entries.get(filename)
+            if entry is not None and entry.key == key:
+                self.entries.move_to_end(filename)
+                if entry.body is None:
+                    self.bypass += 1
+                else:
+                    self.hits += 1
+                return entry
+
+        entry = None
+        if self.shared is not None and st.st_size <= self.shared.max_entry:
+            entry = self.load_shared(filename, content_type, st)
+        if entry is None and st.st_size > self.max_entry:
+            entry = CacheEntry(st, content_type, None)
+        elif entry is None:
+            with open(filename, 'rb') as f:
+                st = os.fstat(f.fileno())
+                entry = CacheEntry(st, content_type, f.read())
+        with self.lock:
+            if entry.body is None:
+                self.bypass += 1
+            else:
+                self.misses += 1
+            self._discard(filename)
+            self.entries[filename] = entry
+            self.total += entry.cost()
+            self.evict()
+        return entry
+
+    def load_shared(self, filename, content_type, st):
+        """Entri dengan body di SharedCache (dibaca dari disk oleh proses pertama), atau None."""
+        body = self.shared.get(filename, st)
+        if body is None:
+            if self.shared.full:
+                return None
+            with open(filename, 'rb') as f:
+                st = os.fstat(f.fileno())
+                body = self.shared.put(filename, st, f.read())
+            if body is None:
+                return None
+        entry = CacheEntry(st, content_type, body)
+        entry.shared = True
+        return entry
+
+    def variant(self, filename, entry, encoding):
+        """
+        Varian terkompresi dari `entry`; dikompresi sekali lalu disimpan di
+        entri yang sama sehingga ikut tervalidasi oleh mtime/size file.
+        None jika kompresi tidak memperkecil body.
+        """
+        variant = entry.variants.get(encoding)
+        if variant is not None:
+            return variant if variant.body is not None else None
+        body = compress(entry.body, encoding)
+        # varian tanpa body menandai kompresi tidak menguntungkan untuk file ini
+        variant = Variant(entry, encoding, body if len(body) < len(entry.body) else None)
+        with self.lock:
+            if self.entries.get(filename) is entry and encoding not in entry.variants:
+                self.total -= entry.cost()
+                entry.variants[encoding] = variant
+                self.total += entry.cost()
+                self.evict()
+        return variant if variant.body is not None else None
+
+    def invalidate(self, filename):
+        with self.lock:
+            self._discard(filename)
+
+    def evict(self):
+        """Buang entri yang paling lama tidak dipakai sampai muat (dipanggil dengan lock)."""
+        while self.total > self.max_bytes and self.entries:
+            self._discard(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _discard(self, filename):
+        entry = self.entries.pop(filename, None)
+        if entry is not None:
+            self.total -= entry.cost()
+
+
+class Listing:
+    """Isi satu direktori hasil satu kali os.scandir, beserta validatornya."""
+
+    def __init__(self, st, files):
+        self.key = (st.st_ino, st.st_mtime_ns)
+        self.mtime = int(st.st_mtime)
+        self.last_modified = http_date(st.st_mtime)
+        # ETag lemah: representasinya bisa dikompresi (gzip/deflate) saat dikirim
+        self.etag = f'"d{st.st_ino:x}-{st.st_mtime_ns:x}-{len(files):x}"'
+        # list of (nama, size, mtime, content_type), urut nama
+        self.files = files
+        self.pages = {}
+
+    def render(self, fmt, offset, limit, encoding=None):
+        """
+        (body, encoding) untuk format 'text'/'json' dan halaman offset/limit.
+        Hasil render (dan kompresinya) disimpan sehingga listing yang tidak
+        berubah tidak perlu diserialisasi atau dikompresi ulang; encoding
+        hasil None jika kompresi tidak memperkecil body.
+        """
+        key = (fmt, offset, limit, encoding)
+        hasil = self.pages.get(key)
+        if hasil is not None:
+            return hasil
+        if encoding is not None:
+            body = self.render(fmt, offset, limit)[0]
+            hasil = (body, None)
+            if len(body) >= COMPRESS_MIN_SIZE:
+                compressed = compress(body, encoding)
+                if len(compressed) < len(body):
+                    hasil = (compressed, encoding)
+        else:
+            hasil = (self.page(fmt, offset, limit), None)
+        if len(self.pages) < LISTING_MAX_PAGES:
+            self.pages[key] = hasil
+        return hasil
+
+    def page(self, fmt, offset, limit):
+        end = None if limit is None else offset + limit
+        page = self.files[offset:end]
+        if fmt == 'json':
+            body = json.dumps({
+                'total': len(self.files),
+                'offset': offset,
+                'limit': limit,
+                'files': [{'name': name, 'size': size, 'mtime': mtime, 'type': content_type}
+                          for name, size, mtime, content_type in page],
+            }).encode()
+        else:
+            body = '\n'.join(item[0] for item in page).encode()
+        return body
+
+    def page_etag(self, fmt, offset, limit):
+        return f'{self.etag[:-1]}-{fmt}-{offset:x}-{limit if limit is not None else "all"}"'
+
+
+class ListingCache:
+    """
+    Cache listing direktori. Setiap pemakaian hanya butuh satu os.stat pada
+    direktori; listing dibuat ulang (satu os.scandir) jika mtime direktori
+    berubah, yaitu saat ada file yang dibuat, di-rename, atau dihapus.
+    `hidden(nama, is_dir)` menyaring entri yang tidak boleh ditampilkan.
+    """
+
+    def __init__(self, hidden=None):
+        self.hidden = hidden
+        self.listings = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, directory, content_type):
+        """Listing untuk `directory`; `content_type(nama)` memberi tipe tiap file."""
+        st = os.stat(directory)
+        key = (st.st_ino, st.st_mtime_ns)
+        with self.lock:
+            listing = self.listings.get(directory)
+            if listing is not None and listing.key == key:
+                self.hits += 1
+                return listing
+        files = []
+        with os.scandir(directory) as it:
+            for item in it:
+                if item.name.startswith(HIDDEN_PREFIX):
+                    continue
+                if self.hidden is not None and self.hidden(item.name, item.is_dir()):
+                    continue
+                try:
+                    est = item.stat()
+                except FileNotFoundError:
+                    continue
+                if stat.S_ISDIR(est.st_mode):
+                    kind = 'inode/directory'
+                else:
+                    kind = content_type(item.name)
+                files.append((item.name, est.st_size, int(est.st_mtime), kind))
+        files.sort()
+        listing = Listing(st, files)
+        with self.lock:
+            self.misses += 1
+            self.listings[directory] = listing
+        return listing
+
+    def invalidate(self, directory):
+        with self.lock:
+            self.listings.pop(directory, None)
@@ -0,0 +1,60 @@
+import os
+import glob
+import socket
+import shutil
+import tempfile
+import unittest
+
+# document root sementara; harus diisi sebelum modul http diimpor
+ROOT = tempfile.mkdtemp(prefix='httptest-')
+os.environ['HTTP_DOCUMENT_ROOT'] = ROOT
+
+from http import HttpServer
+from http_connection import serve_connection
+
+
+class TestDelete(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(ROOT, 'hapus.txt')
+        with open(self.path, 'wb') as f:
+            f.write(b'isi')
+        self.httpserver = HttpServer()
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_head_delete_tidak_menghapus(self):
+        hasil = self.httpserver.proses('HEAD /delete/hapus.txt HTTP/1.1\r\nHost: x\r\n\r\n')
+        self.assertEqual(hasil.kode, 405)
+        self.assertNotIn('HEAD', hasil.headers['Allow'])
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_get_delete_menghapus(self):
+        hasil = self.httpserver.proses('GET /delete/hapus.txt HTTP/1.1\r\nHost: x\r\n\r\n')
+        self.assertEqual(hasil.kode, 200)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_head_file_statis(self):
+        hasil = self.httpserver.proses('HEAD /hapus.txt HTTP/1.1\r\nHost: x\r\n\r\n')
+        self.assertEqual(hasil.kode, 200)
+        self.assertTrue(hasil.head)
+
+
+class TestPipelinedUpload(unittest.TestCase):
+    def test_upload_setelah_connection_close_dibuang(self):
+        client, server = socket.socketpair()
+        client.sendall(b'GET /metrics HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n'
+                       b'POST /upload/baru.txt HTTP/1.1\r\nHost: x\r\nContent-Length: 3\r\n\r\nisi')
+        serve_connection(server, ('test', 0), HttpServer())
+        client.close()
+        self.assertEqual(glob.glob(os.path.join(ROOT, '.upload-*')), [])
+        self.assertFalse(os.path.exists(os.path.join(ROOT, 'baru.txt')))
+
+
+def tearDownModule():
+    shutil.rmtree(ROOT, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import os
+import ssl
+
+# === Konfigurasi TLS (bisa diubah lewat environment) ===
+CERT_LOCATION = os.getenv("HTTP_CERT_LOCATION", os.path.join(os.getcwd(), 'certs'))
+# jumlah session ticket TLS 1.3 yang dikirim setelah handshake penuh
+TLS_TICKETS = int(os.getenv("HTTP_TLS_TICKETS", 2))
+# batas waktu handshake; client yang lambat tidak boleh menahan worker
+HANDSHAKE_TIMEOUT = float(os.getenv("HTTP_HANDSHAKE_TIMEOUT", 5))
+
+
+def server_context(certfile=None, keyfile=None):
+    """
+    SSLContext server dengan session resumption aktif: session ticket
+    (TLS 1.3 dan 1.2) serta session cache internal OpenSSL untuk client
+    TLS 1.2 yang memakai session id. Kunci ticket dibuat acak per context,
+    jadi resumption berlaku selama proses server yang sama masih hidup.
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certfile=certfile or os.path.join(CERT_LOCATION, 'domain.crt'),
+                            keyfile=keyfile or os.path.join(CERT_LOCATION, 'domain.key'))
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.options &= ~ssl.OP_NO_TICKET
+    context.num_tickets = TLS_TICKETS
+    return context
@@ -0,0 +1,357 @@
+import os
+import time
+import socket
+import logging
+import tempfile
+import threading
+import itertools
+
+# === Konfigurasi upstream (bisa diubah lewat environment) ===
+# koneksi keep-alive idle yang disimpan per backend
+POOL_MAX_IDLE = int(os.getenv("PROXY_POOL_MAX_IDLE", 32))
+# koneksi idle dibuang sebelum timeout keep-alive backend (5 detik) habis
+POOL_IDLE_TIMEOUT = float(os.getenv("PROXY_POOL_IDLE_TIMEOUT", 4))
+UPSTREAM_TIMEOUT = float(os.getenv("PROXY_UPSTREAM_TIMEOUT", 10))
+# body respon/upload lebih besar dari ini ditampung di file sementara
+SPOOL_SIZE = int(os.getenv("PROXY_SPOOL_SIZE", 1024 * 1024))
+HEALTH_INTERVAL = float(os.getenv("PROXY_HEALTH_INTERVAL", 2))
+HEALTH_TIMEOUT = float(os.getenv("PROXY_HEALTH_TIMEOUT", 1))
+# backend yang menjawab health check lebih lambat dari ini dianggap sakit
+HEALTH_MAX_LATENCY = float(os.getenv("PROXY_HEALTH_MAX_LATENCY", 0.5))
+# berapa kali gagal/berhasil berturut-turut sebelum status backend berubah
+HEALTH_FALLS = int(os.getenv("PROXY_HEALTH_FALLS", 2))
+HEALTH_RISES = int(os.getenv("PROXY_HEALTH_RISES", 2))
+# bobot sampel baru pada rata-rata latensi EWMA
+EWMA_ALPHA = float(os.getenv("PROXY_EWMA_ALPHA", 0.3))
+STRATEGIES = ('round_robin', 'least_conn', 'ewma')
+RECV_SIZE = 65536
+MAX_HEADER_SIZE = 64 * 1024
+
+
+def parse_backends(value):
+    """'host:port,host:port' -> list of (host, port)."""
+    hasil = []
+    for item in value.split(','):
+        host, _, port = item.strip().rpartition(':')
+        hasil.append((host or 'localhost', int(port)))
+    return hasil
+
+
+class UpstreamError(Exception):
+    def __init__(self, kode, message):
+        Exception.__init__(self, message)
+        self.kode = kode
+        self.message = message
+
+
+class Spool:
+    """
+    Penampung body: bytes di memori, pindah ke file sementara (tanpa nama)
+    jika melebihi `limit` sehingga body besar tidak menghabiskan memori dan
+    bisa dikirim ulang dengan sendfile. Bisa dipakai sebagai body_sink parser.
+    """
+
+    def __init__(self, limit=SPOOL_SIZE):
+        self.limit = limit
+        self.buffer = bytearray()
+        self.file = None
+        self.size = 0
+
+    def write(self, data):
+        if self.file is None and len(self.buffer) + len(data) > self.limit:
+            self.file = tempfile.TemporaryFile()
+            self.file.write(self.buffer)
+            self.buffer = None
+        if self.file is not None:
+            self.file.write(data)
+        else:
+            self.buffer += data
+        self.size += len(data)
+
+    def finish(self):
+        """bytes, atau file (posisi di awal) jika body ditampung di disk."""
+        if self.file is None:
+            return bytes(self.buffer)
+        self.file.flush()
+        self.file.seek(0)
+        return self.file
+
+    def abort(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class UpstreamResponse:
+    __slots__ = ('kode', 'message', 'headers', 'body', 'keep_alive')
+
+    def __init__(self, kode, message, headers):
+        self.kode = kode
+        self.message = message
+        # list of (nama, nilai) seperti yang dikirim backend
+        self.headers = headers
+        self.body = b''
+        self.keep_alive = True
+
+    def header(self, name, default=''):
+        name = name.lower()
+        for k, v in self.headers:
+            if k.lower() == name:
+                return v
+        return default
+
+
+class UpstreamConnection:
+    """Satu koneksi keep-alive ke backend beserta sisa data yang sudah diterima."""
+
+    def __init__(self, backend, sock):
+        self.backend = backend
+        self.sock = sock
+        self.buffer = bytearray()
+        self.idle_since = time.monotonic()
+        # True jika diambil dari pool: bisa saja sudah ditutup backend
+        self.reused = False
+
+    def fill(self):
+        data = self.sock.recv(RECV_SIZE)
+        if not data:
+            raise ConnectionResetError('upstream menutup koneksi')
+        self.buffer += data
+
+    def read_until(self, delimiter, limit=MAX_HEADER_SIZE):
+        while True:
+            end = self.buffer.find(delimiter)
+            if end >= 0:
+                hasil = bytes(self.buffer[:end])
+                del self.buffer[:end + len(delimiter)]
+                return hasil
+            if len(self.buffer) > limit:
+                raise UpstreamError(502, 'Upstream header too large')
+            self.fill()
+
+    def read_into(self, sink, count):
+        """Teruskan tepat `count` byte ke sink; None berarti sampai koneksi ditutup."""
+        while count is None or count > 0:
+            if not self.buffer:
+                try:
+                    self.fill()
+                except ConnectionResetError:
+                    if count is None:
+                        return
+                    raise
+            n = len(self.buffer) if count is None else min(count, len(self.buffer))
+            sink.write(self.buffer[:n])
+            del self.buffer[:n]
+            if count is not None:
+                count -= n
+
+    def send_request(self, head, body):
+        self.sock.sendall(head)
+        if type(body) is bytes:
+            if body:
+                self.sock.sendall(body)
+        else:
+            self.sock.sendfile(body)
+
+    def read_response(self, method, spool_limit=SPOOL_SIZE):
+        head = self.read_until(b"\r\n\r\n").decode('iso-8859-1')
+        lines = head.split("\r\n")
+        parts = lines[0].split(' ', 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+            raise UpstreamError(502, 'Invalid upstream status line')
+        try:
+            kode = int(parts[1])
+        except ValueError:
+            raise UpstreamError(502, 'Invalid upstream status line')
+        headers = []
+        for line in lines[1:]:
+            k, sep, v = line.partition(':')
+            if sep:
+                headers.append((k.strip(), v.strip()))
+        respon = UpstreamResponse(kode, parts[2] if len(parts) > 2 else '', headers)
+        connection = respon.header('connection').lower()
+        respon.keep_alive = ('close' not in connection if parts[0] == 'HTTP/1.1'
+                             else 'keep-alive' in connection)
+
+        if method == 'HEAD' or kode in (204, 304) or 100 <= kode < 200:
+            return respon
+        spool = Spool(spool_limit)
+        try:
+            if 'chunked' in respon.header('transfer-encoding').lower():
+                while True:
+                    size = int(self.read_until(b"\r\n").split(b';', 1)[0].strip(), 16)
+                    if not size:
+                        break
+                    self.read_into(spool, size)
+                    self.read_until(b"\r\n")
+                # trailer diabaikan
+                while self.read_until(b"\r\n"):
+                    pass
+            elif respon.header('content-length'):
+                self.read_into(spool, int(respon.header('content-length')))
+            else:
+                # tanpa framing: body berakhir saat backend menutup koneksi
+                self.read_into(spool, None)
+                respon.keep_alive = False
+        except Exception:
+            spool.abort()
+            raise
+        respon.body = spool.finish()
+        return respon
+
+    def close(self):
+        self.sock.close()
+
+
+class Backend:
+    """Satu server tujuan: status kesehatan, statistik, dan pool koneksi idle."""
+
+    def __init__(self, address):
+        self.address = address
+        self.name = f"{address[0]}:{address[1]}"
+        self.active = 0
+        self.ewma = 0.0
+        self.healthy = True
+        self.falls = 0
+        self.rises = 0
+        self.requests = 0
+        self.failures = 0
+        self.reused = 0
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        """Masukkan satu sampel latensi ke rata-rata EWMA."""
+        with self.lock:
+            if self.ewma == 0.0:
+                self.ewma = seconds
+            else:
+                self.ewma += EWMA_ALPHA * (seconds - self.ewma)
+
+    def begin(self):
+        with self.lock:
+            self.active += 1
+            self.requests += 1
+
+    def end(self):
+        with self.lock:
+            self.active -= 1
+
+    def fail(self):
+        """Kegagalan pasif (connect/IO error): langsung dikeluarkan dari rotasi."""
+        with self.lock:
+            self.failures += 1
+            self.healthy = False
+            self.rises = 0
+
+    def acquire(self, timeout=UPSTREAM_TIMEOUT, fresh=False):
+        """
+        Koneksi idle yang masih segar dari pool, atau koneksi baru. `fresh`:
+        selalu koneksi baru (request yang tidak aman diulang).
+        """
+        batas = time.monotonic() - POOL_IDLE_TIMEOUT
+        with self.lock:
+            while self.idle and not fresh:
+                conn = self.idle.pop()
+                if conn.idle_since >= batas:
+                    self.reused += 1
+                    conn.reused = True
+                    return conn
+                conn.close()
+        sock = socket.create_connection(self.address, timeout=timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return UpstreamConnection(self, sock)
+
+    def release(self, conn, reusable):
+        if reusable and not conn.buffer:
+            conn.idle_since = time.monotonic()
+            with self.lock:
+                if len(self.idle) < POOL_MAX_IDLE:
+                    self.idle.append(conn)
+                    return
+        conn.close()
+
+    def stats(self):
+        return {
+            'backend': self.name,
+            'healthy': self.healthy,
+            'active': self.active,
+            'ewma_ms': round(self.ewma * 1000, 3),
+            'requests': self.requests,
+            'failures': self.failures,
+            'reused': self.reused,
+            'idle': len(self.idle),
+        }
+
+
+class BackendPool:
+    """
+    Kumpulan backend dengan strategi pemilihan:
+    - round_robin: bergiliran
+    - least_conn: backend dengan koneksi/request aktif paling sedikit
+    - ewma: latensi rata-rata (EWMA) dikali beban aktif paling kecil
+    Backend yang gagal atau lambat dikeluarkan dari rotasi oleh health check
+    aktif (thread terpisah) dan dimasukkan lagi setelah sehat kembali.
+    """
+
+    def __init__(self, addresses, strategy='round_robin'):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"strategi '{strategy}' tidak dikenal, pilih {STRATEGIES}")
+        self.backends = [Backend(address) for address in addresses]
+        self.strategy = strategy
+        self.counter = itertools.count()
+        self.checker = None
+
+    def pick(self):
+        healthy = [b for b in self.backends if b.healthy]
+        # semua backend sakit: tetap dicoba daripada langsung menolak client
+        candidates = healthy or self.backends
+        start = next(self.counter) % len(candidates)
+        if self.strategy == 'round_robin':
+            return candidates[start]
+        # rotasi agar backend dengan skor sama mendapat giliran merata
+        candidates = candidates[start:] + candidates[:start]
+        if self.strategy == 'least_conn':
+            return min(candidates, key=lambda b: b.active)
+        return min(candidates, key=lambda b: b.ewma * (b.active + 1))
+
+    def start_health_checks(self, interval=HEALTH_INTERVAL):
+        if self.checker is None:
+            self.checker = threading.Thread(target=self.health_loop, args=(interval,), daemon=True)
+            self.checker.start()
+
+    def health_loop(self, interval):
+        while True:
+            for backend in self.backends:
+                self.check(backend)
+            time.sleep(interval)
+
+    def check(self, backend):
+        mulai = time.monotonic()
+        try:
+            with socket.create_connection(backend.address, timeout=HEALTH_TIMEOUT) as sock:
+                sock.sendall(b"HEAD / HTTP/1.1\r\nHost: health\r\nConnection: close\r\n\r\n")
+                status = sock.recv(64)
+            ok = status.startswith(b'HTTP/1.') and status[9:10] in (b'2', b'3')
+        except OSError:
+            ok = False
+        latency = time.monotonic() - mulai
+        if ok and latency > HEALTH_MAX_LATENCY:
+            ok = False
+        with backend.lock:
+            if ok:
+                backend.falls = 0
+                backend.rises += 1
+                if not backend.healthy and backend.rises >= HEALTH_RISES:
+                    backend.healthy = True
+                    logging.warning(f"backend {backend.name} sehat kembali")
+            else:
+                backend.rises = 0
+                backend.falls += 1
+                if backend.healthy and backend.falls >= HEALTH_FALLS:
+                    backend.healthy = False
+                    logging.warning(f"backend {backend.name} dikeluarkan dari rotasi")
+        if ok:
+            backend.observe(latency)
+
+    def stats(self):
+        return [backend.stats() for backend in self.backends]